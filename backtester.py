@@ -0,0 +1,435 @@
+"""
+Offline backtester - replays a price series through the same pipeline main.py uses:
+moving-average reference, evaluate(), conviction scoring, trailing stops and the
+SignalStateTracker spam filter. Reports trades, P/L, drawdown and alert counts.
+
+The moving average and the threshold tests run over the whole series at once
+(NumPy when installed), so only ticks that can actually produce a BUY/SELL go through
+the per-tick decision code. That keeps years of minute data fast to replay.
+
+Usage:
+    python backtester.py data/historical_BTC.json [state_btc.txt] [ma_window]
+"""
+
+import heapq
+import json
+import math
+import os
+import sys
+from datetime import datetime
+
+import yaml
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - pure-Python fallback below
+    np = None
+
+from decision_engine import compile_thresholds, evaluate_compiled
+from modules.pattern_analyzer import calculate_rsi, score_buy_signal, score_sell_signal
+from modules.signal_state_tracker import SignalStateTracker
+from modules.history_cache import HistoryCache, is_history_cache
+from modules.tick_store import read_ticks
+from modules.trailing_stop_manager import DUST, get_trailing_pct_map, simulate_trailing_stops
+
+RSI_PERIOD = 14
+MASK_TOLERANCE = 1e-9  # Relative slack so the vectorized pre-filter never drops a real signal
+
+
+def load_price_series(path):
+    """
+    Load a price series for backtesting.
+
+    Args:
+        path: Tick file (.bin), historical data cache (historical_*.bin), or CoinGecko
+              JSON (legacy historical_*.json cache, raw market_chart response, or
+              legacy [{price, timestamp}, ...] history)
+
+    Returns:
+        (timestamps, prices): lists of epoch seconds and prices, oldest first
+    """
+    if is_history_cache(path):
+        cache = HistoryCache(path)
+        return [t / 1000 for t in cache.timestamps], cache.prices.tolist()
+
+    if path.endswith('.bin'):
+        ticks = read_ticks(path)
+        return [t for t, _ in ticks], [p for _, p in ticks]
+
+    with open(path) as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        data = data.get('data', data).get('prices', [])
+
+    timestamps = []
+    prices = []
+    for entry in data:
+        if isinstance(entry, dict):
+            timestamps.append(datetime.fromisoformat(entry['timestamp']).timestamp())
+            prices.append(float(entry['price']))
+        else:
+            timestamps.append(entry[0] / 1000)  # CoinGecko uses milliseconds
+            prices.append(float(entry[1]))
+
+    return timestamps, prices
+
+
+def _moving_average(prices, window):
+    """Rolling mean (None/NaN until the window is full) - only used to pre-filter ticks."""
+    n = len(prices)
+    if np is not None:
+        ma = np.full(n, np.nan)
+        if n >= window:
+            sums = np.cumsum(np.concatenate(([0.0], prices)))
+            ma[window - 1:] = (sums[window:] - sums[:-window]) / window
+        return ma
+
+    ma = [None] * n
+    total = 0.0
+    for i, price in enumerate(prices):
+        total += price
+        if i >= window:
+            total -= prices[i - window]
+        if i >= window - 1:
+            ma[i] = total / window
+    return ma
+
+
+def _signal_levels(thresholds):
+    """
+    Loosest price/MA ratios at which evaluate() can return a SELL or a BUY.
+
+    Returns:
+        (sell_level, buy_level): SELL needs price >= MA * sell_level, BUY needs price <= MA * buy_level
+    """
+    sell_level = math.inf
+    if thresholds['sell_steps']:
+        sell_factor = min(step[0] for step in thresholds['sell_steps'])
+        sell_level = max(thresholds['hold_upper'], sell_factor * thresholds['sell_buffer'], 1.0)
+
+    buy_level = -math.inf
+    if thresholds['buy_steps']:
+        buy_factor = max(step[0] for step in thresholds['buy_steps'])
+        buy_level = min(thresholds['hold_lower'], buy_factor * thresholds['buy_buffer'], 1.0)
+
+    return sell_level, buy_level
+
+
+def _candidate_ticks(prices, ma, thresholds, start):
+    """
+    Indexes of ticks (from `start`) where evaluate() could return a BUY or SELL.
+
+    Everything else lands in the HOLD band or between the band and the first step,
+    so it can be skipped without changing the result.
+    """
+    sell_level, buy_level = _signal_levels(thresholds)
+    sell_level *= 1 - MASK_TOLERANCE
+    buy_level *= 1 + MASK_TOLERANCE
+
+    if np is not None:
+        p = prices[start:]
+        m = ma[start:]
+        mask = (p >= m * sell_level) | (p <= m * buy_level)
+        return (np.flatnonzero(mask) + start).tolist()
+
+    return [
+        i for i in range(start, len(prices))
+        if prices[i] >= ma[i] * sell_level or prices[i] <= ma[i] * buy_level
+    ]
+
+
+def _equity_stats(prices, events, balance, cash):
+    """
+    Max drawdown of portfolio value (cash + balance * price) over the whole series.
+
+    Args:
+        prices: Price series
+        events: (index, balance, cash) after each trade, in order
+        balance, cash: Holdings before the first trade
+
+    Returns:
+        float: Max drawdown in percent
+    """
+    if np is not None:
+        n = len(prices)
+        balances = np.full(n, float(balance))
+        cashes = np.full(n, float(cash))
+        # Later events at the same tick overwrite earlier ones
+        for index, bal, csh in events:
+            balances[index] = bal
+            cashes[index] = csh
+        changed = np.zeros(n, dtype=bool)
+        changed[[e[0] for e in events]] = True
+        # Carry holdings forward from the last trade
+        last = np.maximum.accumulate(np.where(changed, np.arange(n), -1))
+        held = last >= 0
+        balances[held] = balances[last[held]]
+        cashes[held] = cashes[last[held]]
+        equity = cashes + balances * prices
+        peaks = np.maximum.accumulate(equity)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdowns = np.where(peaks > 0, (peaks - equity) / peaks, 0.0)
+        return round(float(drawdowns.max()) * 100, 2) if n else 0.0
+
+    max_drawdown = 0.0
+    peak = 0.0
+    event_iter = iter(events)
+    next_event = next(event_iter, None)
+    for i, price in enumerate(prices):
+        while next_event is not None and next_event[0] == i:
+            _, balance, cash = next_event
+            next_event = next(event_iter, None)
+        equity = cash + balance * price
+        peak = max(peak, equity)
+        if peak > 0:
+            max_drawdown = max(max_drawdown, (peak - equity) / peak)
+    return round(max_drawdown * 100, 2)
+
+
+def _sell_lots(lots, amount):
+    """Take a sold amount off the lots, oldest first (TrailingStopManager.record_sell)."""
+    for lot_id in list(lots):
+        if amount <= 0:
+            break
+        if lots[lot_id] - amount > DUST:
+            lots[lot_id] -= amount
+            break
+        amount -= lots.pop(lot_id)
+
+
+def run_backtest(prices, config, balance=0.0, cash=0.0, cost_basis=None, timestamps=None,
+                 ma_window=None, historical_analysis=None, sell_on_trailing_stop=False,
+                 initial_signal='HOLD'):
+    """
+    Replay a price series through the live decision pipeline.
+
+    Args:
+        prices: Price series, oldest first (one entry per main-loop iteration)
+        config: Parsed config.yaml dict (steps, buffers, hold band, MA window, trailing stops)
+        balance: Starting crypto balance
+        cash: Starting HKD cash
+        cost_basis: Starting cost basis (required when balance > 0; None = no position)
+        timestamps: Optional epoch seconds per price (copied into trades)
+        ma_window: MA length (default: config 'moving_average_window', 100)
+        historical_analysis: analyze_price_action() result used for conviction scores,
+                             S/R levels and trailing-stop volatility (None = defaults, as in main.py)
+        sell_on_trailing_stop: Sell a lot when its trailing stop fires (False = count the hit only)
+        initial_signal: Previous signal seeded into the spam filter (None = fresh tracker,
+                        which holds back every alert as "first signal")
+
+    Returns:
+        dict with trades, counts, P/L and drawdown
+    
+    Raises:
+        ValueError: balance > 0 without a cost_basis
+    """
+    if balance > 0 and not cost_basis:
+        raise ValueError("A starting balance needs a cost_basis (main.py doesn't record buys without one)")
+    ma_window = ma_window or config.get('moving_average_window', 100)
+    thresholds = compile_thresholds(config)
+
+    if np is not None:
+        prices = np.asarray(prices, dtype=float)
+    else:
+        prices = [float(p) for p in prices]
+    n = len(prices)
+
+    # Same context main.py derives from historical analysis
+    volatility_level = 'moderate'
+    support_level = None
+    resistance_level = None
+    trend_direction = 'sideways'
+    percentile = 50
+    if historical_analysis:
+        volatility_level = historical_analysis.get('volatility', {}).get('vol_level', 'moderate')
+        sr_data = historical_analysis.get('support_resistance', {})
+        support_level = sr_data.get('support')
+        resistance_level = sr_data.get('resistance')
+        trend_direction = historical_analysis.get('trend', {}).get('trend', 'sideways')
+        percentile = historical_analysis.get('percentile', 50)
+    trailing_pct_map = get_trailing_pct_map(config.get('trailing_stops'))
+    trailing_pct = trailing_pct_map.get(volatility_level, trailing_pct_map['moderate'])
+
+    tracker = SignalStateTracker('backtest.txt', persist=False)
+    tracker.state['last_signal'] = initial_signal
+
+    start = ma_window - 1  # main.py evaluates once the MA window is full
+    candidates = _candidate_ticks(prices, _moving_average(prices, ma_window), thresholds, start) if n > start else []
+
+    start_balance, start_cash = balance, cash
+    start_value = cash + balance * float(prices[0]) if n else cash
+    realized_pnl = 0.0
+    trades = []
+    events = []
+    stops = []  # heap of (hit index, lot id)
+    lots = {}   # lot id -> amount still held, oldest first (as TrailingStopManager tracks them)
+    trailing_stop_hits = 0
+    alerts_sent = 0
+    alerts_suppressed = 0
+
+    def record(index, trade_type, price, amount, **extra):
+        trade = {
+            'index': index,
+            'timestamp': timestamps[index] if timestamps is not None else None,
+            'type': trade_type,
+            'price': round(price, 2),
+            'amount': round(amount, 8),
+            'value_hkd': round(amount * price, 2)
+        }
+        trade.update(extra)
+        trades.append(trade)
+        events.append((index, balance, cash))
+
+    next_candidate = 0
+    while next_candidate < len(candidates) or stops:
+        # Trailing stops are updated before the tick is evaluated
+        if stops and (next_candidate >= len(candidates) or stops[0][0] <= candidates[next_candidate]):
+            i, lot_id = heapq.heappop(stops)
+            lot_amount = lots.pop(lot_id, None)
+            if lot_amount is None:
+                continue  # Sold before its stop fired
+            price = float(prices[i])
+            trailing_stop_hits += 1
+            amount = min(lot_amount, balance)
+            if sell_on_trailing_stop and amount > 0:
+                balance -= amount
+                cash += amount * price
+                if cost_basis:
+                    realized_pnl += (price - cost_basis) * amount
+                if balance <= 1e-12:
+                    balance, cost_basis = 0.0, None
+                record(i, 'TRAILING_STOP', price, amount, lot=lot_id)
+            continue
+
+        i = candidates[next_candidate]
+        next_candidate += 1
+        price = float(prices[i])
+        window = prices[i - ma_window + 1:i + 1]
+        ref_price = math.fsum(window) / ma_window
+
+        decisions = evaluate_compiled(price, ref_price, balance, cash, thresholds, cost_basis)
+        if not decisions or decisions[0]['type'] == 'HOLD':
+            continue
+        decision = decisions[0]  # only one at a time
+
+        recent = prices[max(0, i - RSI_PERIOD):i + 1]
+        current_rsi = calculate_rsi(list(recent), RSI_PERIOD)
+
+        if decision['type'] == 'BUY':
+            conviction = 50  # Default
+            explanation = decision.get('reason', '')
+            if historical_analysis and current_rsi:
+                conviction = score_buy_signal(
+                    price=price,
+                    cost_basis=cost_basis,
+                    rsi=current_rsi,
+                    support=support_level,
+                    trend=trend_direction,
+                    percentile=percentile,
+                    volatility_level=volatility_level
+                )
+        else:
+            conviction, explanation = score_sell_signal(
+                price=price,
+                cost_basis=cost_basis,
+                peak_price=float(max(window)),
+                rsi=current_rsi,
+                resistance=resistance_level,
+                trend=trend_direction
+            )
+
+        should_send, reason, is_change = tracker.should_send_alert(decision['type'], conviction, price)
+        if should_send:
+            tracker.update_state(decision['type'], conviction, price, reason=reason)
+            alerts_sent += 1
+        else:
+            alerts_suppressed += 1
+
+        if decision['type'] == 'BUY':
+            amount_hkd = min(decision['amount_hkd'], cash)
+            amount = amount_hkd / price
+            # Weighted average cost basis
+            cost_basis = (balance * cost_basis + amount_hkd) / (balance + amount) if cost_basis and balance else price
+            balance += amount
+            cash -= amount_hkd
+            lot_id = len(trades)  # Index of the BUY trade
+            record(i, 'BUY', price, amount, conviction=conviction, alert=should_send, reason=explanation)
+
+            hit = simulate_trailing_stops(prices, [i], trailing_pct, cost_bases=[price])['exit_index'][0]
+            lots[lot_id] = amount
+            if hit is not None:
+                heapq.heappush(stops, (hit, lot_id))
+        else:
+            amount = min(decision['amount_eth'], balance)
+            balance -= amount
+            cash += amount * price
+            if cost_basis:
+                realized_pnl += (price - cost_basis) * amount
+            if balance <= 1e-12:
+                balance, cost_basis = 0.0, None
+            record(i, 'SELL', price, amount, conviction=conviction, alert=should_send, reason=explanation)
+            _sell_lots(lots, amount)
+
+    final_value = cash + balance * float(prices[-1]) if n else cash
+    pnl = final_value - start_value
+
+    return {
+        'ticks': n,
+        'evaluated': len(candidates),
+        'trades': trades,
+        'buys': sum(1 for t in trades if t['type'] == 'BUY'),
+        'sells': sum(1 for t in trades if t['type'] == 'SELL'),
+        'trailing_stop_hits': trailing_stop_hits,
+        'alerts_sent': alerts_sent,
+        'alerts_suppressed': alerts_suppressed,
+        'start_value': round(start_value, 2),
+        'final_value': round(final_value, 2),
+        'pnl': round(pnl, 2),
+        'pnl_pct': round(pnl / start_value * 100, 2) if start_value else 0.0,
+        'realized_pnl': round(realized_pnl, 2),
+        'max_drawdown_pct': _equity_stats(prices, events, start_balance, start_cash),
+        'final_balance': round(balance, 8),
+        'final_cash': round(cash, 2),
+        'final_cost_basis': round(cost_basis, 2) if cost_basis else None
+    }
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("Usage: python backtester.py <prices .json/.bin> [state file in data/] [ma_window]")
+        return
+
+    config = yaml.safe_load(open("config.yaml")) if os.path.exists("config.yaml") else {}
+    timestamps, prices = load_price_series(argv[1])
+
+    balance, cash, cost_basis = 0.0, 0.0, None
+    if len(argv) > 2:
+        from main import load_state
+        state = load_state(os.path.join("data", argv[2]))
+        balance = state.get('CURRENT_BALANCE', 0.0)
+        cash = state.get('AVAILABLE_CASH_HKD', 0.0)
+        cost_basis = state.get('COST_BASIS')
+    ma_window = int(argv[3]) if len(argv) > 3 else None
+
+    try:
+        result = run_backtest(prices, config, balance, cash, cost_basis, timestamps, ma_window)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return
+
+    print("\n" + "=" * 60)
+    print(f"BACKTEST: {argv[1]} ({result['ticks']:,} prices, {result['evaluated']:,} evaluated)")
+    print("=" * 60)
+    for trade in result['trades']:
+        when = datetime.fromtimestamp(trade['timestamp']).strftime('%Y-%m-%d %H:%M') if trade['timestamp'] else trade['index']
+        print(f"  {when} | {trade['type']:<13} @ {trade['price']:,.2f} HKD | {trade['amount']:.6f} ({trade['value_hkd']:,.2f} HKD)")
+    print(f"\nTrades: {result['buys']} buys, {result['sells']} sells, {result['trailing_stop_hits']} trailing stop hits")
+    print(f"Alerts: {result['alerts_sent']} sent, {result['alerts_suppressed']} suppressed by spam filter")
+    print(f"P/L: {result['pnl']:+,.2f} HKD ({result['pnl_pct']:+.2f}%) | Realized: {result['realized_pnl']:+,.2f} HKD")
+    print(f"Max drawdown: {result['max_drawdown_pct']:.2f}%")
+    print(f"Final: {result['final_balance']:.6f} + {result['final_cash']:,.2f} HKD")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
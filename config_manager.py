@@ -0,0 +1,148 @@
+"""
+Hot-reloadable config.yaml.
+The file is validated once per change and turned into precompiled decision
+thresholds (see decision_engine.compile_thresholds). The main loop calls
+reload_if_changed() every iteration; that costs a single stat() until the
+file is edited, and a bad edit keeps the last good config running.
+"""
+
+import os
+
+import yaml
+
+from decision_engine import compile_thresholds
+from modules.bar_store import TIMEFRAMES, DEFAULT_TIMEFRAMES
+
+# Settings that size in-memory structures at startup - changing them needs a restart
+RESTART_KEYS = ('moving_average_window', 'bars', 'trailing_atr')
+
+
+class ConfigError(ValueError):
+    """config.yaml failed validation."""
+
+
+def validate_config(config):
+    """
+    Check the settings the loop and decision engine rely on.
+
+    Args:
+        config: Parsed config.yaml dict
+
+    Raises:
+        ConfigError: Describing the first problem found
+    """
+    if not isinstance(config, dict):
+        raise ConfigError("config.yaml must be a mapping")
+
+    interval = config.get('check_interval_sec')
+    if not isinstance(interval, (int, float)) or interval <= 0:
+        raise ConfigError("check_interval_sec must be a positive number")
+
+    hold_band = config.get('hold_band_pct', 5)
+    if not isinstance(hold_band, (int, float)) or hold_band < 0:
+        raise ConfigError("hold_band_pct must be a number >= 0")
+
+    window = config.get('moving_average_window', 100)
+    if not isinstance(window, int) or window < 1:
+        raise ConfigError("moving_average_window must be a positive integer")
+
+    for timeframe in config.get('bars', {}).get('timeframes', []):
+        if timeframe not in TIMEFRAMES:
+            raise ConfigError(f"bars.timeframes: unknown timeframe '{timeframe}' (use {', '.join(TIMEFRAMES)})")
+
+    atr = config.get('trailing_atr', {})
+    if atr.get('enabled', False):
+        timeframe = atr.get('timeframe', '1h')
+        bars = config.get('bars', {})
+        if not bars.get('enabled', True) or timeframe not in bars.get('timeframes', DEFAULT_TIMEFRAMES):
+            raise ConfigError(f"trailing_atr.timeframe '{timeframe}' must be one of the enabled bars.timeframes")
+        period = atr.get('period', 14)
+        if not isinstance(period, int) or period < 1:
+            raise ConfigError("trailing_atr.period must be a positive integer")
+        multiplier = atr.get('multiplier', 2.0)
+        if not isinstance(multiplier, (int, float)) or multiplier <= 0:
+            raise ConfigError("trailing_atr.multiplier must be a positive number")
+
+    governor = config.get('telegram', {}).get('governor', {})
+    for key in ('rate_per_minute', 'burst'):
+        value = governor.get(key)
+        if value is not None and (not isinstance(value, (int, float)) or value <= 0):
+            raise ConfigError(f"telegram.governor.{key} must be a positive number")
+    for key in ('asset_cooldown_sec', 'digest_window_sec'):
+        value = governor.get(key)
+        if value is not None and (not isinstance(value, (int, float)) or value < 0):
+            raise ConfigError(f"telegram.governor.{key} must be a number >= 0")
+
+    for side in ('sell', 'buy'):
+        buffer = config.get('buffer', {}).get(side)
+        if buffer is not None and (not isinstance(buffer, (int, float)) or buffer <= 0):
+            raise ConfigError(f"buffer.{side} must be a positive number")
+
+        for i, step in enumerate(config.get(f'{side}_steps', [])):
+            trigger = step.get('trigger_pct') if isinstance(step, dict) else None
+            pct = step.get(f'{side}_pct') if isinstance(step, dict) else None
+            if not isinstance(trigger, (int, float)) or not isinstance(pct, (int, float)):
+                raise ConfigError(f"{side}_steps[{i}] needs numeric trigger_pct and {side}_pct")
+            if (side == 'sell' and trigger <= 0) or (side == 'buy' and not -100 < trigger < 0):
+                raise ConfigError(f"{side}_steps[{i}].trigger_pct has the wrong sign: {trigger}")
+            if not 0 < pct <= 1:
+                raise ConfigError(f"{side}_steps[{i}].{side}_pct must be in (0, 1]: {pct}")
+
+
+class ConfigManager:
+    """The current config, its compiled thresholds, and change detection for the file."""
+
+    def __init__(self, path="config.yaml"):
+        """
+        Load and validate the config (raises ConfigError/yaml.YAMLError if it is invalid).
+
+        Args:
+            path: Path to config.yaml
+        """
+        self.path = path
+        self._signature = None
+        self.config, self.thresholds = self._load()
+
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _load(self):
+        signature = self._stat_signature()
+        with open(self.path) as f:
+            config = yaml.safe_load(f)
+        validate_config(config)
+        thresholds = compile_thresholds(config)
+        self._signature = signature
+        return config, thresholds
+
+    def reload_if_changed(self):
+        """
+        Reload config.yaml if it changed on disk.
+
+        Returns:
+            bool: True if a new config was applied
+        """
+        try:
+            if self._stat_signature() == self._signature:
+                return False
+            config, thresholds = self._load()
+        except (OSError, yaml.YAMLError, ConfigError) as e:
+            # Keep running on the last good config; don't warn again until the file changes
+            try:
+                self._signature = self._stat_signature()
+            except OSError:
+                pass
+            print(f"[CONFIG] Reload failed, keeping previous config: {e}")
+            return False
+
+        for key in RESTART_KEYS:
+            if config.get(key) != self.config.get(key):
+                print(f"[CONFIG] {key} changed - takes effect after a restart")
+                if key in self.config:
+                    config[key] = self.config[key]
+                else:
+                    config.pop(key)
+
+        self.config, self.thresholds = config, thresholds
+        return True
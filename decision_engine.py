@@ -5,11 +5,50 @@ from modules.pattern_analyzer import (
 )
 
 
+def compile_thresholds(config):
+    """
+    Pre-compute everything evaluate() reads from config, so the per-tick path
+    does no nested dict lookups (used by the backtester for whole series).
+    
+    Returns:
+        dict with hold band multipliers, buffers and (step_factor, trigger_pct, pct, config_index)
+        step tables sorted from the first step to trigger to the last (sells by rising factor,
+        buys by falling factor)
+    """
+    hold_band_pct = config.get("hold_band_pct", 5)
+    hold_band = hold_band_pct / 100  # Convert to decimal (default ±5%)
+    
+    return {
+        "hold_band_pct": hold_band_pct,
+        "hold_lower": 1 - hold_band,
+        "hold_upper": 1 + hold_band,
+        "min_profit": config.get('buy_strategy', {}).get('min_profit_threshold', 0.005),
+        "sell_buffer": config.get("buffer", {}).get("sell", 1.015),
+        "buy_buffer": config.get("buffer", {}).get("buy", 0.985),
+        "sell_steps": sorted(
+            (1 + step["trigger_pct"] / 100, step["trigger_pct"], step["sell_pct"], index)
+            for index, step in enumerate(config.get("sell_steps", []))
+        ),
+        "buy_steps": sorted(
+            ((1 + step["trigger_pct"] / 100, step["trigger_pct"], step["buy_pct"], index)
+             for index, step in enumerate(config.get("buy_steps", []))),
+            key=lambda step: (-step[0], step[3])
+        )
+    }
+
+
 def evaluate(price, ref_price, balance, cash, config, cost_basis=None):
     """
     Evaluate trading signals using multi-factor analysis.
     New intelligent system that scores buy/sell decisions.
     """
+    return evaluate_compiled(price, ref_price, balance, cash, compile_thresholds(config), cost_basis)
+
+
+def evaluate_compiled(price, ref_price, balance, cash, thresholds, cost_basis=None):
+    """
+    Same as evaluate(), with thresholds from compile_thresholds().
+    """
     decisions = []
     
     # If reference price is not available yet, no trading signals
@@ -17,14 +56,13 @@ def evaluate(price, ref_price, balance, cash, config, cost_basis=None):
         return decisions
 
     # HOLD LOGIC - Check if price is in neutral band first
-    hold_band = config.get("hold_band_pct", 5) / 100  # Convert to decimal (default ±5%)
-    hold_lower = ref_price * (1 - hold_band)
-    hold_upper = ref_price * (1 + hold_band)
+    hold_lower = ref_price * thresholds["hold_lower"]
+    hold_upper = ref_price * thresholds["hold_upper"]
     
     if hold_lower <= price <= hold_upper:
         decisions.append({
             "type": "HOLD",
-            "reason": f"Price within ±{config.get('hold_band_pct', 5)}% neutral band",
+            "reason": f"Price within ±{thresholds['hold_band_pct']}% neutral band",
             "price": round(price, 2)
         })
         return decisions  # Exit early, no buy/sell when in HOLD zone
@@ -32,44 +70,55 @@ def evaluate(price, ref_price, balance, cash, config, cost_basis=None):
     # SELL LOGIC - Intelligent profit taking
     if ref_price and price > ref_price:
         profit_pct = ((price - cost_basis) / cost_basis * 100) if cost_basis else 0
-        min_profit = config.get('buy_strategy', {}).get('min_profit_threshold', 0.005)
+        min_profit = thresholds["min_profit"]
         
         if cost_basis and price <= cost_basis * (1 + min_profit):
             # Not enough profit yet
             pass
         else:
             # Use traditional steps for legacy support
-            for step in config.get("sell_steps", []):
-                trigger_price = ref_price * (1 + step["trigger_pct"] / 100) * config.get("buffer", {}).get("sell", 1.015)
+            # Steps are sorted, so stop at the first one that isn't reached
+            triggered = []
+            for step_factor, trigger_pct, sell_pct, index in thresholds["sell_steps"]:
+                trigger_price = ref_price * step_factor * thresholds["sell_buffer"]
                 
-                if price >= trigger_price and balance > 0:
-                    decisions.append({
-                        "type": "SELL",
-                        "amount_eth": round(balance * step["sell_pct"], 6),
-                        "trigger_pct": step["trigger_pct"],
-                        "price": round(price, 2),
-                        "cost_basis": cost_basis,
-                        "profit_pct": round(profit_pct, 2),
-                        "reason": f"Profit taking: +{profit_pct:.1f}%"
-                    })
+                if price < trigger_price or balance <= 0:
+                    break
+                triggered.append((index, trigger_pct, sell_pct))
+            
+            # Report in config order, as before
+            for index, trigger_pct, sell_pct in sorted(triggered):
+                decisions.append({
+                    "type": "SELL",
+                    "amount_eth": round(balance * sell_pct, 6),
+                    "trigger_pct": trigger_pct,
+                    "price": round(price, 2),
+                    "cost_basis": cost_basis,
+                    "profit_pct": round(profit_pct, 2),
+                    "reason": f"Profit taking: +{profit_pct:.1f}%"
+                })
 
     # BUY LOGIC - Intelligent buying based on conviction score
     if ref_price and price < ref_price:
         # For now, use traditional buy steps
         # In enhanced version with historical data, this will use conviction scoring
-        for step in config.get("buy_steps", []):
-            trigger_price = ref_price * (1 + step["trigger_pct"] / 100) * config.get("buffer", {}).get("buy", 0.985)
+        triggered = []
+        for step_factor, trigger_pct, buy_pct, index in thresholds["buy_steps"]:
+            trigger_price = ref_price * step_factor * thresholds["buy_buffer"]
             
-            if price <= trigger_price and cash > 0:
-                loss_pct = ((price - cost_basis) / cost_basis * 100) if cost_basis else 0
-                decisions.append({
-                    "type": "BUY",
-                    "amount_hkd": round(cash * step["buy_pct"], 2),
-                    "trigger_pct": step["trigger_pct"],
-                    "price": round(price, 2),
-                    "loss_pct": round(loss_pct, 2),
-                    "reason": f"Average down: {loss_pct:.1f}%"
-                })
+            if price > trigger_price or cash <= 0:
+                break
+            triggered.append((index, trigger_pct, buy_pct))
+        
+        for index, trigger_pct, buy_pct in sorted(triggered):
+            loss_pct = ((price - cost_basis) / cost_basis * 100) if cost_basis else 0
+            decisions.append({
+                "type": "BUY",
+                "amount_hkd": round(cash * buy_pct, 2),
+                "trigger_pct": trigger_pct,
+                "price": round(price, 2),
+                "loss_pct": round(loss_pct, 2),
+                "reason": f"Average down: {loss_pct:.1f}%"
+            })
 
     return decisions
-
@@ -1,380 +1,766 @@
 import time
-import yaml
 import sys
 import os
-from price_fetcher import get_price
-from decision_engine import evaluate
+import json
+from price_fetcher import get_prices, get_coingecko_id
+from decision_engine import evaluate_compiled, compile_thresholds
 from modules.notifier_telegram import send_telegram_message, format_alert
-from utils_core import load_pending, save_pending, add_price_to_history, calculate_moving_average, get_current_timestamp, check_time_gap, clear_price_history
-from modules.historical_analyzer import fetch_historical_data, analyze_price_action
-from modules.trailing_stop_manager import TrailingStopManager
-from modules.pattern_analyzer import calculate_rsi, detect_capitulation, generate_buy_conviction_score, generate_sell_signal_with_explanation
+from utils_core import load_pending, save_pending, add_price_to_history, calculate_moving_average, get_current_timestamp, check_time_gap, clear_price_history, get_price_history_file, set_price_window_size, calculate_days_to_breakeven, get_tick_store, get_bar_file_prefix, update_cost_basis_after_buy, update_balance_after_sell, log_trade, bridge_price_gap, backfill_price_history
+from modules.historical_analyzer import fetch_historical_data, fetch_recent_prices, fetch_ohlc
+from modules.analysis_cache import get_analysis_cache
+from modules.trailing_stop_manager import TrailingStopManager, get_trailing_pct_map
+from modules.pattern_analyzer import score_buy_signal, score_sell_signal, StreamingRSI, StreamingMACD, StreamingATR
 from modules.signal_state_tracker import SignalStateTracker
+from modules.http_session import configure_http
+from config_manager import ConfigManager
+from modules.state_store import get_state_store
+from modules.latency import get_latency_tracker
+from modules.metrics import get_metrics, start_metrics_server
+from modules.range_extrema import PriceRangeIndex, DEFAULT_LEVEL_WINDOWS
+from modules.bar_store import BarBuilder, DEFAULT_TIMEFRAMES, TIMEFRAMES, resample_bars
+from modules.telegram_queue import TelegramDeliveryQueue, DEFAULT_SPOOL_DIR, DEFAULT_QUEUE_SIZE
+from modules.alert_governor import AlertGovernor, DEFAULT_RATE_PER_MINUTE, DEFAULT_BURST, DEFAULT_COOLDOWN, DEFAULT_WINDOW
 
 # Fix encoding for Windows terminal
 if sys.stdout.encoding != 'utf-8':
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-# Get state file from command line argument, default to data/state.txt
-STATE_FILE = os.path.join("data", sys.argv[1]) if len(sys.argv) > 1 else "data/state.txt"
-PRICE_HISTORY_FILE_BASE = os.path.join("data", sys.argv[1].replace('.txt', '')) if len(sys.argv) > 1 else "data/state"
-
-def load_state():
-    state = {}
-    with open(STATE_FILE) as f:
-        for line in f:
-            k, v = line.strip().split("=")
-            # Convert to float for numeric values, keep as string otherwise
-            try:
-                state[k] = float(v)
-            except ValueError:
-                state[k] = v
-    return state
-
-config = yaml.safe_load(open("config.yaml"))
-
-print("[STARTUP] Crypto Notifier - Advanced Multi-Factor Analysis")
-print(f"[INFO] Interval: {config['check_interval_sec']}s | Hold Band: ±{config['hold_band_pct']}% | MA Ready at: 100 iterations")
-print(f"[INFO] State File: {STATE_FILE}")
-print(f"[INFO] Features: Trailing Stops | Historical Data | Pattern Recognition | Multi-Factor Scoring")
-print("-" * 80)
+HISTORICAL_FETCH_INTERVAL = 3600  # Fetch historical data every 1 hour
+CHECKPOINT_EVERY = 10  # Persist ticks and indicator state every 10 iterations
+LATENCY_FILE = os.path.join("data", "latency.json")
+LATENCY_DUMP_EVERY = 60  # Write latency percentiles every 60 iterations
+# CoinGecko OHLC lookback used to seed the ATR per timeframe (30-minute candles for 2 days, 4-hour for 30)
+ATR_SEED_DAYS = {'1h': 2, '1d': 30}
 
-# Initialize price history file for this instance
-from utils_core import set_price_history_file
-set_price_history_file(PRICE_HISTORY_FILE_BASE)
 
-# Initialize trailing stop manager
-trailing_stop_manager = TrailingStopManager(STATE_FILE)
+def load_state(state_file):
+    # Parsed once and cached until the file changes on disk
+    return get_state_store(state_file).load()
 
-# Initialize signal state tracker (prevents duplicate messages)
-signal_tracker = SignalStateTracker(STATE_FILE)
 
-# Check for time gap on startup
-if check_time_gap():
-    print("[RESTART] Time gap detected - clearing stale price history")
-    clear_price_history()
+def governor_settings(config):
+    """AlertGovernor limits from the telegram.governor section of config.yaml."""
+    governor_config = config.get('telegram', {}).get('governor', {})
+    return {
+        'rate_per_minute': governor_config.get('rate_per_minute', DEFAULT_RATE_PER_MINUTE),
+        'burst': governor_config.get('burst', DEFAULT_BURST),
+        'cooldown': governor_config.get('asset_cooldown_sec', DEFAULT_COOLDOWN),
+        'window': governor_config.get('digest_window_sec', DEFAULT_WINDOW)
+    }
 
-iteration = 0
-last_historical_fetch = 0
-HISTORICAL_FETCH_INTERVAL = 3600  # Fetch historical data every 1 hour
 
-while True:
-    iteration += 1
-    
-    state = load_state()
-    asset = state["ASSET"]
-    cost_basis = state.get("COST_BASIS")  # Get cost basis if available
+class AssetMonitor:
+    """
+    Runs the monitoring loop body for one state file (one asset).
     
-    try:
-        price = get_price(asset)
-    except Exception as e:
-        print(f"[ERROR] {get_current_timestamp()} - Failed to fetch price: {e}")
-        time.sleep(config["check_interval_sec"])
-        continue
-
-    # Add price to history and get moving average
-    prices = add_price_to_history(price)
-    moving_avg = calculate_moving_average(prices)
-    num_prices = len(prices)
+    Each monitor keeps its own trailing stops, signal tracker, price history
+    and iteration counter, so several assets can share one process and loop.
+    """
     
-    # Fetch historical data periodically for pattern analysis
-    historical_analysis = None
-    current_time = time.time()
+    def __init__(self, state_file, config, notifier=None, governor=None):
+        """
+        Initialize monitor.
+        
+        Args:
+            state_file: Path to state file (e.g., 'data/state.txt' or 'data/state_btc.txt')
+            config: Parsed config.yaml dict
+            notifier: Shared TelegramDeliveryQueue (None = send synchronously)
+            governor: Shared AlertGovernor that rate-limits and coalesces alerts (None = send each one)
+        """
+        self.state_file = state_file
+        self.config = config
+        self.thresholds = compile_thresholds(config)
+        self.notifier = notifier
+        self.governor = governor
+        self.latency = get_latency_tracker()
+        self.metrics = get_metrics()
+        self.ma_window = config.get('moving_average_window', 100)
+        self.price_history_file = get_price_history_file(state_file)
+        
+        # Initialize trailing stop manager (trails by ATR instead of a percentage if enabled)
+        atr_config = config.get('trailing_atr', {})
+        self.trailing_stop_manager = TrailingStopManager(
+            state_file, config.get('trailing_stops'),
+            trail_mode='atr' if atr_config.get('enabled', False) else 'pct',
+            atr_multiplier=atr_config.get('multiplier', 2.0))
+        
+        # Initialize signal state tracker (prevents duplicate messages)
+        self.signal_tracker = SignalStateTracker(state_file)
+        
+        # Check for time gap on startup
+        self.warm_start = config.get('warm_start', {}).get('enabled', True)
+        self.gap_pending = False
+        if check_time_gap(self.price_history_file):
+            if self.warm_start:
+                # Bridged or backfilled on the first tick, once the current price is known
+                self.gap_pending = True
+            else:
+                print("[RESTART] Time gap detected - clearing stale price history")
+                clear_price_history(self.price_history_file)
+        
+        # OHLC bars per timeframe, built from the live ticks (see modules/bar_store.py)
+        bars_config = config.get('bars', {})
+        self.bars = None
+        if bars_config.get('enabled', True):
+            self.bars = BarBuilder(get_bar_file_prefix(state_file),
+                                   bars_config.get('timeframes', DEFAULT_TIMEFRAMES),
+                                   bars_config.get('retain'))
+        
+        # Wilder ATR over closed bars of one timeframe, for the ATR trail
+        self.atr_timeframe = atr_config.get('timeframe', '1h')
+        self.atr_period = atr_config.get('period', 14)
+        self.atr_enabled = (atr_config.get('enabled', False) and self.bars is not None
+                            and self.atr_timeframe in self.bars.series)
+        
+        # Streaming indicators (O(1) per tick), restored from the last checkpoint
+        self.indicators_file = state_file.replace('.txt', '_indicators.json')
+        self.load_indicators()
+        
+        self.iteration = 0
+        self.last_historical_fetch = 0
+        # Range min/max over the historical series plus live ticks (multi-window S/R levels)
+        self.range_index = None
+        # Last historical analysis, kept between refreshes for conviction scoring
+        self.historical_analysis = None
+        self.analysis_cache = get_analysis_cache()
+        # Stored ticks that count towards the MA warm-up (warm start only)
+        self.warm_ticks = len(get_tick_store(self.price_history_file).window) if self.warm_start and not self.gap_pending else 0
     
-    if iteration >= 100 and config.get('historical_data', {}).get('enabled', True):
-        if current_time - last_historical_fetch > HISTORICAL_FETCH_INTERVAL:
-            try:
-                asset_id = 'ethereum' if asset.lower() == 'eth' else 'bitcoin'
-                cache_file = f'historical_{asset}.json'
-                data = fetch_historical_data(asset_id, days=90, cache_file=cache_file)
-                
-                if data:
-                    historical_analysis = analyze_price_action(data.get('prices', []))
-                    last_historical_fetch = current_time
-                    print(f"[{get_current_timestamp()}] Historical data refreshed (90-day analysis)")
-            except Exception as e:
-                print(f"[WARNING] Historical data fetch failed: {e}")
+    def load_state(self):
+        return load_state(self.state_file)
     
-    # Calculate RSI and other technical indicators
-    current_rsi = None
-    volumes_data = []
+    def apply_config(self, config, thresholds):
+        """Switch to a reloaded config (price history and indicators are kept)."""
+        self.config = config
+        self.thresholds = thresholds
+        self.trailing_stop_manager.trailing_pct_map = get_trailing_pct_map(config.get('trailing_stops'))
     
-    if num_prices >= 14:
-        price_list = [p['price'] if isinstance(p, dict) else p for p in prices]
-        current_rsi = calculate_rsi(price_list, period=14)
+    def signals_ready(self):
+        """True once the MA window is full of ticks from this run (or warm-started history)."""
+        return self.iteration + self.warm_ticks >= self.ma_window
     
-    # Extract volatility and trend info from historical analysis
-    volatility_level = 'moderate'
-    support_level = None
-    resistance_level = None
-    trend_direction = 'sideways'
-    percentile = 50
-    volume_signal = 'normal'
+    def fill_gap(self, asset, price):
+        """
+        Warm start after a restart gap: interpolate short gaps from the tick store, backfill
+        long ones from CoinGecko, and fall back to clearing the history if neither works.
+        """
+        self.gap_pending = False
+        store = get_tick_store(self.price_history_file)
+        warm_config = self.config.get('warm_start', {})
+        interval = self.config['check_interval_sec']
+        gap = time.time() - store.last()[0]
+        
+        added = 0
+        if gap <= warm_config.get('max_interpolate_gap', 1800):
+            added = bridge_price_gap(price, interval, self.price_history_file)
+            print(f"[RESTART] {gap / 60:.0f} min gap bridged with {added} interpolated prices")
+        else:
+            points = fetch_recent_prices(get_coingecko_id(asset), days=1)
+            if points:
+                added = backfill_price_history(points, interval, self.price_history_file)
+                print(f"[RESTART] {gap / 60:.0f} min gap - MA window backfilled from CoinGecko ({added} prices)")
+            else:
+                print("[RESTART] Time gap detected - clearing stale price history")
+                clear_price_history(self.price_history_file)
+        
+        # Indicators were built from the old window
+        self.load_indicators()
+        self.warm_ticks = len(store.window)
     
-    if historical_analysis:
-        vol_data = historical_analysis.get('volatility', {})
-        volatility_level = vol_data.get('vol_level', 'moderate')
+    def load_indicators(self):
+        """Restore RSI/MACD/ATR saved at the last checkpoint, or rebuild them from the price window (and bars)."""
+        window = get_tick_store(self.price_history_file).window
+        last_tick = window.last_tick()
         
-        sr_data = historical_analysis.get('support_resistance', {})
-        support_level = sr_data.get('support')
-        resistance_level = sr_data.get('resistance')
+        if last_tick and os.path.exists(self.indicators_file):
+            try:
+                with open(self.indicators_file) as f:
+                    saved = json.load(f)
+                # Only valid if no ticks were added or dropped after it was saved
+                if saved.get('last_timestamp') == last_tick[0]:
+                    self.rsi = StreamingRSI.from_dict(saved['rsi'])
+                    self.macd = StreamingMACD.from_dict(saved['macd'])
+                    self.load_atr(saved.get('atr'))
+                    return
+            except (json.JSONDecodeError, IOError, KeyError):
+                pass
         
-        trend_data = historical_analysis.get('trend', {})
-        trend_direction = trend_data.get('trend', 'sideways')
+        self.load_atr(None)
+        self.rsi = StreamingRSI(period=14)
+        self.macd = StreamingMACD()
+        for _, price in window:
+            self.rsi.update(price)
+            self.macd.update(price)
+    
+    def load_atr(self, saved):
+        """Restore the ATR saved at the last checkpoint, or rebuild it from bars on the next tick."""
+        self.atr = None
+        self.atr_pending = False
+        if not self.atr_enabled:
+            return
+        if saved and saved.get('period') == self.atr_period:
+            self.atr = StreamingATR.from_dict(saved)
+        else:
+            self.atr = StreamingATR(self.atr_period)
+            self.atr_pending = True
+    
+    def seed_atr(self, asset):
+        """
+        Build the ATR from the stored closed bars. With fewer than period + 1 bars, older
+        bars are filled in from CoinGecko OHLC candles (1h and 1d timeframes only).
+        """
+        self.atr_pending = False
+        bars = self.bars.bars(self.atr_timeframe, include_current=False)
+        if len(bars) <= self.atr_period and self.atr_timeframe in ATR_SEED_DAYS:
+            candles = fetch_ohlc(get_coingecko_id(asset), days=ATR_SEED_DAYS[self.atr_timeframe])
+            if candles:
+                # Only whole periods before the first local bar (the first and newest periods may be partial)
+                interval = TIMEFRAMES[self.atr_timeframe]
+                stored = self.bars.bars(self.atr_timeframe, 1 + len(bars))
+                cutoff = time.time() // interval * interval
+                if stored:
+                    cutoff = min(cutoff, stored[0][0])
+                older = [bar for bar in resample_bars(candles, interval)[1:] if bar[0] < cutoff]
+                bars = older + bars
         
-        percentile = historical_analysis.get('percentile', 50)
+        for bar in bars:
+            self.atr.update_bar(bar)
+        if self.atr.value is not None:
+            print(f"[INFO] ATR({self.atr_period}, {self.atr_timeframe}) seeded from {len(bars)} bars: {self.atr.value:,.2f}")
     
-    # Clean output - only essential info
-    timestamp = get_current_timestamp()
+    def checkpoint(self):
+        """Write buffered ticks, bars and indicator state to disk."""
+        store = get_tick_store(self.price_history_file)
+        store.flush()
+        if self.bars:
+            self.bars.flush()
+        last_tick = store.last()
+        
+        with open(self.indicators_file, 'w') as f:
+            json.dump({
+                'last_timestamp': last_tick[0] if last_tick else None,
+                'rsi': self.rsi.to_dict(),
+                'macd': self.macd.to_dict(),
+                'atr': self.atr.to_dict() if self.atr else None
+            }, f)
+
+    def notify(self, message):
+        """Send a Telegram message (queued when a delivery queue is running)."""
+        if self.notifier:
+            self.notifier.enqueue(self.config['telegram']['chat_id'], message)
+        else:
+            send_telegram_message(
+                self.config['telegram']['bot_token'],
+                self.config['telegram']['chat_id'],
+                message
+            )
+
+    def alert(self, asset, alert_type, data):
+        """Send a BUY/SELL alert, through the governor when there is one."""
+        if self.governor:
+            self.governor.submit(self.config['telegram']['chat_id'], asset, alert_type, data)
+        else:
+            self.notify(format_alert(alert_type, data))
+            self.metrics.inc('telegram_messages_total')
     
-    if num_prices < 100:
-        # Before MA is ready - minimal output
-        pct_collected = round((num_prices / 100) * 100, 1)
-        print(f"[{timestamp}] ITER {iteration} | Price: {price:,.2f} HKD | MA Status: {pct_collected}% ({num_prices}/100)")
-    else:
-        # After MA is ready - show detailed info with P/L and technical analysis
-        pct_change = ((price - moving_avg) / moving_avg) * 100
-        portfolio_value = (state['CURRENT_BALANCE'] * price) + state['AVAILABLE_CASH_HKD']
-        
-        # Calculate unrealized P/L
-        unrealized_pnl = None
-        unrealized_pnl_pct = None
-        days_to_breakeven = None
-        
-        if cost_basis:
-            unrealized_pnl = (price - cost_basis) * state['CURRENT_BALANCE']
-            unrealized_pnl_pct = ((price - cost_basis) / cost_basis) * 100
+    def tick(self, state, price, fetch_error=None):
+        """
+        Run one iteration: update history, print status and act on signals.
+        
+        Args:
+            state: Parsed state file (see load_state)
+            price: Current price for state["ASSET"], None if the fetch failed
+            fetch_error: Error message when the price could not be fetched
+        """
+        self.iteration += 1
+        
+        asset = state["ASSET"]
+        cost_basis = state.get("COST_BASIS")  # Get cost basis if available
+        
+        if fetch_error is not None:
+            self.metrics.inc('fetch_failures_total', asset=asset)
+            print(f"[ERROR] {get_current_timestamp()} - Failed to fetch price: {fetch_error}")
+            return
+        self.metrics.inc('ticks_total', asset=asset)
+
+        if self.gap_pending:
+            self.fill_gap(asset, price)
+        
+        # Add price to history and get moving average (O(1) rolling window)
+        with self.latency.stage(asset, 'history_append'):
+            window = add_price_to_history(price, self.price_history_file)
+            moving_avg = calculate_moving_average(window)
+            num_prices = len(window)
+            if self.bars:
+                if self.atr_pending:
+                    self.seed_atr(asset)
+                closed = self.bars.update(window.last_tick()[0], price)
+                if self.atr and self.atr_timeframe in closed:
+                    self.atr.update_bar(closed[self.atr_timeframe])
+        
+        # Update streaming indicators with this price
+        with self.latency.stage(asset, 'indicators'):
+            rsi_value = self.rsi.update(price)
+            macd_data = self.macd.update(price)
+        
+        if self.iteration % CHECKPOINT_EVERY == 0:
+            self.checkpoint()
+        
+        # Fetch historical data periodically for pattern analysis
+        current_time = time.time()
+        
+        if self.signals_ready() and self.config.get('historical_data', {}).get('enabled', True):
+            if current_time - self.last_historical_fetch > HISTORICAL_FETCH_INTERVAL:
+                try:
+                    asset_id = get_coingecko_id(asset)
+                    cache_file = f'historical_{asset}.bin'
+                    lookback = self.config.get('historical_data', {}).get('lookback_days', 90)
+                    with self.latency.stage(asset, 'historical_fetch'):
+                        # Incremental: only the days missing from the cache are downloaded
+                        data = fetch_historical_data(asset_id, days=lookback, cache_file=cache_file)
+                    
+                    if data:
+                        with self.latency.stage(asset, 'historical_analysis'):
+                            self.range_index = PriceRangeIndex(data.get('prices', []))
+                            # Memoized: unchanged data is not re-analyzed, new data only updates the changed tail
+                            self.historical_analysis = self.analysis_cache.analyze(
+                                asset, data.get('prices', []), index=self.range_index)
+                        self.last_historical_fetch = current_time
+                        print(f"[{get_current_timestamp()}] Historical data refreshed ({lookback}-day analysis)")
+                except Exception as e:
+                    print(f"[WARNING] Historical data fetch failed: {e}")
+        
+        historical_analysis = self.historical_analysis
+        
+        # Support/resistance over several windows: O(log n) to add the tick, O(1) per window
+        if self.range_index is not None:
+            with self.latency.stage(asset, 'levels'):
+                self.range_index.append(current_time * 1000, price)
+                windows = self.config.get('historical_data', {}).get('level_windows', DEFAULT_LEVEL_WINDOWS)
+                for days, level in self.range_index.levels(windows).items():
+                    self.metrics.set('support_hkd', level['support'], asset=asset, window=f'{days}d')
+                    self.metrics.set('resistance_hkd', level['resistance'], asset=asset, window=f'{days}d')
+        
+        # RSI and other technical indicators (None until 15 prices were seen)
+        current_rsi = rsi_value
+        
+        self.metrics.set('price_hkd', price, asset=asset)
+        self.metrics.set('moving_average_hkd', moving_avg, asset=asset)
+        if current_rsi is not None:
+            self.metrics.set('rsi', current_rsi, asset=asset)
+        
+        # Extract volatility and trend info from historical analysis
+        volatility_level = 'moderate'
+        support_level = None
+        resistance_level = None
+        trend_direction = 'sideways'
+        percentile = 50
+        volume_signal = 'normal'
+        
+        if historical_analysis:
+            vol_data = historical_analysis.get('volatility', {})
+            volatility_level = vol_data.get('vol_level', 'moderate')
+            
+            sr_data = historical_analysis.get('support_resistance', {})
+            support_level = sr_data.get('support')
+            resistance_level = sr_data.get('resistance')
             
-            # Estimate days to breakeven based on MA trend
-            if num_prices >= 20:
-                # Calculate average daily change from recent prices
-                recent_prices = [p["price"] if isinstance(p, dict) else p for p in prices[-20:]]
-                avg_price_old = sum(recent_prices[:10]) / 10
-                avg_price_new = sum(recent_prices[10:]) / 10
-                avg_daily_change_pct = ((avg_price_new - avg_price_old) / avg_price_old) * 100 / 10
-                days_to_breakeven = calculate_days_to_breakeven(price, cost_basis, avg_daily_change_pct)
-        
-        # Build main output line
-        output = f"[{timestamp}] ITER {iteration} | Price: {price:,.2f} HKD | MA: {moving_avg:,.2f} HKD | Change: {pct_change:+.2f}%"
-        
-        # Add technical indicators
-        if current_rsi:
-            output += f" | RSI: {current_rsi}"
-        
-        output += f" | Trend: {trend_direction}"
-        
-        if unrealized_pnl is not None:
-            output += f" | P/L: {unrealized_pnl:+,.2f} HKD ({unrealized_pnl_pct:+.2f}%)"
+            trend_data = historical_analysis.get('trend', {})
+            trend_direction = trend_data.get('trend', 'sideways')
             
-            # Show days to breakeven if in loss
-            if unrealized_pnl_pct < -0.5:
-                if days_to_breakeven is not None and days_to_breakeven > 0:
-                    output += f" | Breakeven: ~{days_to_breakeven}d"
+            percentile = historical_analysis.get('percentile', 50)
+        
+        # Trail open positions (only touches the trailing stop file while positions are open)
+        if self.trailing_stop_manager.has_active_positions():
+            atr = self.atr.value if self.atr else None
+            for stop_signal in self.trailing_stop_manager.update_peak_and_stop(price, volatility_level, atr):
+                self.metrics.inc('trailing_stops_hit_total', asset=asset)
+                print(f"  └─ TRAILING STOP | {stop_signal['reason']} | Locked: {stop_signal['profit_pct']:+.2f}%")
+        
+        # Clean output - only essential info
+        timestamp = get_current_timestamp()
         
-        print(output)
+        if num_prices < self.ma_window:
+            # Before MA is ready - minimal output
+            pct_collected = round((num_prices / self.ma_window) * 100, 1)
+            print(f"[{timestamp}] ITER {self.iteration} | Price: {price:,.2f} HKD | MA Status: {pct_collected}% ({num_prices}/{self.ma_window})")
+        else:
+            # After MA is ready - show detailed info with P/L and technical analysis
+            pct_change = ((price - moving_avg) / moving_avg) * 100
+            
+            # Calculate unrealized P/L
+            unrealized_pnl = None
+            unrealized_pnl_pct = None
+            days_to_breakeven = None
+            
+            if cost_basis:
+                unrealized_pnl = (price - cost_basis) * state['CURRENT_BALANCE']
+                unrealized_pnl_pct = ((price - cost_basis) / cost_basis) * 100
+                
+                # Estimate days to breakeven based on MA trend
+                if num_prices >= 20:
+                    # Calculate average daily change from recent prices
+                    recent_prices = window.last(20)
+                    avg_price_old = sum(recent_prices[:10]) / 10
+                    avg_price_new = sum(recent_prices[10:]) / 10
+                    avg_daily_change_pct = ((avg_price_new - avg_price_old) / avg_price_old) * 100 / 10
+                    days_to_breakeven = calculate_days_to_breakeven(price, cost_basis, avg_daily_change_pct)
+            
+            # Build main output line
+            output = f"[{timestamp}] ITER {self.iteration} | Price: {price:,.2f} HKD | MA: {moving_avg:,.2f} HKD | Change: {pct_change:+.2f}%"
+            
+            # Add technical indicators
+            if current_rsi:
+                output += f" | RSI: {current_rsi}"
+            
+            output += f" | Trend: {trend_direction}"
+            
+            if unrealized_pnl is not None:
+                output += f" | P/L: {unrealized_pnl:+,.2f} HKD ({unrealized_pnl_pct:+.2f}%)"
+                
+                # Show days to breakeven if in loss
+                if unrealized_pnl_pct < -0.5:
+                    if days_to_breakeven is not None and days_to_breakeven > 0:
+                        output += f" | Breakeven: ~{days_to_breakeven}d"
+            
+            print(output)
 
-    # Use moving average as reference price (or use manual one if MA not ready)
-    ref_price = moving_avg if moving_avg else state["LAST_REFERENCE_PRICE"]
-    
-    # Only evaluate trading signals after 100 iterations
-    if iteration >= 100:
-        decisions = evaluate(
-            price,
-            ref_price,
-            state["CURRENT_BALANCE"],
-            state["AVAILABLE_CASH_HKD"],
-            config,
-            cost_basis  # Pass cost basis for profit checking
-        )
+        # Use moving average as reference price (or use manual one if MA not ready)
+        ref_price = moving_avg if moving_avg else state["LAST_REFERENCE_PRICE"]
+        
+        # Only evaluate trading signals once the MA window has filled
+        if self.signals_ready():
+            with self.latency.stage(asset, 'evaluate'):
+                decisions = evaluate_compiled(
+                    price,
+                    ref_price,
+                    state["CURRENT_BALANCE"],
+                    state["AVAILABLE_CASH_HKD"],
+                    self.thresholds,  # Precompiled from config.yaml (see ConfigManager)
+                    cost_basis  # Pass cost basis for profit checking
+                )
 
-        if decisions:
-            decision = decisions[0]  # only one at a time
-            
-            # Handle HOLD state
-            if decision["type"] == "HOLD":
-                print(f"  └─ HOLD | {decision['reason']}")
-            else:
-                # BUY or SELL signal
-                print(f"\n  └─ SIGNAL: {decision['type']}", end="")
+            if decisions:
+                decision = decisions[0]  # only one at a time
                 
-                if decision["type"] == "BUY":
-                    amount_hkd = decision.get('amount_hkd', 0)
-                    
-                    # Calculate conviction score for this BUY signal
-                    conviction_score = 50  # Default
-                    if historical_analysis and current_rsi:
-                        conviction_score = generate_buy_conviction_score(
-                            price=price,
-                            moving_avg=moving_avg,
-                            rsi=current_rsi,
-                            support=support_level,
-                            trend=trend_direction,
-                            percentile=percentile,
-                            historical_data=historical_analysis
-                        )
+                # Handle HOLD state
+                if decision["type"] == "HOLD":
+                    print(f"  └─ HOLD | {decision['reason']}")
+                else:
+                    # BUY or SELL signal
+                    print(f"\n  └─ SIGNAL: {decision['type']}", end="")
                     
-                    print(f" @ {price:,.0f} HKD | Amount: {amount_hkd:,.2f} HKD | Conviction: {conviction_score}%")
-                    
-                    # Show reasoning
-                    if 'reason' in decision:
-                        print(f"     Reason: {decision['reason']}")
-                    if 'loss_pct' in decision:
-                        print(f"     Averaging down: {decision['loss_pct']:.1f}%")
-                    
-                    # Show technical context
-                    if support_level:
-                        dist_to_support = ((price - support_level) / support_level) * 100
-                        print(f"     Support: {support_level:,.0f} HKD ({dist_to_support:+.1f}%)")
-                    if current_rsi:
-                        print(f"     RSI: {current_rsi} (oversold zone)")
-                    
-                    # Check if we should send alert (using signal state tracker)
-                    should_send, reason, is_change = signal_tracker.should_send_alert(
-                        'BUY', conviction_score, price
-                    )
-                    
-                    # Send Telegram notification only if state changed meaningfully
-                    if should_send and config.get('telegram', {}).get('enabled') and config.get('telegram', {}).get('notify_buy'):
-                        buy_data = {
-                            'price': price,
-                            'amount_hkd': amount_hkd,
-                            'asset': asset,
-                            'cost_basis': cost_basis,
-                            'loss_pct': decision.get('loss_pct', 0),
-                            'rsi': current_rsi,
-                            'support': support_level,
-                            'reason': decision.get('reason', 'Smart averaging down'),
-                            'conviction': conviction_score
-                        }
-                        message = format_alert('BUY', buy_data)
-                        send_telegram_message(
-                            config['telegram']['bot_token'],
-                            config['telegram']['chat_id'],
-                            message
+                    if decision["type"] == "BUY":
+                        amount_hkd = decision.get('amount_hkd', 0)
+                        
+                        # Calculate conviction score for this BUY signal
+                        conviction_score = 50  # Default
+                        if historical_analysis and current_rsi:
+                            with self.latency.stage(asset, 'conviction'):
+                                conviction_score = score_buy_signal(
+                                    price=price,
+                                    cost_basis=cost_basis,
+                                    rsi=current_rsi,
+                                    support=support_level,
+                                    trend=trend_direction,
+                                    percentile=percentile,
+                                    volatility_level=volatility_level,
+                                    volume_signal=volume_signal,
+                                    macd_signal=macd_data.get('signal') if macd_data else None
+                                )
+                        
+                        print(f" @ {price:,.0f} HKD | Amount: {amount_hkd:,.2f} HKD | Conviction: {conviction_score}%")
+                        
+                        # Show reasoning
+                        if 'reason' in decision:
+                            print(f"     Reason: {decision['reason']}")
+                        if 'loss_pct' in decision:
+                            print(f"     Averaging down: {decision['loss_pct']:.1f}%")
+                        
+                        # Show technical context
+                        if support_level:
+                            dist_to_support = ((price - support_level) / support_level) * 100
+                            print(f"     Support: {support_level:,.0f} HKD ({dist_to_support:+.1f}%)")
+                        if current_rsi:
+                            print(f"     RSI: {current_rsi} (oversold zone)")
+                        
+                        # Check if we should send alert (using signal state tracker)
+                        should_send, reason, is_change = self.signal_tracker.should_send_alert(
+                            'BUY', conviction_score, price
                         )
-                        # Update signal state after sending
-                        signal_tracker.update_state('BUY', conviction_score, price)
-                        print(f"     [TELEGRAM] Message sent ({reason})")
-                    else:
-                        if not should_send:
-                            print(f"     [SPAM FILTER] Not sending: {reason}")
-                    
-                    # Update cost basis automatically (weighted average)
-                    if cost_basis:
-                        print(f"     [AUTO-UPDATE] Recalculating cost basis...", end="")
-                        new_cost_basis, new_balance = update_cost_basis_after_buy(
-                            STATE_FILE,
-                            state["CURRENT_BALANCE"],
-                            cost_basis,
-                            amount_hkd,
-                            price
-                        )
-                        print(f" {cost_basis:,.2f} → {new_cost_basis:,.2f} HKD")
-                    
-                    # Log buy trade
-                    log_trade(
-                        asset=asset,
-                        trade_type="BUY",
-                        price=price,
-                        amount_hkd=amount_hkd,
-                        cost_basis=cost_basis,
-                        trigger_pct=decision.get('trigger_pct', -20),
-                        reason=decision.get('reason', 'Average down opportunity')
-                    )
-                
-                else:  # SELL
-                    amount_crypto = decision.get('amount_eth', decision.get('amount_btc', 0))
-                    
-                    # Calculate conviction score for this SELL signal
-                    conviction_score, reason_detailed = generate_sell_signal_with_explanation(
-                        price=price,
-                        moving_avg=moving_avg,
-                        rsi=current_rsi,
-                        resistance=resistance_level,
-                        cost_basis=cost_basis,
-                        current_balance=state["CURRENT_BALANCE"],
-                        trend=trend_direction,
-                        historical_data=historical_analysis
-                    )
-                    
-                    print(f" @ {price:,.0f} HKD | Amount: {amount_crypto:.6f} {asset.upper()} | Conviction: {conviction_score}%")
-                    
-                    # Show reasoning
-                    if 'reason' in decision:
-                        print(f"     Reason: {decision['reason']}")
-                    if 'profit_pct' in decision:
-                        print(f"     Profit: +{decision['profit_pct']:.2f}%")
+                        
+                        # Send Telegram notification only if state changed meaningfully
+                        if should_send and self.config.get('telegram', {}).get('enabled') and self.config.get('telegram', {}).get('notify_buy'):
+                            buy_data = {
+                                'price': price,
+                                'amount_hkd': amount_hkd,
+                                'asset': asset,
+                                'cost_basis': cost_basis,
+                                'loss_pct': decision.get('loss_pct', 0),
+                                'rsi': current_rsi,
+                                'support': support_level,
+                                'reason': decision.get('reason', 'Smart averaging down'),
+                                'conviction': conviction_score
+                            }
+                            with self.latency.stage(asset, 'telegram'):
+                                self.alert(asset, 'BUY', buy_data)
+                            # Update signal state after sending
+                            self.signal_tracker.update_state('BUY', conviction_score, price, reason=reason)
+                            self.metrics.inc('alerts_submitted_total', asset=asset, signal='BUY')
+                            print(f"     [TELEGRAM] Alert submitted ({reason})")
+                        else:
+                            if not should_send:
+                                self.metrics.inc('alerts_suppressed_total', asset=asset, signal='BUY')
+                                print(f"     [SPAM FILTER] Not sending: {reason}")
+                            self.signal_tracker.record_suppressed(
+                                'BUY', conviction_score, price,
+                                reason if not should_send else "BUY notifications disabled")
+                        
+                        # Update cost basis automatically (weighted average)
+                        if cost_basis:
+                            print(f"     [AUTO-UPDATE] Recalculating cost basis...", end="")
+                            with self.latency.stage(asset, 'state_write'):
+                                new_cost_basis, new_balance = update_cost_basis_after_buy(
+                                    self.state_file,
+                                    state["CURRENT_BALANCE"],
+                                    cost_basis,
+                                    amount_hkd,
+                                    price
+                                )
+                            print(f" {cost_basis:,.2f} → {new_cost_basis:,.2f} HKD")
+                            
+                            # Track the lot the state file just took with a trailing stop
+                            if amount_hkd and price:
+                                self.trailing_stop_manager.record_buy(price, amount_hkd / price)
+                        
+                        # Log buy trade
+                        with self.latency.stage(asset, 'trade_log'):
+                            log_trade(
+                                asset=asset,
+                                trade_type="BUY",
+                                price=price,
+                                amount_hkd=amount_hkd,
+                                cost_basis=cost_basis,
+                                trigger_pct=decision.get('trigger_pct', -20),
+                                reason=decision.get('reason', 'Average down opportunity')
+                            )
                     
-                    # Show technical context
-                    if resistance_level:
-                        dist_to_resist = ((price - resistance_level) / resistance_level) * 100
-                        print(f"     Resistance: {resistance_level:,.0f} HKD ({dist_to_resist:+.1f}%)")
-                    if current_rsi:
-                        print(f"     RSI: {current_rsi}")
-                    
-                    # Check if we should send alert (using signal state tracker)
-                    should_send, reason_spam, is_change = signal_tracker.should_send_alert(
-                        'SELL', conviction_score, price
-                    )
-                    
-                    # Send Telegram notification only if state changed meaningfully
-                    if should_send and config.get('telegram', {}).get('enabled') and config.get('telegram', {}).get('notify_sell'):
-                        sell_data = {
-                            'price': price,
-                            'amount_crypto': amount_crypto,
-                            'asset': asset,
-                            'cost_basis': cost_basis,
-                            'profit_pct': decision.get('profit_pct', 0),
-                            'rsi': current_rsi,
-                            'resistance': resistance_level,
-                            'reason': decision.get('reason', 'Profit taking'),
-                            'conviction': conviction_score
-                        }
-                        message = format_alert('SELL', sell_data)
-                        send_telegram_message(
-                            config['telegram']['bot_token'],
-                            config['telegram']['chat_id'],
-                            message
+                    else:  # SELL
+                        amount_crypto = decision.get('amount_eth', decision.get('amount_btc', 0))
+                        
+                        # Calculate conviction score for this SELL signal
+                        with self.latency.stage(asset, 'conviction'):
+                            conviction_score, reason_detailed = score_sell_signal(
+                                price=price,
+                                cost_basis=cost_basis,
+                                peak_price=max(window.last(num_prices)),
+                                rsi=current_rsi,
+                                resistance=resistance_level,
+                                trend=trend_direction,
+                                volume_signal=volume_signal
+                            )
+                        
+                        print(f" @ {price:,.0f} HKD | Amount: {amount_crypto:.6f} {asset.upper()} | Conviction: {conviction_score}%")
+                        
+                        # Show reasoning
+                        if 'reason' in decision:
+                            print(f"     Reason: {decision['reason']}")
+                        if 'profit_pct' in decision:
+                            print(f"     Profit: +{decision['profit_pct']:.2f}%")
+                        
+                        # Show technical context
+                        if resistance_level:
+                            dist_to_resist = ((price - resistance_level) / resistance_level) * 100
+                            print(f"     Resistance: {resistance_level:,.0f} HKD ({dist_to_resist:+.1f}%)")
+                        if current_rsi:
+                            print(f"     RSI: {current_rsi}")
+                        
+                        # Check if we should send alert (using signal state tracker)
+                        should_send, reason_spam, is_change = self.signal_tracker.should_send_alert(
+                            'SELL', conviction_score, price
                         )
-                        # Update signal state after sending
-                        signal_tracker.update_state('SELL', conviction_score, price)
-                        print(f"     [TELEGRAM] Message sent ({reason_spam})")
-                    else:
-                        if not should_send:
-                            print(f"     [SPAM FILTER] Not sending: {reason_spam}")
-                    
-                    # Update balance after sell
-                    print(f"     [AUTO-UPDATE] Updating balance after sell...")
-                    new_balance = update_balance_after_sell(
-                        STATE_FILE,
-                        state["CURRENT_BALANCE"],
-                        amount_crypto
-                    )
+                        
+                        # Send Telegram notification only if state changed meaningfully
+                        if should_send and self.config.get('telegram', {}).get('enabled') and self.config.get('telegram', {}).get('notify_sell'):
+                            sell_data = {
+                                'price': price,
+                                'amount_crypto': amount_crypto,
+                                'asset': asset,
+                                'cost_basis': cost_basis,
+                                'profit_pct': decision.get('profit_pct', 0),
+                                'rsi': current_rsi,
+                                'resistance': resistance_level,
+                                'reason': decision.get('reason', 'Profit taking'),
+                                'conviction': conviction_score
+                            }
+                            with self.latency.stage(asset, 'telegram'):
+                                self.alert(asset, 'SELL', sell_data)
+                            # Update signal state after sending
+                            self.signal_tracker.update_state('SELL', conviction_score, price, reason=reason_spam)
+                            self.metrics.inc('alerts_submitted_total', asset=asset, signal='SELL')
+                            print(f"     [TELEGRAM] Alert submitted ({reason_spam})")
+                        else:
+                            if not should_send:
+                                self.metrics.inc('alerts_suppressed_total', asset=asset, signal='SELL')
+                                print(f"     [SPAM FILTER] Not sending: {reason_spam}")
+                            self.signal_tracker.record_suppressed(
+                                'SELL', conviction_score, price,
+                                reason_spam if not should_send else "SELL notifications disabled")
+                        
+                        # Update balance after sell
+                        print(f"     [AUTO-UPDATE] Updating balance after sell...")
+                        with self.latency.stage(asset, 'state_write'):
+                            new_balance = update_balance_after_sell(
+                                self.state_file,
+                                state["CURRENT_BALANCE"],
+                                amount_crypto,
+                                price
+                            )
+                        
+                        # Sold coins no longer need a trailing stop
+                        sold = state["CURRENT_BALANCE"] - new_balance
+                        if sold > 0:
+                            self.trailing_stop_manager.record_sell(price, sold)
+                        
+                        # Log sell trade
+                        with self.latency.stage(asset, 'trade_log'):
+                            log_trade(
+                                asset=asset,
+                                trade_type="SELL",
+                                price=price,
+                                amount_crypto=amount_crypto,
+                                cost_basis=cost_basis,
+                                trigger_pct=decision.get('trigger_pct', 20),
+                                reason=decision.get('reason', 'Profit taking')
+                            )
                     
-                    # Log sell trade
-                    log_trade(
-                        asset=asset,
-                        trade_type="SELL",
-                        price=price,
-                        amount_crypto=amount_crypto,
-                        cost_basis=cost_basis,
-                        trigger_pct=decision.get('trigger_pct', 20),
-                        reason=decision.get('reason', 'Profit taking')
-                    )
-                
-                # Log decision
-                save_pending({
-                    "pending": False,
-                    "decision": decision,
-                    "reference_price": ref_price,
-                    "timestamp": timestamp,
-                    "historical_analysis": bool(historical_analysis)
-                })
-        else:
-            # No signals - just hold
-            pass
+                    # Log decision
+                    save_pending({
+                        "pending": False,
+                        "decision": decision,
+                        "reference_price": ref_price,
+                        "timestamp": timestamp,
+                        "historical_analysis": bool(historical_analysis)
+                    })
+            else:
+                # No signals - just hold
+                pass
+
+
+def run_loop(monitors, config_manager, governor=None):
+    """Drive every monitor from one loop: load states, fetch all prices at once, tick each asset."""
+    latency = get_latency_tracker()
+    iteration = 0
+    
+    while True:
+        tick_started = time.time()
+        iteration += 1
+        
+        # Pick up config.yaml edits without a restart (keeps the MA warm-up)
+        old_http = config_manager.config.get('http')
+        if config_manager.reload_if_changed():
+            config = config_manager.config
+            if config.get('http') != old_http:
+                configure_http(config.get('http'))
+            for monitor in monitors:
+                monitor.apply_config(config, config_manager.thresholds)
+            if governor:
+                governor.configure(**governor_settings(config))
+            print(f"[CONFIG] Reloaded config.yaml | Interval: {config['check_interval_sec']}s | Hold Band: ±{config.get('hold_band_pct', 5)}%")
+        
+        loaded = []
+        for monitor in monitors:
+            try:
+                started = time.perf_counter()
+                state = monitor.load_state()
+                latency.record(state["ASSET"], 'state_load', time.perf_counter() - started)
+                loaded.append((monitor, state))
+            except Exception as e:
+                print(f"[ERROR] {get_current_timestamp()} - Failed to load {monitor.state_file}: {e}")
+        
+        # One batched price request for every asset in this tick
+        with latency.stage('all', 'get_price'):
+            prices, errors = get_prices([state["ASSET"] for _, state in loaded])
+        
+        for monitor, state in loaded:
+            asset = state["ASSET"]
+            try:
+                with latency.stage(asset, 'tick_total'):
+                    monitor.tick(state, prices.get(asset), errors.get(asset))
+            except Exception as e:
+                # One broken asset must not stop the others
+                print(f"[ERROR] {get_current_timestamp()} - {monitor.state_file}: {e}")
+        
+        # One message per chat for the alerts this pass (and earlier held ones) that are due
+        if governor:
+            sent = governor.flush()
+            if sent:
+                get_metrics().inc('telegram_messages_total', sent)
+        
+        metrics_config = config_manager.config.get('metrics', {})
+        if iteration % metrics_config.get('latency_dump_every', LATENCY_DUMP_EVERY) == 0:
+            try:
+                latency.dump(metrics_config.get('latency_file', LATENCY_FILE))
+            except IOError as e:
+                print(f"[WARNING] Could not write latency stats: {e}")
+        
+        elapsed = time.time() - tick_started
+        time.sleep(max(0, config_manager.config["check_interval_sec"] - elapsed))
+
+
+def main(argv):
+    # State files come from the command line (relative to data/), default to data/state.txt.
+    # Passing several files runs all of them from this one process.
+    state_files = [os.path.join("data", name) for name in argv[1:]] or ["data/state.txt"]
+    
+    config_manager = ConfigManager("config.yaml")
+    config = config_manager.config
+    configure_http(config.get('http'))
+    set_price_window_size(config.get('moving_average_window', 100))
     
-    time.sleep(config["check_interval_sec"])
+    print("[STARTUP] Crypto Notifier - Advanced Multi-Factor Analysis")
+    print(f"[INFO] Interval: {config['check_interval_sec']}s | Hold Band: ±{config['hold_band_pct']}% | MA Ready at: {config.get('moving_average_window', 100)} iterations")
+    for state_file in state_files:
+        print(f"[INFO] State File: {state_file}")
+    print(f"[INFO] Features: Trailing Stops | Historical Data | Pattern Recognition | Multi-Factor Scoring")
+    print("-" * 80)
+    
+    # Telegram messages are delivered from a background thread so sends never stall the loop
+    notifier = None
+    telegram_config = config.get('telegram', {})
+    if telegram_config.get('enabled'):
+        notifier = TelegramDeliveryQueue(
+            telegram_config.get('bot_token'),
+            telegram_config.get('spool_dir', DEFAULT_SPOOL_DIR),
+            telegram_config.get('queue_size', DEFAULT_QUEUE_SIZE)
+        )
+        notifier.start()
+    
+    # Rate limits and digests for alerts across all assets
+    governor = None
+    if notifier and telegram_config.get('governor', {}).get('enabled', True):
+        governor = AlertGovernor(notifier.enqueue, **governor_settings(config))
+    
+    # Local Prometheus endpoint (opt-in: set metrics.port)
+    metrics_config = config.get('metrics', {})
+    if metrics_config.get('port'):
+        if start_metrics_server(metrics_config['port'], metrics_config.get('host', '127.0.0.1')):
+            print(f"[INFO] Metrics: http://{metrics_config.get('host', '127.0.0.1')}:{metrics_config['port']}/metrics")
+    
+    monitors = [AssetMonitor(state_file, config, notifier, governor) for state_file in state_files]
+    
+    try:
+        run_loop(monitors, config_manager, governor)
+    finally:
+        for monitor in monitors:
+            monitor.checkpoint()
+        if governor:
+            # Spool whatever is still waiting so it is delivered on the next start
+            governor.flush(force=True)
+        if notifier:
+            notifier.stop()
 
 
+if __name__ == "__main__":
+    main(sys.argv)
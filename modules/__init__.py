@@ -5,10 +5,16 @@ Core modules for price fetching, signal generation, and notification
 
 from .confidence_levels import get_confidence_level, format_confidence_display
 from .signal_state_tracker import SignalStateTracker
-from .pattern_analyzer import calculate_rsi, detect_capitulation, generate_buy_conviction_score
+from .pattern_analyzer import calculate_rsi, detect_capitulation, generate_buy_conviction_score, StreamingRSI, StreamingEMA, StreamingMACD, StreamingATR
 from .historical_analyzer import fetch_historical_data, analyze_price_action
-from .trailing_stop_manager import TrailingStopManager
+from .trailing_stop_manager import TrailingStopManager, simulate_trailing_stops, simulate_atr_trailing_stops
 from .notifier_telegram import send_telegram_message, format_alert
+from .http_session import configure_http, get_session
+from .telegram_queue import TelegramDeliveryQueue
+from .alert_governor import AlertGovernor
+from .range_extrema import PriceRangeIndex, SparseTable, SlidingExtrema
+from .bar_store import BarBuilder
+from .analysis_cache import AnalysisCache, get_analysis_cache
 
 __all__ = [
     'get_confidence_level',
@@ -17,9 +23,25 @@ __all__ = [
     'calculate_rsi',
     'detect_capitulation',
     'generate_buy_conviction_score',
+    'StreamingRSI',
+    'StreamingEMA',
+    'StreamingMACD',
+    'StreamingATR',
     'fetch_historical_data',
     'analyze_price_action',
     'TrailingStopManager',
+    'simulate_trailing_stops',
+    'simulate_atr_trailing_stops',
     'send_telegram_message',
-    'format_alert'
+    'format_alert',
+    'configure_http',
+    'get_session',
+    'TelegramDeliveryQueue',
+    'AlertGovernor',
+    'PriceRangeIndex',
+    'SparseTable',
+    'SlidingExtrema',
+    'BarBuilder',
+    'AnalysisCache',
+    'get_analysis_cache'
 ]
@@ -0,0 +1,184 @@
+"""
+Rate limiting and coalescing of Telegram alerts across assets.
+Alerts are submitted per (chat, asset) instead of being sent straight away.
+Within a chat, a newer alert for an asset replaces the one still waiting, an
+asset that was just alerted waits out its cooldown, and everything that is
+ready when the digest window closes goes out as one message - the alert
+itself when it is alone, a format_alert('DIGEST', ...) summary otherwise.
+Each message takes a token from the chat's bucket, so a market-wide move
+across hundreds of assets becomes a handful of messages instead of a burst
+that Telegram throttles. Submitting is O(log n); a flush costs O(1) per chat
+plus the alerts it releases.
+"""
+
+import heapq
+import time
+
+from .notifier_telegram import MAX_MESSAGE_LENGTH, format_alert, format_digest_line
+
+DEFAULT_RATE_PER_MINUTE = 20  # Telegram allows about 20 messages a minute in a group chat
+DEFAULT_BURST = 5
+DEFAULT_COOLDOWN = 60         # Seconds between messages about the same asset
+DEFAULT_WINDOW = 0            # Seconds to collect alerts before sending (0 = same loop pass)
+DIGEST_OVERHEAD = 200         # Characters of a digest outside its alert lines (title, timestamp)
+
+
+class TokenBucket:
+    """`burst` tokens, refilled continuously at `rate` tokens per second."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        """Take one token if available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class _Chat:
+    """Alerts waiting for one chat."""
+
+    __slots__ = ('bucket', 'pending', 'opened', 'held', 'cooling', 'last_sent')
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.pending = {}     # asset -> (alert_type, data), ready to go out in the next message
+        self.opened = None    # When the first pending alert arrived (the digest window start)
+        self.held = {}        # asset -> (alert_type, data), waiting out the asset's cooldown
+        self.cooling = []     # heap of (cooldown end, asset) for held assets
+        self.last_sent = {}   # asset -> time of its last message
+
+
+class AlertGovernor:
+    """Per-chat token buckets, per-asset cooldowns and digest windows for alerts."""
+
+    def __init__(self, send, rate_per_minute=DEFAULT_RATE_PER_MINUTE, burst=DEFAULT_BURST,
+                 cooldown=DEFAULT_COOLDOWN, window=DEFAULT_WINDOW, clock=time.monotonic):
+        """
+        Args:
+            send: Callable(chat_id, message) that delivers a message (e.g. TelegramDeliveryQueue.enqueue)
+            rate_per_minute: Messages per minute per chat once the burst is used up
+            burst: Messages a chat can get back to back
+            cooldown: Seconds before another message about the same asset
+            window: Seconds alerts are collected into one digest after the first arrives
+            clock: Time source (seconds)
+        """
+        self.send = send
+        self.clock = clock
+        self._chats = {}
+        self.configure(rate_per_minute, burst, cooldown, window)
+
+    def configure(self, rate_per_minute=DEFAULT_RATE_PER_MINUTE, burst=DEFAULT_BURST,
+                  cooldown=DEFAULT_COOLDOWN, window=DEFAULT_WINDOW):
+        """Change the limits (waiting alerts and bucket levels are kept)."""
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.cooldown = cooldown
+        self.window = window
+        for chat in self._chats.values():
+            chat.bucket.rate = self.rate
+            chat.bucket.burst = burst
+
+    def _chat(self, chat_id, now):
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _Chat(TokenBucket(self.rate, self.burst, now))
+        return chat
+
+    def submit(self, chat_id, asset, alert_type, data):
+        """
+        Queue an alert (O(log n)); it goes out on a later flush().
+
+        Args:
+            chat_id: Telegram chat ID
+            asset: Asset symbol (a newer alert for the same asset replaces a waiting one)
+            alert_type: 'BUY', 'SELL', ... (see format_alert)
+            data: format_alert data
+        """
+        now = self.clock()
+        chat = self._chat(chat_id, now)
+        alert = (alert_type, data)
+
+        if asset in chat.pending:
+            chat.pending[asset] = alert
+            return
+        if asset in chat.held:
+            chat.held[asset] = alert  # Still cooling down (or about to be released by flush)
+            return
+        last = chat.last_sent.get(asset)
+        if last is not None and now - last < self.cooldown:
+            heapq.heappush(chat.cooling, (last + self.cooldown, asset))
+            chat.held[asset] = alert
+            return
+        self._add_pending(chat, asset, alert, now)
+
+    def _add_pending(self, chat, asset, alert, now):
+        if not chat.pending:
+            chat.opened = now
+        chat.pending[asset] = alert
+
+    @staticmethod
+    def _next_batch(chat):
+        """Take the oldest pending alerts whose digest lines fit in one message."""
+        budget = MAX_MESSAGE_LENGTH - DIGEST_OVERHEAD
+        batch = []
+        for asset, (alert_type, data) in chat.pending.items():
+            budget -= len(format_digest_line(alert_type, data)) + 1
+            if batch and budget < 0:
+                break
+            batch.append((asset, (alert_type, data)))
+        for asset, _ in batch:
+            del chat.pending[asset]
+        return batch
+
+    def pending(self):
+        """Number of alerts waiting in all chats."""
+        return sum(len(chat.pending) + len(chat.held) for chat in self._chats.values())
+
+    def flush(self, force=False):
+        """
+        Send what is due: per chat, the alerts whose window has closed and cooldown has
+        ended go out as one message per token in the chat's bucket (a digest when several
+        are waiting, split where it would exceed Telegram's message length).
+
+        Args:
+            force: Send everything waiting now, ignoring windows, cooldowns and buckets
+                   (e.g. at shutdown, so the delivery spool keeps them)
+
+        Returns:
+            int: Messages sent
+        """
+        now = self.clock()
+        sent = 0
+        for chat_id, chat in self._chats.items():
+            # Held alerts whose cooldown ended join the pending ones
+            while chat.cooling and (force or chat.cooling[0][0] <= now):
+                _, asset = heapq.heappop(chat.cooling)
+                alert = chat.held.pop(asset, None)
+                if alert is not None:
+                    self._add_pending(chat, asset, alert, now)
+
+            # One message per token; a digest too long for one message continues in the next
+            while chat.pending and (force or (now - chat.opened >= self.window and chat.bucket.take(now))):
+                alerts = self._next_batch(chat)
+                for asset, _ in alerts:
+                    chat.last_sent[asset] = now
+                if len(alerts) == 1:
+                    alert_type, data = alerts[0][1]
+                    message = format_alert(alert_type, data)
+                else:
+                    message = format_alert('DIGEST', {'alerts': [alert for _, alert in alerts]})
+                self.send(chat_id, message)
+                sent += 1
+            if not chat.pending:
+                chat.opened = None
+        return sent
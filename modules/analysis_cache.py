@@ -0,0 +1,233 @@
+"""
+Memoized historical analysis.
+analyze_price_action() results are cached per (asset, length, last timestamp,
+last price) with LRU eviction, so an unchanged series costs O(1) to look up.
+When a refresh brings new data, the per-asset series state is updated only
+from the first changed point onwards: the head is aligned by timestamp, the
+changed tail is found by walking back from the end, and the local lows (for
+the trend) and a sorted copy of the prices (for the historical extrema) are
+updated for just those points. Results are identical to
+analyze_price_action(backend='python').
+
+The fingerprint assumes a provider only ever appends, slides the head or
+revises the most recent points - a change in the middle of an otherwise
+identical series with the same last point is not detected.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from .historical_analyzer import analyze_volume, calculate_volatility, _combine_analysis
+
+DEFAULT_MAXSIZE = 64
+
+
+class _SeriesState:
+    """One asset's series plus the running state the analysis needs."""
+
+    __slots__ = ('timestamps', 'values', 'ordered', 'base', 'lows', 'higher_lows')
+
+    def __init__(self, timestamps, values):
+        self.timestamps = timestamps
+        self.values = values
+        self.ordered = sorted(values)  # For the historical high/low
+        self.base = 0  # Points dropped from the head so far; low indexes are absolute
+        self.lows = deque()  # (absolute index, value) of local lows, oldest first
+        self.higher_lows = 0  # Consecutive low pairs where the later low is higher
+        self._scan_lows(1)
+
+    def _push_low(self, index, value):
+        if self.lows and value > self.lows[-1][1]:
+            self.higher_lows += 1
+        self.lows.append((index, value))
+
+    def _scan_lows(self, start):
+        values = self.values
+        for i in range(max(1, start), len(values) - 1):
+            if values[i] < values[i - 1] and values[i] < values[i + 1]:
+                self._push_low(self.base + i, values[i])
+
+    def _discard(self, values):
+        ordered = self.ordered
+        for value in values:
+            del ordered[bisect_left(ordered, value)]
+
+    def drop_head(self, count):
+        """Remove the first `count` points (lows at the new first point are no longer lows)."""
+        self._discard(self.values[:count])
+        del self.timestamps[:count]
+        del self.values[:count]
+        self.base += count
+        lows = self.lows
+        while lows and lows[0][0] <= self.base:
+            _, value = lows.popleft()
+            if lows and lows[0][1] > value:
+                self.higher_lows -= 1
+
+    def replace_tail(self, start, points):
+        """Replace points from `start` onwards with [timestamp, price] `points` and rescan lows."""
+        lows = self.lows
+        # A low at i depends on i+1, so lows from start - 1 on may change
+        while lows and lows[-1][0] >= self.base + start - 1:
+            _, value = lows.pop()
+            if lows and value > lows[-1][1]:
+                self.higher_lows -= 1
+        self._discard(self.values[start:])
+        del self.timestamps[start:]
+        del self.values[start:]
+        for timestamp, value in points:
+            self.timestamps.append(timestamp)
+            self.values.append(value)
+            insort(self.ordered, value)
+        self._scan_lows(start - 1)
+
+    def analysis(self, prices, volumes=None):
+        """analyze_price_action() result for the current series."""
+        values = self.values
+        current_price = prices[-1][1]
+
+        recent = values[-30:]
+        recent_high = max(recent)
+        recent_low = min(recent)
+        hist_high = self.ordered[-1]
+        hist_low = self.ordered[0]
+        support_res = {
+            'support': recent_low * 0.98,
+            'resistance': recent_high * 1.02,
+            'pivot': (recent_high + recent_low + current_price) / 3,
+            'recent_high': recent_high,
+            'recent_low': recent_low,
+            'hist_high': hist_high,
+            'hist_low': hist_low,
+            'current_price': current_price
+        }
+
+        if len(values) < 10 or len(self.lows) < 3:
+            trend = {'trend': 'insufficient_data', 'strength': 0, 'lower_lows_count': 0, 'higher_lows_count': 0}
+        else:
+            higher_lows = self.higher_lows
+            lower_lows = len(self.lows) - 1 - higher_lows
+            total = higher_lows + lower_lows
+            strength = (higher_lows - lower_lows) / total if total > 0 else 0
+            if strength > 0.3:
+                direction = 'uptrend'
+            elif strength < -0.3:
+                direction = 'downtrend'
+            else:
+                direction = 'sideways'
+            trend = {
+                'trend': direction,
+                'strength': strength,
+                'higher_lows_count': higher_lows,
+                'lower_lows_count': lower_lows
+            }
+
+        # Volatility only looks at the last 30 changes, volume at the last 21 points
+        volatility = calculate_volatility(prices[-31:])
+
+        if hist_high == hist_low:
+            percentile = 50
+        else:
+            percentile = max(0, min(100, int(((current_price - hist_low) / (hist_high - hist_low)) * 100)))
+
+        return _combine_analysis(support_res, trend, volatility, percentile, current_price,
+                                 analyze_volume(volumes[-21:]) if volumes is not None else None)
+
+
+class AnalysisCache:
+    """LRU of analysis results plus incremental series state per asset."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        """
+        Args:
+            maxsize: Cached results (and asset series states) kept before the least recently used is dropped
+        """
+        self.maxsize = maxsize
+        self._results = OrderedDict()  # (asset, length, last_ts, last_price, volume_key) -> analysis
+        self._states = OrderedDict()   # asset -> _SeriesState
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def analyze(self, asset, prices, volumes=None, index=None):
+        """
+        analyze_price_action() with memoization.
+
+        Args:
+            asset: Asset symbol (results and series state are kept per asset)
+            prices: List of [timestamp, price] pairs
+            volumes: Optional list of [timestamp, volume] pairs
+            index: Optional PriceRangeIndex; its current multi-window levels are attached
+
+        Returns:
+            dict: Analysis (a shallow copy of the cached result with a fresh
+                  'analyzed_at'; treat the nested dicts as read-only), or None
+                  with fewer than 5 prices
+        """
+        if not prices or len(prices) < 5:
+            return None
+
+        volume_key = (len(volumes), volumes[-1][1] if volumes else None) if volumes is not None else None
+        key = (asset, len(prices), prices[-1][0], prices[-1][1], volume_key)
+
+        with self._lock:
+            analysis = self._results.get(key)
+            if analysis is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                analysis = dict(analysis, analyzed_at=datetime.now().isoformat())
+            else:
+                self.misses += 1
+                self._results[key] = self._update_state(asset, prices).analysis(prices, volumes)
+                if len(self._results) > self.maxsize:
+                    self._results.popitem(last=False)
+                analysis = dict(self._results[key])
+
+        if index is not None:
+            analysis['support_resistance'] = dict(analysis['support_resistance'], levels=index.levels())
+        return analysis
+
+    def _update_state(self, asset, prices):
+        """Bring the asset's series state up to date, touching only what changed."""
+        state = self._states.get(asset)
+        if state is not None:
+            self._states.move_to_end(asset)
+            head = bisect_left(state.timestamps, prices[0][0])
+            if head < len(state.timestamps) and state.timestamps[head] == prices[0][0]:
+                if head:
+                    state.drop_head(head)
+                start = _changed_from(state.timestamps, state.values, prices)
+                if start < len(state.values) or start < len(prices):
+                    state.replace_tail(start, prices[start:])
+                return state
+
+        state = _SeriesState([p[0] for p in prices], [p[1] for p in prices])
+        self._states[asset] = state
+        if len(self._states) > self.maxsize:
+            self._states.popitem(last=False)
+        return state
+
+    def clear(self):
+        """Drop all cached results and series state."""
+        with self._lock:
+            self._results.clear()
+            self._states.clear()
+
+
+def _changed_from(old_ts, old_values, prices):
+    """Index of the first changed point, walking back from the end of the shorter series."""
+    i = min(len(old_values), len(prices)) - 1
+    while i >= 0 and (old_ts[i] != prices[i][0] or old_values[i] != prices[i][1]):
+        i -= 1
+    return i + 1
+
+
+# One cache per process, shared by every AssetMonitor
+_cache = AnalysisCache()
+
+
+def get_analysis_cache():
+    """Get the process-wide AnalysisCache."""
+    return _cache
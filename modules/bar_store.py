@@ -0,0 +1,259 @@
+"""
+OHLCV bars built incrementally from live ticks.
+Each timeframe (1m/5m/1h/1d) is a file of fixed 48-byte records
+(open time, open, high, low, close, volume as float64). The newest record is
+the bar still being built; it is rewritten in place on each checkpoint and
+simply becomes a closed bar once a tick lands in the next interval. Finished
+bars are never rewritten, so months of history cost one small write per
+checkpoint and any timeframe can be read back without resampling raw ticks.
+"""
+
+import math
+import mmap
+import os
+import struct
+
+BAR_RECORD = struct.Struct('<6d')  # (open time epoch seconds, open, high, low, close, volume)
+
+TIMEFRAMES = {'1m': 60, '5m': 300, '1h': 3600, '1d': 86400}
+DEFAULT_TIMEFRAMES = ('1m', '5m', '1h', '1d')
+# Bars kept on disk per timeframe (None = keep everything)
+DEFAULT_RETAIN = {'1m': 60 * 24 * 30, '5m': 12 * 24 * 180, '1h': 24 * 365 * 2, '1d': None}
+
+NO_VOLUME = math.nan  # Volume of a bar whose ticks carried no volume
+
+
+class BarSeries:
+    """Bars of one timeframe: closed bars on disk plus the bar being built."""
+
+    def __init__(self, path, interval, retain=None):
+        """
+        Open (or create) a bar file.
+
+        Args:
+            path: Binary bar file (e.g., 'data/bars_state_btc_1h.bin')
+            interval: Bar length in seconds
+            retain: Bars kept on disk; older ones are dropped once the file holds twice this many
+        """
+        self.path = path
+        self.interval = interval
+        self.retain = retain
+        self._written = 0           # Records on disk
+        self._current_on_disk = False  # The last record on disk is self._current
+        self._closed = []           # Closed bars not written yet
+        self._current = None        # [open_time, open, high, low, close, volume]
+        self._load()
+
+    def _load(self):
+        """Repair a torn trailing record and pick up the newest bar as the current one."""
+        if not os.path.exists(self.path):
+            return
+
+        size = os.path.getsize(self.path)
+        if size % BAR_RECORD.size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(size - size % BAR_RECORD.size)
+
+        last = read_bars(self.path, 1)
+        self._written = os.path.getsize(self.path) // BAR_RECORD.size
+        if last:
+            self._current = list(last[0])
+            self._current_on_disk = True
+
+    def __len__(self):
+        """Number of bars (closed plus the current one)."""
+        disk = self._written - (1 if self._current_on_disk else 0)
+        return disk + len(self._closed) + (1 if self._current else 0)
+
+    def update(self, timestamp, price, volume=None):
+        """
+        Add a tick to the bar covering its timestamp (O(1)).
+
+        Args:
+            timestamp: Epoch seconds
+            price: Price
+            volume: Traded volume since the previous tick, if the source provides it
+
+        Returns:
+            tuple: The bar this tick closed (the previous bar), or None
+        """
+        open_time = timestamp - timestamp % self.interval
+        bar = self._current
+        closed = None
+
+        if bar is None or open_time > bar[0]:
+            if bar is not None:
+                closed = tuple(bar)
+                self._closed.append(closed)
+            self._current = [open_time, price, price, price, price,
+                             volume if volume is not None else NO_VOLUME]
+            return closed
+
+        if open_time < bar[0]:
+            return None  # Tick older than the current bar - ignore
+
+        if price > bar[2]:
+            bar[2] = price
+        if price < bar[3]:
+            bar[3] = price
+        bar[4] = price
+        if volume is not None:
+            bar[5] = volume if math.isnan(bar[5]) else bar[5] + volume
+        return None
+
+    def flush(self):
+        """Checkpoint: write closed bars and rewrite the current bar in place."""
+        self._write()
+        if self.retain and self._written >= 2 * self.retain:
+            self.compact()
+
+    def _write(self):
+        if self._current is None:
+            return
+
+        start = self._written - 1 if self._current_on_disk else self._written
+        records = self._closed + [self._current]
+        mode = 'r+b' if os.path.exists(self.path) else 'wb'
+        with open(self.path, mode) as f:
+            f.seek(start * BAR_RECORD.size)
+            f.write(b''.join(BAR_RECORD.pack(*bar) for bar in records))
+
+        self._written = start + len(records)
+        self._current_on_disk = True
+        self._closed = []
+
+    def compact(self):
+        """Rewrite the file keeping only the last `retain` bars."""
+        self._write()
+        bars = read_bars(self.path, self.retain)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(BAR_RECORD.pack(*bar) for bar in bars))
+        os.replace(tmp_path, self.path)
+        self._written = len(bars)
+
+    def bars(self, last_n=None, include_current=True):
+        """
+        Latest bars, oldest first.
+
+        Args:
+            last_n: Number of bars (None = all)
+            include_current: Include the bar still being built
+
+        Returns:
+            list of (open_time, open, high, low, close, volume) tuples
+        """
+        memory = list(self._closed)
+        if include_current and self._current is not None:
+            memory.append(tuple(self._current))
+
+        needed = None if last_n is None else last_n - len(memory)
+        if needed is not None and needed <= 0:
+            return memory[-last_n:]
+
+        disk_count = self._written - (1 if self._current_on_disk else 0)
+        disk = read_bars(self.path, needed, end=disk_count) if disk_count else []
+        return disk + memory
+
+    def prices(self, last_n=None, include_current=True):
+        """Bar closes as [timestamp_ms, close] pairs (the format the analysis functions take)."""
+        return [[bar[0] * 1000, bar[4]] for bar in self.bars(last_n, include_current)]
+
+
+class BarBuilder:
+    """Bars for several timeframes, fed from the same tick stream."""
+
+    def __init__(self, prefix, timeframes=DEFAULT_TIMEFRAMES, retain=None):
+        """
+        Args:
+            prefix: File prefix; each timeframe is stored at '<prefix>_<timeframe>.bin'
+            timeframes: Timeframe names from TIMEFRAMES
+            retain: Optional {timeframe: bars kept} overriding DEFAULT_RETAIN
+        """
+        retain = {**DEFAULT_RETAIN, **(retain or {})}
+        self.series = {}
+        for timeframe in timeframes:
+            if timeframe not in TIMEFRAMES:
+                raise ValueError(f"Unknown timeframe '{timeframe}' (expected one of {', '.join(TIMEFRAMES)})")
+            self.series[timeframe] = BarSeries(f"{prefix}_{timeframe}.bin", TIMEFRAMES[timeframe],
+                                               retain.get(timeframe))
+
+    def update(self, timestamp, price, volume=None):
+        """
+        Add a tick to every timeframe.
+
+        Returns:
+            dict: {timeframe: bar} for the bars this tick closed
+        """
+        closed = {}
+        for timeframe, series in self.series.items():
+            bar = series.update(timestamp, price, volume)
+            if bar is not None:
+                closed[timeframe] = bar
+        return closed
+
+    def flush(self):
+        """Checkpoint every timeframe."""
+        for series in self.series.values():
+            series.flush()
+
+    def bars(self, timeframe, last_n=None, include_current=True):
+        """Bars of one timeframe (see BarSeries.bars)."""
+        return self.series[timeframe].bars(last_n, include_current)
+
+    def prices(self, timeframe, last_n=None, include_current=True):
+        """Closes of one timeframe as [timestamp_ms, close] pairs."""
+        return self.series[timeframe].prices(last_n, include_current)
+
+
+def resample_bars(bars, interval):
+    """
+    Merge bars into longer bars (e.g. 30-minute candles into 1h bars).
+    
+    Args:
+        bars: (open_time, open, high, low, close, volume) tuples, oldest first
+        interval: Target bar length in seconds (a multiple of the source bar length)
+    
+    Returns:
+        list of bars, oldest first
+    """
+    merged = []
+    for open_time, open_, high, low, close, volume in bars:
+        start = open_time - open_time % interval
+        if merged and merged[-1][0] == start:
+            bar = merged[-1]
+            bar[2] = max(bar[2], high)
+            bar[3] = min(bar[3], low)
+            bar[4] = close
+            if not math.isnan(volume):
+                bar[5] = volume if math.isnan(bar[5]) else bar[5] + volume
+        else:
+            merged.append([start, open_, high, low, close, volume])
+    return [tuple(bar) for bar in merged]
+
+
+def read_bars(path, last_n=None, end=None):
+    """
+    Read bars through a memory map without loading the whole file.
+
+    Args:
+        path: Binary bar file
+        last_n: Only return the last N bars before `end` (None = all)
+        end: Number of records to consider from the start of the file (None = all)
+
+    Returns:
+        list of (open_time, open, high, low, close, volume) tuples, oldest first
+    """
+    if not os.path.exists(path):
+        return []
+
+    with open(path, 'rb') as f:
+        count = os.fstat(f.fileno()).st_size // BAR_RECORD.size
+        if end is not None:
+            count = min(count, end)
+        if count == 0:
+            return []
+
+        start = 0 if last_n is None else max(0, count - last_n)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return list(BAR_RECORD.iter_unpack(mm[start * BAR_RECORD.size:count * BAR_RECORD.size]))
@@ -5,69 +5,165 @@ Fetches 30/60/90 day data from CoinGecko and analyzes trends, support/resistance
 
 import json
 import os
+import time
 from datetime import datetime, timedelta
-import requests
+from .http_session import http_get
+from .bar_store import NO_VOLUME
+from .history_cache import HistoryCache, import_json_cache, DAY_MS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - the pure-Python path is used without it
+    np = None
 
 # CoinGecko API endpoint for historical data
 COINGECKO_API = "https://api.coingecko.com/api/v3"
+CACHE_MAX_AGE = 21600  # Refresh the cached tail every 6 hours
 
-def fetch_historical_data(crypto_id, days=90, cache_file=None):
+def fetch_historical_data(crypto_id, days=90, cache_file=None, max_age=CACHE_MAX_AGE):
     """
     Fetch historical price data from CoinGecko.
     
+    With a cache file, only the days missing from the cache are downloaded
+    (market_chart/range from the last cached day, plus the days before the first
+    one when a longer lookback is asked for) and merged into it.
+    
     Args:
         crypto_id: 'ethereum' or 'bitcoin'
-        days: 1, 7, 30, 90, 365 (CoinGecko limits)
-        cache_file: JSON file to cache data locally
+        days: Lookback in days (any value once cached; CoinGecko allows up to 365 for free)
+        cache_file: Columnar cache file (see modules.history_cache); a legacy
+                    historical_*.json cache next to it is imported once
+        max_age: Seconds before the cached tail is refreshed
     
     Returns:
-        dict with 'prices', 'volumes', 'market_caps' or None if error
+        dict with 'prices', 'market_caps', 'total_volumes' or None if error
     """
-    if cache_file and os.path.exists(cache_file):
+    if not cache_file:
         try:
-            with open(cache_file, 'r') as f:
-                cached = json.load(f)
-                # Check if cache is fresh (within 6 hours)
-                cache_time = datetime.fromisoformat(cached.get('_cached_at', '1970-01-01'))
-                if (datetime.now() - cache_time).total_seconds() < 21600:  # 6 hours
-                    return cached['data']
-        except (json.JSONDecodeError, KeyError):
-            pass
+            return _fetch_market_chart(crypto_id, days)
+        except Exception as e:
+            print(f"[ERROR] Failed to fetch historical data: {e}")
+            return None
+    
+    if cache_file.endswith('.json'):
+        legacy_file, cache_file = cache_file, cache_file[:-len('.json')] + '.bin'
+    else:
+        legacy_file = os.path.splitext(cache_file)[0] + '.json'
+    
+    cache = HistoryCache(cache_file)
+    if not len(cache) and os.path.exists(legacy_file):
+        imported = import_json_cache(legacy_file, cache)
+        print(f"[INFO] Imported {imported} days from {legacy_file} into {cache_file}")
+    
+    now = time.time()
+    try:
+        if not len(cache):
+            cache.merge(_fetch_market_chart(crypto_id, days))
+            cache.save()
+        elif now - cache.fetched_at >= max_age:
+            start_ms = now * 1000 - days * DAY_MS
+            if cache.first_day() > start_ms + DAY_MS:
+                # Longer lookback than cached - fetch the missing head
+                cache.merge(_fetch_market_chart_range(crypto_id, start_ms / 1000, cache.first_day() / 1000))
+            # Missing tail: from the last complete day to now
+            tail_start = cache.last_closed_day() or cache.first_day()
+            cache.merge(_fetch_market_chart_range(crypto_id, tail_start / 1000, now))
+            cache.save()
+    except Exception as e:
+        print(f"[ERROR] Failed to fetch historical data: {e}")
+        if not len(cache):
+            return None
+        # Serve the stale cache rather than nothing
+    
+    return cache.window(days, now * 1000)
+
+
+def _fetch_market_chart(crypto_id, days):
+    """Full daily market_chart download."""
+    url = f"{COINGECKO_API}/coins/{crypto_id}/market_chart"
+    params = {
+        'vs_currency': 'hkd',
+        'days': days,
+        'interval': 'daily'
+    }
+    
+    response = http_get(url, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def _fetch_market_chart_range(crypto_id, from_ts, to_ts):
+    """market_chart/range between two epoch-second timestamps (hourly points for ranges up to 90 days)."""
+    url = f"{COINGECKO_API}/coins/{crypto_id}/market_chart/range"
+    params = {
+        'vs_currency': 'hkd',
+        'from': int(from_ts),
+        'to': int(to_ts)
+    }
+    
+    response = http_get(url, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_recent_prices(crypto_id, days=1):
+    """
+    Fetch recent intraday prices from CoinGecko (no cache - used to warm up the live window).
     
+    Args:
+        crypto_id: 'ethereum' or 'bitcoin'
+        days: 1 gives ~5-minute points, 2-90 give hourly points
+    
+    Returns:
+        list of [timestamp_ms, price] pairs or None if error
+    """
     try:
         url = f"{COINGECKO_API}/coins/{crypto_id}/market_chart"
-        params = {
-            'vs_currency': 'hkd',
-            'days': days,
-            'interval': 'daily'
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
+        response = http_get(url, params={'vs_currency': 'hkd', 'days': days})
         response.raise_for_status()
-        data = response.json()
-        
-        # Cache the data
-        if cache_file:
-            cache_data = {
-                'data': data,
-                '_cached_at': datetime.now().isoformat()
-            }
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f)
-        
-        return data
+        return response.json().get('prices') or None
     
     except Exception as e:
-        print(f"[ERROR] Failed to fetch historical data: {e}")
+        print(f"[ERROR] Failed to fetch recent prices: {e}")
         return None
 
 
-def analyze_support_resistance(prices):
+def fetch_ohlc(crypto_id, days=1):
+    """
+    Fetch OHLC candles from CoinGecko (no cache - used to seed the ATR).
+    
+    Args:
+        crypto_id: 'ethereum' or 'bitcoin'
+        days: 1-2 give 30-minute candles, 3-30 give 4-hour candles, longer gives 4-day candles
+    
+    Returns:
+        list of (open_time, open, high, low, close, volume) bars in the modules.bar_store
+        format (open time in epoch seconds, volume NaN), or None if error
+    """
+    try:
+        url = f"{COINGECKO_API}/coins/{crypto_id}/ohlc"
+        response = http_get(url, params={'vs_currency': 'hkd', 'days': days})
+        response.raise_for_status()
+        candles = sorted(response.json() or [])
+    except Exception as e:
+        print(f"[ERROR] Failed to fetch OHLC data: {e}")
+        return None
+    
+    if len(candles) < 2:
+        return None
+    # Candles are stamped at their close; the spacing gives the open time
+    step = candles[1][0] - candles[0][0]
+    return [((ts - step) / 1000, open_, high, low, close, NO_VOLUME)
+            for ts, open_, high, low, close in candles]
+
+
+def analyze_support_resistance(prices, index=None):
     """
     Find support and resistance levels from price data.
     
     Args:
         prices: List of [timestamp, price] pairs
+        index: Optional PriceRangeIndex over the same prices (O(1) highs/lows, adds 'levels')
     
     Returns:
         dict with 'support', 'resistance', 'pivot'
@@ -75,19 +171,26 @@ def analyze_support_resistance(prices):
     if not prices or len(prices) < 5:
         return {'support': None, 'resistance': None, 'pivot': None}
     
-    # Extract just the price values
-    price_values = [p[1] for p in prices]
-    
-    # Recent high/low (last 30 data points)
-    recent_high = max(price_values[-30:])
-    recent_low = min(price_values[-30:])
-    
-    # Historical high/low (all data)
-    hist_high = max(price_values)
-    hist_low = min(price_values)
+    if index is not None:
+        # Range queries instead of scanning the series
+        recent_high = index.high(-30)
+        recent_low = index.low(-30)
+        hist_high = index.high()
+        hist_low = index.low()
+    else:
+        # Extract just the price values
+        price_values = [p[1] for p in prices]
+        
+        # Recent high/low (last 30 data points)
+        recent_high = max(price_values[-30:])
+        recent_low = min(price_values[-30:])
+        
+        # Historical high/low (all data)
+        hist_high = max(price_values)
+        hist_low = min(price_values)
     
     # Pivot point = (high + low + close) / 3
-    current_price = price_values[-1]
+    current_price = prices[-1][1]
     pivot = (recent_high + recent_low + current_price) / 3
     
     # Support = lower recent low + buffer
@@ -96,7 +199,7 @@ def analyze_support_resistance(prices):
     # Resistance = upper recent high + buffer
     resistance = recent_high * 1.02  # 2% buffer above recent high
     
-    return {
+    result = {
         'support': support,
         'resistance': resistance,
         'pivot': pivot,
@@ -106,6 +209,9 @@ def analyze_support_resistance(prices):
         'hist_low': hist_low,
         'current_price': current_price
     }
+    if index is not None:
+        result['levels'] = index.levels()
+    return result
 
 
 def detect_trend(prices):
@@ -271,12 +377,16 @@ def get_price_percentile(current_price, prices):
     return max(0, min(100, int(percentile)))
 
 
-def analyze_price_action(prices):
+def analyze_price_action(prices, volumes=None, backend='auto', index=None):
     """
     Comprehensive price action analysis combining all metrics.
     
     Args:
         prices: List of [timestamp, price] pairs
+        volumes: Optional list of [timestamp, volume] pairs (adds a 'volume' entry)
+        backend: 'python', 'numpy', or 'auto' (NumPy when installed); results are identical
+        index: Optional PriceRangeIndex over the same prices; adds multi-window
+               support/resistance under support_resistance['levels']
     
     Returns:
         dict with all analyses combined
@@ -284,19 +394,31 @@ def analyze_price_action(prices):
     if not prices or len(prices) < 5:
         return None
     
-    support_res = analyze_support_resistance(prices)
+    if backend == 'numpy' or (backend == 'auto' and np is not None):
+        analysis = _analyze_price_action_numpy(prices, volumes)
+        if index is not None:
+            analysis['support_resistance']['levels'] = index.levels()
+        return analysis
+    
+    support_res = analyze_support_resistance(prices, index)
     trend = detect_trend(prices)
     volatility = calculate_volatility(prices)
     current_price = prices[-1][1]
     percentile = get_price_percentile(current_price, prices)
     
+    return _combine_analysis(support_res, trend, volatility, percentile, current_price,
+                             analyze_volume(volumes) if volumes is not None else None)
+
+
+def _combine_analysis(support_res, trend, volatility, percentile, current_price, volume=None):
+    """Build the analyze_price_action() result from its parts."""
     # Calculate distance from support as percentage
     if support_res['support']:
         dist_to_support = ((current_price - support_res['support']) / support_res['support']) * 100
     else:
         dist_to_support = None
     
-    return {
+    analysis = {
         'support_resistance': support_res,
         'trend': trend,
         'volatility': volatility,
@@ -304,12 +426,153 @@ def analyze_price_action(prices):
         'distance_to_support_pct': dist_to_support,
         'analyzed_at': datetime.now().isoformat()
     }
+    if volume is not None:
+        analysis['volume'] = volume
+    return analysis
+
+
+# --- NumPy backend -----------------------------------------------------------
+# Same metrics as the functions above, computed with vectorized ops on arrays
+# converted once. Window sums (at most 30 values) go through Python's sum() in the
+# same order as the pure-Python path so the results are bit-for-bit identical.
+
+def _np_support_resistance(prices, values):
+    # Pick extremes by index so the original values (not float copies) are returned
+    offset = max(0, len(values) - 30)
+    recent = values[offset:]
+    recent_high = prices[offset + int(recent.argmax())][1]
+    recent_low = prices[offset + int(recent.argmin())][1]
+    current_price = prices[-1][1]
+    
+    return {
+        'support': recent_low * 0.98,
+        'resistance': recent_high * 1.02,
+        'pivot': (recent_high + recent_low + current_price) / 3,
+        'recent_high': recent_high,
+        'recent_low': recent_low,
+        'hist_high': prices[int(values.argmax())][1],
+        'hist_low': prices[int(values.argmin())][1],
+        'current_price': current_price
+    }
+
+
+def _np_trend(values):
+    insufficient = {'trend': 'insufficient_data', 'strength': 0, 'lower_lows_count': 0, 'higher_lows_count': 0}
+    if len(values) < 10:
+        return insufficient
+    
+    # Local lows: lower than both neighbours
+    middle = values[1:-1]
+    lows = middle[(middle < values[:-2]) & (middle < values[2:])]
+    if len(lows) < 3:
+        return insufficient
+    
+    higher_lows = int(np.count_nonzero(lows[1:] > lows[:-1]))
+    lower_lows = (len(lows) - 1) - higher_lows
+    
+    total = higher_lows + lower_lows
+    strength = (higher_lows - lower_lows) / total if total > 0 else 0
+    
+    if strength > 0.3:
+        trend = 'uptrend'
+    elif strength < -0.3:
+        trend = 'downtrend'
+    else:
+        trend = 'sideways'
+    
+    return {
+        'trend': trend,
+        'strength': strength,
+        'higher_lows_count': higher_lows,
+        'lower_lows_count': lower_lows
+    }
+
+
+def _np_volatility(values):
+    pct_changes = np.abs(((values[1:] - values[:-1]) / values[:-1]) * 100)
+    
+    last_7 = pct_changes[-7:].tolist()
+    last_30 = pct_changes[-30:].tolist()
+    vol_7 = sum(last_7) / 7 if len(pct_changes) >= 7 else sum(last_7) / len(last_7)
+    vol_30 = sum(last_30) / 30 if len(pct_changes) >= 30 else sum(last_30) / len(last_30)
+    current_vol = float(pct_changes[-1]) if len(pct_changes) else 0
+    
+    if vol_30 > 5.0:
+        vol_level = 'extreme'
+    elif vol_30 > 3.5:
+        vol_level = 'high'
+    elif vol_30 > 2.0:
+        vol_level = 'moderate'
+    else:
+        vol_level = 'low'
+    
+    return {
+        '7day_vol': round(vol_7, 2),
+        '30day_vol': round(vol_30, 2),
+        'current_vol': round(current_vol, 2),
+        'vol_level': vol_level
+    }
+
+
+def _np_percentile(current_price, values):
+    min_price = float(values.min())
+    max_price = float(values.max())
+    if max_price == min_price:
+        return 50
+    
+    percentile = ((current_price - min_price) / (max_price - min_price)) * 100
+    return max(0, min(100, int(percentile)))
+
+
+def _np_volume(volumes):
+    if not volumes or len(volumes) < 5:
+        return analyze_volume(volumes)
+    
+    volume_values = np.asarray(volumes, dtype=float)[:, 1]
+    if len(volume_values) > 20:
+        avg_volume = sum(volume_values[-21:-1].tolist()) / 20
+    else:
+        avg_volume = sum(volume_values.tolist()) / len(volume_values)
+    current_volume = volumes[-1][1]
+    
+    spike_factor = current_volume / avg_volume if avg_volume > 0 else 1.0
+    
+    if spike_factor > 1.8:
+        volume_signal = 'extreme_spike'
+    elif spike_factor > 1.3:
+        volume_signal = 'high_spike'
+    elif spike_factor > 0.7:
+        volume_signal = 'normal'
+    else:
+        volume_signal = 'low_volume'
+    
+    return {
+        'avg_volume': avg_volume,
+        'current_volume': current_volume,
+        'spike_factor': round(spike_factor, 2),
+        'volume_signal': volume_signal
+    }
+
+
+def _analyze_price_action_numpy(prices, volumes=None):
+    """analyze_price_action() on NumPy arrays (prices converted once)."""
+    values = np.asarray(prices, dtype=float)[:, 1]
+    current_price = prices[-1][1]
+    
+    return _combine_analysis(
+        _np_support_resistance(prices, values),
+        _np_trend(values),
+        _np_volatility(values),
+        _np_percentile(current_price, values),
+        current_price,
+        _np_volume(volumes) if volumes is not None else None
+    )
 
 
 if __name__ == "__main__":
     # Test the analyzer
     print("Testing historical analyzer...")
-    data = fetch_historical_data('ethereum', days=30, cache_file='test_cache.json')
+    data = fetch_historical_data('ethereum', days=30, cache_file='test_cache.bin')
     
     if data:
         prices = data.get('prices', [])
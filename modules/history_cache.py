@@ -0,0 +1,198 @@
+"""
+Columnar on-disk cache for CoinGecko daily market data.
+The file holds a small header and four float64 columns (timestamp ms, price,
+market cap, volume), one row per UTC day plus an optional "live" row for the
+current day. fetch_historical_data() only downloads the days after the last
+cached one (and, for a longer lookback, the days before the first), merges
+them in and rewrites the file atomically.
+"""
+
+import json
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+
+MAGIC = b'HCOL'
+VERSION = 1
+HEADER = struct.Struct('<4sIId')  # (magic, version, rows, fetched_at epoch seconds)
+COLUMNS = ('timestamps', 'prices', 'market_caps', 'volumes')
+DAY_MS = 86400 * 1000
+
+
+def is_history_cache(path):
+    """True if the file starts with the history cache header."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+
+class HistoryCache:
+    """Daily rows kept as parallel arrays, oldest first."""
+
+    def __init__(self, path):
+        """
+        Load a cache file (an empty cache if it doesn't exist or is unreadable).
+
+        Args:
+            path: Cache file (e.g., 'historical_ETH.bin')
+        """
+        self.path = path
+        self.fetched_at = 0.0
+        for name in COLUMNS:
+            setattr(self, name, array('d'))
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        except IOError:
+            return
+
+        if len(raw) < HEADER.size:
+            return
+        magic, version, rows, fetched_at = HEADER.unpack_from(raw)
+        if magic != MAGIC or version != VERSION or len(raw) != HEADER.size + rows * 8 * len(COLUMNS):
+            print(f"[WARNING] Ignoring unreadable history cache {self.path}")
+            return
+
+        offset = HEADER.size
+        for name in COLUMNS:
+            column = array('d')
+            column.frombytes(raw[offset:offset + rows * 8])
+            setattr(self, name, column)
+            offset += rows * 8
+        self.fetched_at = fetched_at
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def save(self):
+        """Write the cache (temporary file + rename, so readers never see a partial file)."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self), self.fetched_at))
+            for name in COLUMNS:
+                f.write(getattr(self, name).tobytes())
+        os.replace(tmp_path, self.path)
+
+    def first_day(self):
+        """Timestamp (ms) of the oldest daily row, or None."""
+        return self.timestamps[0] if len(self) else None
+
+    def last_closed_day(self):
+        """Timestamp (ms) of the newest complete day, or None."""
+        for i in range(len(self) - 1, -1, -1):
+            if self.timestamps[i] % DAY_MS == 0:
+                return self.timestamps[i]
+        return None
+
+    def rows(self):
+        """All rows as (timestamp_ms, price, market_cap, volume) tuples."""
+        return list(zip(*(getattr(self, name) for name in COLUMNS)))
+
+    def merge(self, data):
+        """
+        Merge a market_chart or market_chart/range response.
+
+        Points are reduced to one row per UTC day (the first point of the day, stamped at
+        midnight like CoinGecko's daily series). The newest point of the current day is
+        kept as the live row. Days already cached are not replaced.
+
+        Args:
+            data: dict with 'prices', 'market_caps' and 'total_volumes' lists of [ms, value]
+
+        Returns:
+            int: Number of new daily rows
+        """
+        incoming = _daily_rows(data)
+        days = {row[0]: row for row in self.rows() if row[0] % DAY_MS == 0}
+        live = [row for row in self.rows() if row[0] % DAY_MS != 0]
+
+        added = 0
+        for row in incoming:
+            if row[0] % DAY_MS != 0:
+                live = [row]
+            elif row[0] not in days:
+                days[row[0]] = row
+                added += 1
+
+        merged = [days[day] for day in sorted(days)]
+        if live and (not merged or live[0][0] > merged[-1][0]):
+            merged.append(live[0])
+
+        for index, name in enumerate(COLUMNS):
+            setattr(self, name, array('d', (row[index] for row in merged)))
+        self.fetched_at = time.time()
+        return added
+
+    def window(self, days, now_ms=None):
+        """
+        The last `days` days in the market_chart response format.
+
+        Args:
+            days: Lookback in days
+            now_ms: End of the window (default: now)
+
+        Returns:
+            dict with 'prices', 'market_caps' and 'total_volumes'
+        """
+        now_ms = now_ms if now_ms is not None else time.time() * 1000
+        start = bisect_left(self.timestamps, now_ms - days * DAY_MS)
+
+        timestamps = self.timestamps[start:]
+        return {
+            'prices': [[ts, value] for ts, value in zip(timestamps, self.prices[start:])],
+            'market_caps': [[ts, value] for ts, value in zip(timestamps, self.market_caps[start:])],
+            'total_volumes': [[ts, value] for ts, value in zip(timestamps, self.volumes[start:])]
+        }
+
+
+def _daily_rows(data):
+    """Reduce market_chart points to (timestamp_ms, price, market_cap, volume) rows, one per UTC day."""
+    prices = data.get('prices', [])
+    caps = {p[0]: p[1] for p in data.get('market_caps', [])}
+    volumes = {p[0]: p[1] for p in data.get('total_volumes', [])}
+    if not prices:
+        return []
+
+    today = (time.time() * 1000) // DAY_MS
+    rows = []
+    seen_days = set()
+    for ts, price in sorted(prices, key=lambda p: p[0]):
+        day = ts // DAY_MS
+        if day >= today:
+            continue
+        if day not in seen_days:
+            seen_days.add(day)
+            rows.append((day * DAY_MS, price, caps.get(ts, 0.0) or 0.0, volumes.get(ts, 0.0) or 0.0))
+
+    # Newest point of the current day (or a midnight point) is the live row
+    ts, price = max(prices, key=lambda p: p[0])
+    if ts // DAY_MS >= today:
+        rows.append((ts, price, caps.get(ts, 0.0) or 0.0, volumes.get(ts, 0.0) or 0.0))
+    return rows
+
+
+def import_json_cache(json_path, cache):
+    """
+    Migrate a legacy historical_*.json cache ({'data': market_chart, '_cached_at': ...}).
+
+    Returns:
+        int: Number of daily rows imported
+    """
+    try:
+        with open(json_path) as f:
+            cached = json.load(f)
+        data = cached.get('data', cached)
+    except (json.JSONDecodeError, IOError, AttributeError):
+        return 0
+
+    added = cache.merge(data)
+    cache.fetched_at = 0.0  # Let the next fetch bring it up to date
+    cache.save()
+    return added
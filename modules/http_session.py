@@ -0,0 +1,117 @@
+"""
+Shared HTTP connection pool for CoinGecko and Telegram calls.
+Keeps one keep-alive session per host so repeated calls skip the TCP/TLS handshake.
+Timeouts, pool sizes and retries are set once from the `http:` section of config.yaml.
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics import get_metrics
+
+DEFAULT_HTTP_CONFIG = {
+    'timeout': 10,              # Seconds per request
+    'pool_connections': 4,      # Connection pools cached per session
+    'pool_maxsize': 10,         # Keep-alive connections per host
+    'retries': 2,               # Retries for idempotent requests (GET)
+    'backoff_factor': 0.5,      # 0.5s, 1s, 2s ... between retries
+    'retry_statuses': [429, 500, 502, 503, 504]
+}
+
+_http_config = dict(DEFAULT_HTTP_CONFIG)
+_sessions = {}
+_lock = threading.Lock()
+
+
+def configure_http(http_config=None):
+    """
+    Apply HTTP settings from config.yaml.
+
+    Args:
+        http_config: The `http:` section of config.yaml (missing keys use defaults)
+    """
+    global _http_config
+
+    with _lock:
+        _http_config = dict(DEFAULT_HTTP_CONFIG)
+        _http_config.update(http_config or {})
+
+        # Drop existing sessions so the new pool settings take effect
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def _build_session():
+    """Create a session with pooled, retrying adapters."""
+    retry = Retry(
+        total=_http_config['retries'],
+        backoff_factor=_http_config['backoff_factor'],
+        status_forcelist=_http_config['retry_statuses'],
+        allowed_methods=['GET'],  # Never replay POSTs (e.g., duplicate Telegram messages)
+        raise_on_status=False     # Hand the last response back so callers see the status
+    )
+    adapter = HTTPAdapter(
+        pool_connections=_http_config['pool_connections'],
+        pool_maxsize=_http_config['pool_maxsize'],
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(url):
+    """
+    Get the shared keep-alive session for a URL's host.
+
+    Args:
+        url: Any URL on the host (e.g., 'https://api.coingecko.com/api/v3/simple/price')
+
+    Returns:
+        requests.Session
+    """
+    host = urlsplit(url).netloc
+
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _build_session()
+            _sessions[host] = session
+        return session
+
+
+def get_timeout():
+    """Configured request timeout in seconds."""
+    return _http_config['timeout']
+
+
+def _count_rate_limits(url, response):
+    """Count 429s for the metrics endpoint, including ones urllib3 retried away."""
+    retries = getattr(response.raw, 'retries', None)
+    history = retries.history if retries is not None else ()
+    count = sum(1 for attempt in history if attempt.status == 429) + (response.status_code == 429)
+    if count:
+        get_metrics().inc('http_rate_limited_total', count, host=urlsplit(url).netloc)
+
+
+def http_get(url, **kwargs):
+    """GET through the shared pool (uses the configured timeout unless one is given)."""
+    kwargs.setdefault('timeout', get_timeout())
+    response = get_session(url).get(url, **kwargs)
+    _count_rate_limits(url, response)
+    return response
+
+
+def http_post(url, **kwargs):
+    """POST through the shared pool (uses the configured timeout unless one is given)."""
+    kwargs.setdefault('timeout', get_timeout())
+    response = get_session(url).post(url, **kwargs)
+    _count_rate_limits(url, response)
+    return response
@@ -0,0 +1,140 @@
+"""
+Per-stage latency histograms for the main loop.
+Each (asset, stage) pair keeps counts in log-spaced buckets, so recording a
+sample is O(1) and memory stays fixed no matter how long the process runs.
+Percentiles (p50/p95/p99) are read from the buckets when the stats are dumped.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+MIN_SECONDS = 1e-6      # Lower edge of the first bucket (1 µs)
+BUCKETS_PER_DOUBLING = 8  # ~9% wide buckets, so percentiles are within ~9%
+NUM_BUCKETS = 8 * 28      # Up to 1µs * 2^28 ≈ 4.5 minutes
+
+_LOG_GROWTH = math.log(2) / BUCKETS_PER_DOUBLING
+
+
+class LatencyHistogram:
+    """Log-bucketed latency distribution."""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """Add one sample (seconds)."""
+        if seconds <= MIN_SECONDS:
+            index = 0
+        else:
+            index = min(NUM_BUCKETS - 1, int(math.log(seconds / MIN_SECONDS) / _LOG_GROWTH) + 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        """
+        Approximate percentile from the buckets.
+
+        Args:
+            pct: 0-100
+
+        Returns:
+            float: Seconds (upper edge of the bucket holding the percentile, capped at the max)
+        """
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * pct / 100)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.max, MIN_SECONDS * math.exp(index * _LOG_GROWTH))
+        return self.max
+
+    def summary(self):
+        """Stats in milliseconds."""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3)
+        }
+
+
+class LatencyTracker:
+    """Histograms per asset and stage."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, asset, stage, seconds):
+        """
+        Record one timing.
+
+        Args:
+            asset: Asset symbol (or 'all' for work shared by every asset)
+            stage: Stage name (e.g., 'evaluate')
+            seconds: Duration
+        """
+        histogram = self._histograms.get((asset, stage))
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault((asset, stage), LatencyHistogram())
+        histogram.record(seconds)
+
+    @contextmanager
+    def stage(self, asset, stage):
+        """Time the enclosed block: `with tracker.stage('ETH', 'evaluate'): ...`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(asset, stage, time.perf_counter() - started)
+
+    def summary(self):
+        """
+        Returns:
+            dict: {asset: {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}}
+        """
+        with self._lock:
+            items = list(self._histograms.items())
+        result = {}
+        for (asset, stage), histogram in sorted(items):
+            result.setdefault(asset, {})[stage] = histogram.summary()
+        return result
+
+    def dump(self, path):
+        """Write the summary to a JSON file (atomically, so readers never see a partial file)."""
+        data = {
+            'updated': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'uptime_sec': round(time.time() - self.started),
+            'stages': self.summary()
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+# One tracker per process, shared by every AssetMonitor
+_tracker = LatencyTracker()
+
+
+def get_latency_tracker():
+    """Get the process-wide LatencyTracker."""
+    return _tracker
@@ -0,0 +1,138 @@
+"""
+Prometheus-style metrics for the notifier process.
+The tick loop updates plain dicts of counters and gauges; a daemon thread
+serves them at http://<host>:<port>/metrics. The server copies the dicts
+(an atomic operation under the GIL) and formats the copy, so the loop never
+waits on a lock or on a slow scraper.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .latency import get_latency_tracker
+
+PREFIX = 'crypto_notifier_'
+
+# name -> (type, help)
+METRICS = {
+    'ticks_total': ('counter', 'Price ticks processed'),
+    'fetch_failures_total': ('counter', 'Price fetches that failed'),
+    'http_rate_limited_total': ('counter', 'HTTP 429 responses, including ones retried internally'),
+    'alerts_submitted_total': ('counter', 'Alerts past the spam filter, handed to Telegram delivery'),
+    'alerts_suppressed_total': ('counter', 'Alerts held back by the signal spam filter'),
+    'telegram_messages_total': ('counter', 'Telegram messages sent, after rate limiting and digests'),
+    'trailing_stops_hit_total': ('counter', 'Trailing stops triggered'),
+    'price_hkd': ('gauge', 'Latest price'),
+    'moving_average_hkd': ('gauge', 'Current moving average'),
+    'rsi': ('gauge', 'Current RSI'),
+    'support_hkd': ('gauge', 'Support level per lookback window'),
+    'resistance_hkd': ('gauge', 'Resistance level per lookback window'),
+}
+
+
+class Metrics:
+    """Counters and gauges keyed by (name, sorted label pairs)."""
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+
+    def inc(self, name, amount=1, **labels):
+        """Increase a counter (e.g., inc('ticks_total', asset='ETH'))."""
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """Set a gauge (e.g., set('rsi', 42.1, asset='ETH'))."""
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def snapshot(self):
+        """Copies of the counter and gauge dicts."""
+        return dict(self._counters), dict(self._gauges)
+
+    def render(self):
+        """Metrics in the Prometheus text exposition format."""
+        counters, gauges = self.snapshot()
+        samples = {}
+        for (name, labels), value in list(counters.items()) + list(gauges.items()):
+            samples.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(samples):
+            metric_type, help_text = METRICS.get(name, ('untyped', name))
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {metric_type}")
+            for labels, value in sorted(samples[name]):
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+
+        # Stage latencies from the latency tracker, as a summary per asset/stage
+        latency = get_latency_tracker().summary()
+        if latency:
+            name = f"{PREFIX}stage_latency_seconds"
+            lines.append(f"# HELP {name} Main loop stage latency")
+            lines.append(f"# TYPE {name} summary")
+            for asset, stages in latency.items():
+                for stage, stats in stages.items():
+                    base = (('asset', asset), ('stage', stage))
+                    for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms')):
+                        labels = _format_labels(base + (('quantile', quantile),))
+                        lines.append(f"{name}{labels} {stats[key] / 1000}")
+                    lines.append(f"{name}_count{_format_labels(base)} {stats['count']}")
+                    lines.append(f"{name}_sum{_format_labels(base)} {stats['mean_ms'] * stats['count'] / 1000}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = get_metrics().render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the console output
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """
+    Serve /metrics from a daemon thread.
+
+    Args:
+        port: TCP port (e.g., 9108)
+        host: Interface to bind (default: localhost only)
+
+    Returns:
+        ThreadingHTTPServer, or None if the port couldn't be bound
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"[WARNING] Metrics server not started on {host}:{port}: {e}")
+        return None
+
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
+
+
+# One registry per process, shared by every AssetMonitor
+_metrics = Metrics()
+
+
+def get_metrics():
+    """Get the process-wide Metrics registry."""
+    return _metrics
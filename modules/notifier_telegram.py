@@ -4,12 +4,13 @@ Sends formatted trading signals directly to your Telegram.
 Shows confidence levels and decision scenarios.
 """
 
-import requests
 import json
 from datetime import datetime
 from .confidence_levels import get_confidence_level, format_confidence_display
+from .http_session import http_post
 
 TELEGRAM_API_URL = "https://api.telegram.org/bot"
+MAX_MESSAGE_LENGTH = 4096  # Telegram rejects longer message texts
 
 
 def send_telegram_message(bot_token, chat_id, message, parse_mode="HTML"):
@@ -39,7 +40,7 @@ def send_telegram_message(bot_token, chat_id, message, parse_mode="HTML"):
             'disable_web_page_preview': True
         }
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = http_post(url, json=payload)
         
         if response.status_code == 200:
             return True
@@ -173,13 +174,54 @@ def format_hold_signal(price, asset, moving_avg, reason=""):
     return message
 
 
+def format_digest_line(alert_type, data):
+    """One-line summary of an alert for a digest."""
+    emojis = {'BUY': '🟢', 'SELL': '🔴', 'HOLD': '⏸️'}
+    asset = data.get('asset', 'ETH').upper()
+    
+    line = f"{emojis.get(alert_type, '⚠️')} <b>{alert_type} {asset}</b>"
+    if 'price' in data:
+        line += f" @ {data['price']:,.0f} HKD"
+    if alert_type == 'BUY':
+        line += f" | {data.get('amount_hkd', 0):,.0f} HKD"
+    elif alert_type == 'SELL':
+        line += f" | {data.get('amount_crypto', 0):.6f} {asset} ({data.get('profit_pct', 0):+.1f}%)"
+    elif alert_type not in emojis:
+        line += f" | {data.get('message', '')}"
+    if 'conviction' in data:
+        conf = get_confidence_level(data['conviction'])
+        line += f" | {conf['emoji']} {data['conviction']}%"
+    return line
+
+
+def format_digest(alerts):
+    """
+    Format several alerts as one Telegram message (one line each).
+    
+    Args:
+        alerts: List of (alert_type, data) pairs, as passed to format_alert
+    
+    Returns: Formatted message string
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+    lines = "\n".join(format_digest_line(alert_type, data) for alert_type, data in alerts)
+    
+    message = f"""📋 <b>{len(alerts)} ALERTS</b>
+━━━━━━━━━━━━━━━━━━━━━━━
+{lines}
+
+<i>{timestamp}</i>"""
+    
+    return message
+
+
 def format_alert(alert_type, data):
     """
     Generic alert formatter.
     
     Args:
-        alert_type: 'BUY', 'SELL', 'HOLD', 'ERROR'
-        data: dict with alert details
+        alert_type: 'BUY', 'SELL', 'HOLD', 'DIGEST', 'ERROR'
+        data: dict with alert details ('DIGEST': {'alerts': [(alert_type, data), ...]})
     
     Returns:
         Formatted message string
@@ -218,6 +260,9 @@ def format_alert(alert_type, data):
             reason=data.get('reason', '')
         )
     
+    elif alert_type == 'DIGEST':
+        return format_digest(data.get('alerts', []))
+    
     else:
         return f"<b>⚠️ {alert_type}</b>\n{data.get('message', 'No details')}"
 
@@ -4,6 +4,8 @@ Detects trading patterns, divergences, and risk factors.
 """
 
 import json
+import math
+from collections import deque
 from datetime import datetime, timedelta
 
 
@@ -183,6 +185,290 @@ def analyze_price_convergence_divergence(prices, short_period=12, long_period=26
     }
 
 
+class StreamingRSI:
+    """
+    Incremental RSI: one price per update(), O(1) per tick.
+    
+    smoothing='simple' averages the last `period` gains/losses and matches
+    calculate_rsi() on the same prices; smoothing='wilder' uses Wilder's
+    running average (seeded with the first `period` deltas).
+    """
+    
+    def __init__(self, period=14, smoothing='simple'):
+        if smoothing not in ('simple', 'wilder'):
+            raise ValueError(f"Unknown RSI smoothing: {smoothing}")
+        self.period = period
+        self.smoothing = smoothing
+        self.prev_price = None
+        self.count = 0          # Deltas seen
+        self.gains = deque(maxlen=period)
+        self.losses = deque(maxlen=period)
+        self.gain_sum = 0.0     # Running sums over gains/losses (simple smoothing)
+        self.loss_sum = 0.0
+        self._gain_terms = 0    # Nonzero gains/losses in the window, so an empty side sums to exactly 0
+        self._loss_terms = 0
+        self._evictions = 0
+        self.avg_gain = None    # Wilder running averages
+        self.avg_loss = None
+        self.value = None
+    
+    def update(self, price):
+        """
+        Add one price.
+        
+        Returns:
+            float: RSI value 0-100, or None until period + 1 prices were seen
+        """
+        if self.prev_price is None:
+            self.prev_price = price
+            return None
+        
+        delta = price - self.prev_price
+        self.prev_price = price
+        self.count += 1
+        gain = delta if delta > 0 else 0
+        loss = abs(delta) if delta < 0 else 0
+        if len(self.gains) == self.period:
+            old_gain, old_loss = self.gains[0], self.losses[0]
+            self.gain_sum -= old_gain
+            self.loss_sum -= old_loss
+            self._gain_terms -= old_gain > 0
+            self._loss_terms -= old_loss > 0
+            self._evictions += 1
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.gain_sum += gain
+        self.loss_sum += loss
+        self._gain_terms += gain > 0
+        self._loss_terms += loss > 0
+        
+        # Re-sum once per full turn so add/subtract rounding can't drift (amortized O(1))
+        if self._evictions >= self.period:
+            self._resum()
+        if not self._gain_terms:
+            self.gain_sum = 0.0
+        if not self._loss_terms:
+            self.loss_sum = 0.0
+        
+        if self.count < self.period:
+            return None
+        
+        if self.smoothing == 'wilder':
+            if self.avg_gain is None:
+                self.avg_gain = self.gain_sum / self.period
+                self.avg_loss = self.loss_sum / self.period
+            else:
+                self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+                self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+            avg_gain, avg_loss = self.avg_gain, self.avg_loss
+        else:
+            avg_gain = self.gain_sum / self.period
+            avg_loss = self.loss_sum / self.period
+        
+        if avg_loss == 0:
+            self.value = 100 if avg_gain > 0 else 50
+        else:
+            rs = avg_gain / avg_loss
+            self.value = round(100 - (100 / (1 + rs)), 2)
+        return self.value
+    
+    def _resum(self):
+        self.gain_sum = math.fsum(self.gains)
+        self.loss_sum = math.fsum(self.losses)
+        self._gain_terms = sum(1 for gain in self.gains if gain > 0)
+        self._loss_terms = sum(1 for loss in self.losses if loss > 0)
+        self._evictions = 0
+    
+    def to_dict(self):
+        """Serializable state (see from_dict)."""
+        return {
+            'period': self.period,
+            'smoothing': self.smoothing,
+            'prev_price': self.prev_price,
+            'count': self.count,
+            'gains': list(self.gains),
+            'losses': list(self.losses),
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss,
+            'value': self.value
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore an indicator saved with to_dict()."""
+        rsi = cls(data['period'], data.get('smoothing', 'simple'))
+        rsi.prev_price = data['prev_price']
+        rsi.count = data['count']
+        rsi.gains.extend(data['gains'])
+        rsi.losses.extend(data['losses'])
+        rsi._resum()
+        rsi.avg_gain = data.get('avg_gain')
+        rsi.avg_loss = data.get('avg_loss')
+        rsi.value = data.get('value')
+        return rsi
+
+
+class StreamingEMA:
+    """
+    Incremental EMA seeded with the SMA of the first `period` prices, O(1) per tick.
+    Matches the EMA used by analyze_price_convergence_divergence() (the mean of
+    the prices so far until `period` prices were seen).
+    """
+    
+    def __init__(self, period):
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.count = 0
+        self.seed_sum = 0
+        self.value = None
+    
+    def update(self, price):
+        """Add one price and return the current EMA."""
+        self.count += 1
+        if self.count <= self.period:
+            self.seed_sum += price
+            self.value = self.seed_sum / self.count
+        else:
+            self.value = price * self.multiplier + self.value * (1 - self.multiplier)
+        return self.value
+    
+    def to_dict(self):
+        """Serializable state (see from_dict)."""
+        return {'period': self.period, 'count': self.count, 'seed_sum': self.seed_sum, 'value': self.value}
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore an indicator saved with to_dict()."""
+        ema = cls(data['period'])
+        ema.count = data['count']
+        ema.seed_sum = data['seed_sum']
+        ema.value = data['value']
+        return ema
+
+
+class StreamingMACD:
+    """
+    Incremental MACD, O(1) per tick.
+    
+    With signal_period=None the signal line equals the MACD line, exactly like
+    analyze_price_convergence_divergence(); pass e.g. signal_period=9 for a real
+    EMA signal line.
+    """
+    
+    def __init__(self, short_period=12, long_period=26, signal_period=None):
+        self.short_ema = StreamingEMA(short_period)
+        self.long_ema = StreamingEMA(long_period)
+        self.signal_ema = StreamingEMA(signal_period) if signal_period else None
+        self.value = {'macd': None, 'signal_line': None, 'histogram': None, 'signal': 'insufficient_data'}
+    
+    def update(self, price):
+        """
+        Add one price.
+        
+        Returns:
+            dict with 'macd', 'signal_line', 'histogram', 'signal'
+        """
+        short_ema = self.short_ema.update(price)
+        long_ema = self.long_ema.update(price)
+        
+        if self.long_ema.count < self.long_ema.period:
+            return self.value
+        
+        macd = short_ema - long_ema
+        signal_line = self.signal_ema.update(macd) if self.signal_ema else macd
+        histogram = macd - signal_line
+        
+        self.value = {
+            'macd': round(macd, 2),
+            'signal_line': round(signal_line, 2),
+            'histogram': round(histogram, 2),
+            'signal': 'bullish' if histogram > 0 else 'bearish'
+        }
+        return self.value
+    
+    def to_dict(self):
+        """Serializable state (see from_dict)."""
+        return {
+            'short_ema': self.short_ema.to_dict(),
+            'long_ema': self.long_ema.to_dict(),
+            'signal_ema': self.signal_ema.to_dict() if self.signal_ema else None,
+            'value': self.value
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore an indicator saved with to_dict()."""
+        macd = cls()
+        macd.short_ema = StreamingEMA.from_dict(data['short_ema'])
+        macd.long_ema = StreamingEMA.from_dict(data['long_ema'])
+        macd.signal_ema = StreamingEMA.from_dict(data['signal_ema']) if data.get('signal_ema') else None
+        macd.value = data['value']
+        return macd
+
+
+class StreamingATR:
+    """
+    Incremental Wilder ATR over OHLC bars, O(1) per bar.
+    
+    True range is max(high - low, |high - previous close|, |low - previous close|)
+    (high - low for the first bar). The first ATR is the mean of the first `period`
+    true ranges, then ATR = (ATR * (period - 1) + TR) / period.
+    """
+    
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.count = 0          # Bars seen
+        self.seed_sum = 0       # Sum of the first `period` true ranges
+        self.value = None
+    
+    def update(self, high, low, close):
+        """
+        Add one closed bar.
+        
+        Returns:
+            float: ATR, or None until `period` bars were seen
+        """
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+        
+        if self.count < self.period:
+            self.seed_sum += true_range
+        elif self.count == self.period:
+            self.value = (self.seed_sum + true_range) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+    
+    def update_bar(self, bar):
+        """Add an (open_time, open, high, low, close, volume) bar (see modules.bar_store)."""
+        return self.update(bar[2], bar[3], bar[4])
+    
+    def to_dict(self):
+        """Serializable state (see from_dict)."""
+        return {
+            'period': self.period,
+            'prev_close': self.prev_close,
+            'count': self.count,
+            'seed_sum': self.seed_sum,
+            'value': self.value
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore an indicator saved with to_dict()."""
+        atr = cls(data['period'])
+        atr.prev_close = data['prev_close']
+        atr.count = data['count']
+        atr.seed_sum = data['seed_sum']
+        atr.value = data['value']
+        return atr
+
+
 def generate_buy_conviction_score(price, cost_basis, current_rsi, volatility_level, 
                                   is_near_support, trend_direction, volume_signal, 
                                   percentile, macd_signal):
@@ -331,6 +617,69 @@ def generate_sell_signal_with_explanation(current_price, cost_basis, peak_price,
     }
 
 
+def score_buy_signal(price, cost_basis, rsi, support=None, trend='sideways', percentile=50,
+                     volatility_level='moderate', volume_signal='normal', macd_signal=None):
+    """
+    Conviction score for a BUY decision from the values the main loop has at hand.
+    
+    Args:
+        price: Current price
+        cost_basis: Your cost basis (None = no position, scored as no loss)
+        rsi: Current RSI
+        support: Support level from historical analysis
+        trend: 'uptrend', 'downtrend', 'sideways'
+        percentile: Price percentile (0-100)
+        volatility_level: 'low', 'moderate', 'high', 'extreme'
+        volume_signal: 'extreme_spike', 'high_spike', 'normal', 'low_volume'
+        macd_signal: 'bullish' or 'bearish'
+    
+    Returns:
+        int: Conviction score 0-100
+    """
+    return generate_buy_conviction_score(
+        price=price,
+        cost_basis=cost_basis or price,
+        current_rsi=rsi,
+        volatility_level=volatility_level,
+        is_near_support=bool(support) and price <= support * 1.03,  # Within 3% of support
+        trend_direction=trend,
+        volume_signal=volume_signal,
+        percentile=percentile,
+        macd_signal=macd_signal
+    )
+
+
+def score_sell_signal(price, cost_basis, peak_price, rsi, resistance=None, trend='sideways',
+                      volume_signal='normal'):
+    """
+    Conviction score and explanation for a SELL decision from the values the main loop has at hand.
+    
+    Args:
+        price: Current price
+        cost_basis: Your cost basis (None = scored as no profit)
+        peak_price: Highest recent price
+        rsi: Current RSI
+        resistance: Resistance level from historical analysis
+        trend: 'uptrend', 'downtrend', 'sideways'
+        volume_signal: Volume quality
+    
+    Returns:
+        (conviction: int 0-100, explanation: str)
+    """
+    result = generate_sell_signal_with_explanation(
+        current_price=price,
+        cost_basis=cost_basis or price,
+        peak_price=max(peak_price or price, price),
+        current_rsi=rsi,
+        days_held=0,
+        is_trend_change=trend == 'downtrend',
+        near_resistance=bool(resistance) and price >= resistance * 0.97,  # Within 3% of resistance
+        volume_signal=volume_signal
+    )
+    explanation = '; '.join(result['reasons']) or result['recommendation']
+    return min(100, result['sell_score']), explanation
+
+
 if __name__ == "__main__":
     # Test pattern analyzer
     print("Testing pattern analyzer...")
@@ -0,0 +1,227 @@
+"""
+Range min/max structures for support/resistance levels.
+SlidingExtrema keeps the min/max of the last N values with monotonic deques
+(O(1) amortized per value). SparseTable answers the min/max of any index
+range in O(1) after an O(n log n) build, and PriceRangeIndex maps time
+windows (7/30/90/365 days) onto it, so multi-window S/R levels for every
+asset cost a couple of lookups per tick instead of a scan of the series.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - the tables are built in pure Python without it
+    np = None
+
+DAY_MS = 86400 * 1000
+DEFAULT_LEVEL_WINDOWS = (7, 30, 90, 365)  # Days
+
+
+class SlidingExtrema:
+    """Min and max of the last `window` values pushed."""
+
+    __slots__ = ('window', '_count', '_max', '_min')
+
+    def __init__(self, window, values=None):
+        """
+        Args:
+            window: Number of values covered
+            values: Optional values to preload, oldest first
+        """
+        self.window = window
+        self._count = 0
+        self._max = deque()  # (position, value), values decreasing
+        self._min = deque()  # (position, value), values increasing
+        for value in values or ():
+            self.push(value)
+
+    def __len__(self):
+        return min(self._count, self.window)
+
+    def push(self, value):
+        """Add a value, dropping the one that falls out of the window (O(1) amortized)."""
+        position = self._count
+        self._count += 1
+
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((position, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((position, value))
+
+        oldest = position - self.window
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+
+    def max(self):
+        """Largest value in the window (None when empty)."""
+        return self._max[0][1] if self._max else None
+
+    def min(self):
+        """Smallest value in the window (None when empty)."""
+        return self._min[0][1] if self._min else None
+
+
+class SparseTable:
+    """
+    Static range min/max over a sequence, with O(log n) appends.
+
+    Level k holds the min/max of every run of 2**k values, so any [start, end)
+    range is covered by two overlapping runs.
+    """
+
+    def __init__(self, values=()):
+        self._max = []
+        self._min = []
+        self._n = 0
+        values = list(values)
+        if values:
+            self._build(values)
+
+    def __len__(self):
+        return self._n
+
+    def _build(self, values):
+        n = len(values)
+        if np is not None:
+            level_max = level_min = np.asarray(values, dtype=float)
+            self._max = [array('d', level_max.tobytes())]
+            self._min = [array('d', level_min.tobytes())]
+            span = 1
+            while span * 2 <= n:
+                level_max = np.maximum(level_max[:-span], level_max[span:])
+                level_min = np.minimum(level_min[:-span], level_min[span:])
+                self._max.append(array('d', level_max.tobytes()))
+                self._min.append(array('d', level_min.tobytes()))
+                span *= 2
+        else:
+            self._max = [array('d', values)]
+            self._min = [array('d', values)]
+            span = 1
+            while span * 2 <= n:
+                prev_max, prev_min = self._max[-1], self._min[-1]
+                self._max.append(array('d', map(max, prev_max[:-span], prev_max[span:])))
+                self._min.append(array('d', map(min, prev_min[:-span], prev_min[span:])))
+                span *= 2
+        self._n = n
+
+    def append(self, value):
+        """Add a value at the end (O(log n))."""
+        if not self._n:
+            self._max = [array('d', [value])]
+            self._min = [array('d', [value])]
+            self._n = 1
+            return
+
+        self._max[0].append(value)
+        self._min[0].append(value)
+        self._n += 1
+        # Each level gains the run ending at the new value, built from two runs one level down
+        span = 1
+        for level in range(1, len(self._max)):
+            below_max, below_min = self._max[level - 1], self._min[level - 1]
+            self._max[level].append(max(below_max[-span - 1], below_max[-1]))
+            self._min[level].append(min(below_min[-span - 1], below_min[-1]))
+            span *= 2
+        if span * 2 <= self._n:
+            below_max, below_min = self._max[-1], self._min[-1]
+            self._max.append(array('d', [max(below_max[0], below_max[span])]))
+            self._min.append(array('d', [min(below_min[0], below_min[span])]))
+
+    def _level(self, start, end):
+        if start < 0:
+            start = max(0, start + self._n)
+        if end is None or end > self._n:
+            end = self._n
+        elif end < 0:
+            end += self._n
+        if start >= end:
+            raise ValueError(f"Empty range [{start}, {end})")
+        level = (end - start).bit_length() - 1
+        return start, end, level
+
+    def max(self, start=0, end=None):
+        """Largest value in values[start:end] (O(1))."""
+        start, end, level = self._level(start, end)
+        row = self._max[level]
+        return max(row[start], row[end - (1 << level)])
+
+    def min(self, start=0, end=None):
+        """Smallest value in values[start:end] (O(1))."""
+        start, end, level = self._level(start, end)
+        row = self._min[level]
+        return min(row[start], row[end - (1 << level)])
+
+
+class PriceRangeIndex:
+    """High/low of any index range or trailing time window of a [timestamp_ms, price] series."""
+
+    def __init__(self, prices=()):
+        """
+        Args:
+            prices: List of [timestamp_ms, price] pairs, oldest first
+        """
+        self.timestamps = array('d', (p[0] for p in prices))
+        self.table = SparseTable(p[1] for p in prices)
+
+    def __len__(self):
+        return len(self.table)
+
+    def append(self, timestamp_ms, price):
+        """Add a newer price (O(log n)); older timestamps are ignored."""
+        if self.timestamps and timestamp_ms <= self.timestamps[-1]:
+            return
+        self.timestamps.append(timestamp_ms)
+        self.table.append(price)
+
+    def high(self, start=0, end=None):
+        """Highest price in the index range [start, end)."""
+        return self.table.max(start, end)
+
+    def low(self, start=0, end=None):
+        """Lowest price in the index range [start, end)."""
+        return self.table.min(start, end)
+
+    def since(self, timestamp_ms):
+        """Index of the first price at or after timestamp_ms."""
+        return bisect_left(self.timestamps, timestamp_ms)
+
+    def levels(self, windows=DEFAULT_LEVEL_WINDOWS, now_ms=None):
+        """
+        Support/resistance for trailing time windows.
+
+        Args:
+            windows: Window lengths in days
+            now_ms: End of the windows (default: the newest timestamp)
+
+        Returns:
+            dict: {days: {high, low, support, resistance, complete}}; 'complete' is False
+            when the series starts inside the window (the levels then cover what there is)
+        """
+        if not len(self):
+            return {}
+        if now_ms is None:
+            now_ms = self.timestamps[-1]
+
+        result = {}
+        for days in windows:
+            window_start = now_ms - days * DAY_MS
+            start = self.since(window_start)
+            if start >= len(self):
+                continue
+            high = self.high(start)
+            low = self.low(start)
+            result[days] = {
+                'high': high,
+                'low': low,
+                'support': low * 0.98,       # Same 2% buffers as analyze_support_resistance
+                'resistance': high * 1.02,
+                'complete': self.timestamps[0] <= window_start
+            }
+        return result
@@ -0,0 +1,138 @@
+"""
+Fixed-capacity rolling window of (timestamp, price) ticks.
+Keeps a running sum and sum of squares so the moving average and variance
+cost O(1) per tick no matter how large the window is.
+"""
+
+import math
+from array import array
+
+
+class RollingWindow:
+    """Circular buffer over two float arrays with incremental mean/variance."""
+
+    __slots__ = ('maxlen', '_timestamps', '_prices', '_start', '_count',
+                 '_sum', '_sum_sq', '_evictions')
+
+    def __init__(self, capacity, ticks=None):
+        """
+        Create an empty window.
+
+        Args:
+            capacity: Maximum number of ticks kept (oldest are evicted)
+            ticks: Optional (timestamp, price) tuples to preload, oldest first
+        """
+        self.maxlen = capacity
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._prices = array('d', bytes(8 * capacity))
+        self.clear()
+        if ticks:
+            self.extend(ticks)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Iterate (timestamp, price) ticks, oldest first."""
+        for i in range(self._count):
+            j = (self._start + i) % self.maxlen
+            yield (self._timestamps[j], self._prices[j])
+
+    def __getitem__(self, index):
+        """(timestamp, price) tick by position (negative indexes count from the newest)."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("RollingWindow index out of range")
+        j = (self._start + index) % self.maxlen
+        return (self._timestamps[j], self._prices[j])
+
+    def clear(self):
+        """Remove all ticks."""
+        self._start = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._evictions = 0
+
+    def append(self, timestamp, price):
+        """
+        Add a tick, evicting the oldest one when full (O(1)).
+
+        Args:
+            timestamp: Epoch seconds
+            price: Price
+        """
+        if self._count < self.maxlen:
+            j = (self._start + self._count) % self.maxlen
+            self._count += 1
+        else:
+            j = self._start
+            old = self._prices[j]
+            self._sum -= old
+            self._sum_sq -= old * old
+            self._start = (self._start + 1) % self.maxlen
+            self._evictions += 1
+
+        self._timestamps[j] = timestamp
+        self._prices[j] = price
+        self._sum += price
+        self._sum_sq += price * price
+
+        # Re-sum once per full turn so add/subtract rounding can't drift (amortized O(1))
+        if self._evictions >= self.maxlen:
+            self._resum()
+
+    def extend(self, ticks):
+        """Append several (timestamp, price) ticks, oldest first."""
+        for timestamp, price in ticks:
+            self.append(timestamp, price)
+
+    def _resum(self):
+        prices = self.last(self._count)
+        self._sum = math.fsum(prices)
+        self._sum_sq = math.fsum(p * p for p in prices)
+        self._evictions = 0
+
+    def mean(self):
+        """Average price in the window (None when empty)."""
+        if not self._count:
+            return None
+        return self._sum / self._count
+
+    def variance(self):
+        """Population variance of prices in the window (None when empty)."""
+        if not self._count:
+            return None
+        mean = self._sum / self._count
+        return max(0.0, self._sum_sq / self._count - mean * mean)
+
+    def std(self):
+        """Population standard deviation of prices in the window (None when empty)."""
+        variance = self.variance()
+        return math.sqrt(variance) if variance is not None else None
+
+    def last_tick(self):
+        """Newest (timestamp, price) tick or None."""
+        return self[-1] if self._count else None
+
+    def last(self, n):
+        """
+        Newest n prices, oldest first (cost depends on n, not on the window size).
+
+        Args:
+            n: Number of prices (capped at the window length)
+
+        Returns:
+            list of prices
+        """
+        n = min(n, self._count)
+        first = (self._start + self._count - n) % self.maxlen
+        end = first + n
+        if end <= self.maxlen:
+            return self._prices[first:end].tolist()
+        return self._prices[first:].tolist() + self._prices[:end - self.maxlen].tolist()
+
+    def ticks(self):
+        """All (timestamp, price) ticks, oldest first."""
+        return list(self)
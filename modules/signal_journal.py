@@ -0,0 +1,144 @@
+"""
+Append-only journal of signal decisions.
+Every BUY/SELL decision - sent or held back by the spam filter - is one
+compact JSON line stamped with epoch seconds. Lines are only ever appended,
+so the file is a full audit trail that costs one small write per decision.
+Because records are in time order, a time-range query binary-searches byte
+offsets and reads only the matching lines instead of loading the file.
+"""
+
+import json
+import os
+
+_SEPARATORS = (',', ':')
+
+
+class SignalJournal:
+    """JSON-lines journal of decision records, each with a 't' timestamp (epoch seconds)."""
+
+    def __init__(self, path):
+        """
+        Open (or create) a journal.
+
+        Args:
+            path: Journal file (e.g., 'data/state_signal_journal.jsonl')
+        """
+        self.path = path
+        self._file = None
+        self._repair()
+
+    def _repair(self):
+        """Drop a torn last line left by a crash mid-write."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            if not size:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            # Find the last complete line
+            end = size
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    f.truncate(start + newline + 1)
+                    return
+                end = start
+            f.truncate(0)
+
+    def size(self):
+        """Journal length in bytes (the offset the next record is written at)."""
+        if self._file is not None:
+            return self._file.tell()
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def append(self, record):
+        """
+        Append one record (O(1), flushed immediately).
+
+        Returns:
+            int: Byte offset just past the record
+        """
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        self._file.write(json.dumps(record, separators=_SEPARATORS).encode('utf-8') + b'\n')
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read_from(self, offset=0):
+        """
+        Records written at or after a byte offset, oldest first.
+
+        Yields:
+            dict records (a journal shorter than the offset yields nothing)
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    return
+
+    def query(self, start=None, end=None):
+        """
+        Records with start <= t <= end, oldest first.
+
+        Args:
+            start: Epoch seconds (None = from the first record)
+            end: Epoch seconds (None = up to the last record)
+
+        Returns:
+            list of dict records
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+        with open(self.path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(0 if start is None else self._seek_time(f, size, start))
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if end is not None and record.get('t', 0) > end:
+                    break
+                records.append(record)
+        return records
+
+    @staticmethod
+    def _line_at(f, offset):
+        """(offset, record) of the first full line starting at or after offset, or (size, None)."""
+        f.seek(max(0, offset - 1))
+        if offset:
+            f.readline()  # Finish the line that straddles the offset
+        line_start = f.tell()
+        line = f.readline()
+        if not line:
+            return line_start, None
+        return line_start, json.loads(line)
+
+    def _seek_time(self, f, size, timestamp):
+        """Byte offset of the first record with t >= timestamp (binary search over offsets)."""
+        low, high = 0, size
+        while low < high:
+            mid = (low + high) // 2
+            line_start, record = self._line_at(f, mid)
+            if record is None or record.get('t', 0) >= timestamp:
+                high = mid
+            else:
+                low = line_start + 1
+        return self._line_at(f, low)[0]
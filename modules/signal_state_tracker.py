@@ -7,7 +7,9 @@ Tracks previous signals and only sends Telegram when:
 
 import json
 import os
+import time
 from datetime import datetime
+from .signal_journal import SignalJournal
 from .confidence_levels import (
     get_confidence_level, 
     format_confidence_display,
@@ -16,30 +18,51 @@ from .confidence_levels import (
 )
 
 
+SNAPSHOT_EVERY = 100  # Journal records between snapshot rewrites
+
+
 class SignalStateTracker:
-    """Tracks signal state to prevent message spam."""
+    """
+    Tracks signal state to prevent message spam.
+    
+    Every decision (sent or suppressed, with the spam filter's reason) is appended
+    to a signal journal. The state file is a snapshot that records how far into the
+    journal it is current; it is rewritten every SNAPSHOT_EVERY records, and on load
+    the sent records after it are replayed.
+    """
     
-    def __init__(self, state_file):
+    def __init__(self, state_file, persist=True):
         """
         Initialize tracker.
         
         Args:
             state_file: Path to state file (e.g., 'state.txt' or 'state_btc.txt')
+            persist: Load/save the tracker and journal files (False = in-memory only, e.g., for backtests)
         """
         self.state_file = state_file
         self.tracker_file = state_file.replace('.txt', '_signal_state.json')
+        self.journal = SignalJournal(state_file.replace('.txt', '_signal_journal.jsonl')) if persist else None
+        self.persist = persist
+        self._unsaved = 0  # Journal records since the last snapshot
         self.load_state()
     
     def load_state(self):
-        """Load previous signal state."""
+        """Load the snapshot and replay the signals sent after it."""
+        self.state = self._init_state()
+        if not self.persist:
+            return
+        
         if os.path.exists(self.tracker_file):
             try:
                 with open(self.tracker_file, 'r') as f:
                     self.state = json.load(f)
             except (json.JSONDecodeError, IOError):
-                self.state = self._init_state()
-        else:
-            self.state = self._init_state()
+                pass
+        
+        for record in self.journal.read_from(self.state.get('journal_offset', 0)):
+            self._unsaved += 1
+            if record.get('sent'):
+                self._apply(record)
     
     def _init_state(self):
         """Initialize empty state."""
@@ -50,13 +73,29 @@ class SignalStateTracker:
             'last_price': None,
             'last_explanation': None,
             'consecutive_same_signals': 0,
-            'signal_history': []  # Last 10 signals
+            'signal_history': [],  # Last 10 signals
+            'journal_offset': 0    # Journal bytes already applied to this snapshot
         }
     
     def save_state(self):
-        """Save current state."""
-        with open(self.tracker_file, 'w') as f:
+        """Write a snapshot of the current state (the journal is kept as the audit trail)."""
+        if not self.persist:
+            return
+        self.state['journal_offset'] = self.journal.size()
+        tmp_path = self.tracker_file + '.tmp'
+        with open(tmp_path, 'w') as f:
             json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.tracker_file)
+        self._unsaved = 0
+    
+    def _journal(self, record):
+        """Append a decision record; rewrite the snapshot every SNAPSHOT_EVERY records."""
+        if not self.persist:
+            return
+        self.journal.append(record)
+        self._unsaved += 1
+        if self._unsaved >= SNAPSHOT_EVERY:
+            self.save_state()
     
     def should_send_alert(self, new_signal, new_conviction=0, new_price=None, new_explanation=""):
         """
@@ -103,7 +142,7 @@ class SignalStateTracker:
         # Same signal, similar conviction, similar price - don't spam
         return (False, f"No meaningful change (same {new_signal})", False)
     
-    def update_state(self, signal, conviction=0, price=None, explanation=""):
+    def update_state(self, signal, conviction=0, price=None, explanation="", reason=None):
         """
         Update signal state after sending alert.
         
@@ -112,7 +151,42 @@ class SignalStateTracker:
             conviction: Conviction score (0-100)
             price: Current price
             explanation: Reason for signal
+            reason: Why the alert was sent (the should_send_alert() reason)
+        """
+        record = self._record(signal, conviction, price, explanation, reason, sent=True)
+        self._apply(record)
+        self._journal(record)
+    
+    def record_suppressed(self, signal, conviction=0, price=None, reason="", explanation=""):
+        """
+        Journal a decision whose alert was held back (the tracked state is unchanged).
+        
+        Args:
+            signal: 'BUY', 'SELL', 'HOLD'
+            conviction: Conviction score (0-100)
+            price: Current price
+            reason: Why it wasn't sent (e.g. the should_send_alert() reason)
+            explanation: Reason for signal
         """
+        self._journal(self._record(signal, conviction, price, explanation, reason, sent=False))
+    
+    @staticmethod
+    def _record(signal, conviction, price, explanation, reason, sent):
+        now = time.time()
+        return {
+            't': round(now, 3),
+            'time': datetime.fromtimestamp(now).isoformat(),
+            'signal': signal,
+            'conviction': conviction,
+            'price': price,
+            'sent': sent,
+            'reason': reason,
+            'explanation': explanation
+        }
+    
+    def _apply(self, record):
+        """Apply a sent signal to the tracked state."""
+        signal = record['signal']
         # Check if this is the same signal as before
         if signal == self.state['last_signal']:
             self.state['consecutive_same_signals'] += 1
@@ -121,22 +195,43 @@ class SignalStateTracker:
         
         # Update state
         self.state['last_signal'] = signal
-        self.state['last_signal_time'] = datetime.now().isoformat()
-        self.state['last_conviction'] = conviction
-        self.state['last_price'] = price
-        self.state['last_explanation'] = explanation
+        self.state['last_signal_time'] = record['time']
+        self.state['last_conviction'] = record['conviction']
+        self.state['last_price'] = record['price']
+        self.state['last_explanation'] = record['explanation']
         
-        # Add to history (keep last 10)
+        # Add to history (keep last 10 - the journal has the rest)
         self.state['signal_history'].append({
             'signal': signal,
-            'conviction': conviction,
-            'price': price,
-            'time': self.state['last_signal_time'],
-            'explanation': explanation
+            'conviction': record['conviction'],
+            'price': record['price'],
+            'time': record['time'],
+            'explanation': record['explanation']
         })
         self.state['signal_history'] = self.state['signal_history'][-10:]
+    
+    def history(self, start=None, end=None, sent=None):
+        """
+        Journaled decisions in a time range, without reading the whole journal.
         
-        self.save_state()
+        Args:
+            start: Epoch seconds or datetime (None = from the first record)
+            end: Epoch seconds or datetime (None = up to the last record)
+            sent: True/False to return only sent/suppressed decisions (None = both)
+        
+        Returns:
+            list of records (t, time, signal, conviction, price, sent, reason, explanation), oldest first
+        """
+        if not self.persist:
+            return []
+        if isinstance(start, datetime):
+            start = start.timestamp()
+        if isinstance(end, datetime):
+            end = end.timestamp()
+        records = self.journal.query(start, end)
+        if sent is not None:
+            records = [r for r in records if r.get('sent') == sent]
+        return records
     
     def get_signal_summary(self):
         """Get summary of signal state."""
@@ -0,0 +1,141 @@
+"""
+Cached, atomically written KEY=VALUE state files (data/state*.txt).
+The parsed state is kept in memory and only re-read when the file's
+mtime/size/inode changes, so the loop pays one stat() per iteration instead
+of an open + parse. Writes go to a temp file that is fsynced and renamed over
+the original, so a crash never leaves a half-written state file.
+"""
+
+import os
+import threading
+
+
+def parse_state(text):
+    """
+    Parse state file contents.
+
+    Args:
+        text: KEY=VALUE lines
+
+    Returns:
+        dict: Numeric values as float, others as str
+    """
+    state = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        k, v = line.split("=")
+        # Convert to float for numeric values, keep as string otherwise
+        try:
+            state[k] = float(v)
+        except ValueError:
+            state[k] = v
+    return state
+
+
+def format_state(state):
+    """Render a state dict as KEY=VALUE lines (whole numbers without '.0', as written by hand)."""
+    lines = []
+    for k, v in state.items():
+        if isinstance(v, float) and v.is_integer():
+            v = int(v)
+        lines.append(f"{k}={v}")
+    return "\n".join(lines) + "\n"
+
+
+class StateStore:
+    """One state file with a stat-validated parse cache."""
+
+    def __init__(self, state_file):
+        """
+        Args:
+            state_file: Path to state file (e.g., 'data/state.txt')
+        """
+        self.state_file = state_file
+        self._state = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        st = os.stat(self.state_file)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def load(self):
+        """
+        Current state, re-parsed only when the file changed on disk.
+
+        Returns:
+            dict: A copy of the state (safe to modify)
+        """
+        with self._lock:
+            return dict(self._current())
+
+    def save(self, state):
+        """
+        Atomically replace the state file (temp file + fsync + rename).
+
+        Args:
+            state: Full state dict
+        """
+        with self._lock:
+            self._write(state)
+
+    def update(self, changes):
+        """
+        Read-modify-write under one lock.
+
+        Args:
+            changes: dict of keys to set, or a function(state) -> dict of keys to set
+
+        Returns:
+            dict: The new state
+        """
+        with self._lock:
+            state = dict(self._current())
+            state.update(changes(dict(state)) if callable(changes) else changes)
+            self._write(state)
+            return dict(state)
+
+    def _current(self):
+        signature = self._stat_signature()
+        if signature != self._signature:
+            with open(self.state_file) as f:
+                self._state = parse_state(f.read())
+            self._signature = signature
+        return self._state
+
+    def _write(self, state):
+        directory = os.path.dirname(self.state_file) or '.'
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(format_state(state))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_file)
+
+        # Make the rename itself durable (not supported on Windows)
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        self._state = dict(state)
+        self._signature = self._stat_signature()
+
+
+# Open state stores by file path (one per asset)
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(state_file):
+    """Get the (cached) StateStore for a state file."""
+    with _stores_lock:
+        store = _stores.get(state_file)
+        if store is None:
+            store = StateStore(state_file)
+            _stores[state_file] = store
+        return store
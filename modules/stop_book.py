@@ -0,0 +1,258 @@
+"""
+Indexed book of active trailing-stop positions.
+Every tick raises the peak of every active position to the current price
+(peak = max(peak, price)) and fires the positions whose trail from the peak
+has been hit while they are still in profit. Positions are kept in a treap
+ordered by (cost basis, position id), each node holding the min/max peak of
+its subtree and a lazy pending raise. A tick costs O(1) for the peak raise (a
+lazy tag at the root) plus O(log n) expected per fired position to find them;
+adding or removing a lot is O(log n) expected.
+"""
+
+import random
+
+_TOLERANCE = 1e-9  # Relative slack on the search bounds; candidates are re-checked exactly
+
+_random = random.Random()
+
+
+class _Node:
+    """A position in the treap, with its subtree's peak range and pending raise."""
+
+    __slots__ = ('key', 'position_id', 'position', 'priority', 'left', 'right', 'max_peak', 'min_peak', 'tag')
+
+    def __init__(self, position_id, position):
+        self.key = (position['cost_basis'], position_id)
+        self.position_id = position_id
+        self.position = position
+        self.priority = _random.random()
+        self.left = self.right = None
+        self.max_peak = self.min_peak = position['peak_price']
+        self.tag = None  # Pending (price, time) raise for the children
+
+
+def _pull(node):
+    peak = node.position['peak_price']
+    max_peak = min_peak = peak
+    for child in (node.left, node.right):
+        if child is not None:
+            max_peak = max(max_peak, child.max_peak)
+            min_peak = min(min_peak, child.min_peak)
+    node.max_peak = max_peak
+    node.min_peak = min_peak
+
+
+def _apply(node, price, time):
+    if node is None or price <= node.min_peak:
+        return  # Empty subtree, or every peak in it is already at least this high
+    node.max_peak = max(node.max_peak, price)
+    node.min_peak = price
+    position = node.position
+    if price > position['peak_price']:
+        position['peak_price'] = price
+        position['peak_time'] = time
+    if node.left is not None or node.right is not None:
+        if node.tag is None or price > node.tag[0]:
+            node.tag = (price, time)
+
+
+def _push(node):
+    tag = node.tag
+    if tag is not None:
+        _apply(node.left, *tag)
+        _apply(node.right, *tag)
+        node.tag = None
+
+
+def _split(node, key):
+    """Split into (keys < key, keys >= key), pushing pending raises on the way down."""
+    if node is None:
+        return None, None
+    _push(node)
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        _pull(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _pull(node)
+    return left, node
+
+
+def _merge(left, right):
+    """Join two treaps where every key in `left` is below every key in `right`."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        _push(left)
+        left.right = _merge(left.right, right)
+        _pull(left)
+        return left
+    _push(right)
+    right.left = _merge(left, right.left)
+    _pull(right)
+    return right
+
+
+def _insert(node, new):
+    if node is None:
+        return new
+    if new.priority > node.priority:
+        new.left, new.right = _split(node, new.key)
+        _pull(new)
+        return new
+    # Raises pending above the new node happened before this position existed
+    _push(node)
+    if new.key < node.key:
+        node.left = _insert(node.left, new)
+    else:
+        node.right = _insert(node.right, new)
+    _pull(node)
+    return node
+
+
+def _delete(node, key):
+    _push(node)
+    if key == node.key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+    _pull(node)
+    return node
+
+
+def _collect(node, max_cost_basis, min_peak, found):
+    """In-order walk of the subtrees that still hold a peak >= min_peak, stopping at max_cost_basis."""
+    if node is None or node.max_peak < min_peak:
+        return
+    _push(node)
+    _collect(node.left, max_cost_basis, min_peak, found)
+    if node.key[0] >= max_cost_basis:
+        return
+    if node.position['peak_price'] >= min_peak:
+        found.append(node.position_id)
+    _collect(node.right, max_cost_basis, min_peak, found)
+
+
+class StopBook:
+    """Active positions indexed by cost basis, with lazily raised peaks."""
+
+    def __init__(self, positions=None):
+        """
+        Args:
+            positions: Optional {position_id: position dict} of active positions
+        """
+        self.positions = {}
+        self._nodes = {}  # position id -> _Node
+        self._root = None
+        for position_id, position in (positions or {}).items():
+            self.add(position_id, position)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, position_id):
+        return position_id in self.positions
+
+    def materialize(self):
+        """Push pending peak raises down to every position dict (O(n))."""
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            _push(node)
+            stack.extend(child for child in (node.left, node.right) if child is not None)
+
+    def add(self, position_id, position):
+        """Add an active position (O(log n) expected)."""
+        if position_id in self.positions:
+            self.remove(position_id)
+        node = _Node(position_id, position)
+        self._root = _insert(self._root, node)
+        self._nodes[position_id] = node
+        self.positions[position_id] = position
+
+    def remove(self, position_id):
+        """
+        Remove an active position (O(log n) expected).
+
+        Returns:
+            dict: The position (peak fields up to date), or None if it isn't in the book
+        """
+        node = self._nodes.pop(position_id, None)
+        if node is None:
+            return None
+        # Pushing down the path to the node brings its peak up to date
+        self._root = _delete(self._root, node.key)
+        return self.positions.pop(position_id)
+
+    def raise_peaks(self, price, time):
+        """
+        Set every peak below `price` to `price` (O(1)).
+
+        Returns:
+            bool: True if any peak changed
+        """
+        if self._root is None or price <= self._root.min_peak:
+            return False
+        _apply(self._root, price, time)
+        return True
+
+    def candidates(self, max_cost_basis, min_peak):
+        """
+        Position ids with cost_basis < max_cost_basis and peak_price >= min_peak.
+
+        Subtrees without a peak in range are skipped and the walk stops at the first
+        cost basis out of range, so the search costs O(log n) expected per match.
+        """
+        found = []
+        _collect(self._root, max_cost_basis, min_peak, found)
+        return found
+
+    def triggered(self, price, trailing_pct, trail_distance=None):
+        """
+        Positions whose trailing stop fires at `price`.
+
+        A stop fires when price <= max(peak * (1 - trailing_pct), cost_basis) with more
+        than 0.5% profit, i.e. cost_basis < price / 1.005 and peak >= price / (1 - trailing_pct).
+        With trail_distance (e.g. an ATR multiple) the stop is peak - trail_distance instead,
+        so peak >= price + trail_distance.
+
+        Returns:
+            list of (position_id, profit_pct), in position id order
+        """
+        if trail_distance is not None:
+            min_peak = (price + trail_distance) * (1 - _TOLERANCE)
+        elif trailing_pct < 1:
+            min_peak = price / (1 - trailing_pct) * (1 - _TOLERANCE)
+        else:
+            return []
+        if not self.positions:
+            return []
+        max_cost_basis = price / 1.005 * (1 + _TOLERANCE)
+
+        fired = []
+        for pid in self.candidates(max_cost_basis, min_peak):
+            position = self.positions[pid]
+            stop = max(stop_price(position['peak_price'], trailing_pct, trail_distance), position['cost_basis'])
+            profit_pct = ((price - position['cost_basis']) / position['cost_basis']) * 100
+            if price <= stop and profit_pct > 0.5:
+                fired.append((pid, profit_pct))
+        return sorted(fired, key=lambda item: position_number(item[0]))
+
+
+def stop_price(peak, trailing_pct, trail_distance=None):
+    """Trail below a peak: a fixed distance when given, otherwise a percentage (no cost-basis floor)."""
+    if trail_distance is not None:
+        return peak - trail_distance
+    return peak * (1 - trailing_pct)
+
+
+def position_number(position_id):
+    """Numeric part of a 'pos_<n>' id (0 for other ids)."""
+    try:
+        return int(position_id.rsplit('_', 1)[1])
+    except (IndexError, ValueError):
+        return 0
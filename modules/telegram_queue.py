@@ -0,0 +1,179 @@
+"""
+Background Telegram delivery queue.
+The tick loop only enqueues messages; a worker thread sends them, so a slow or
+rate-limited Telegram API never delays price sampling. Every queued message is
+spooled to disk first and deleted once delivered, so alerts survive restarts.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+from .http_session import http_post
+from .notifier_telegram import TELEGRAM_API_URL
+
+DEFAULT_SPOOL_DIR = os.path.join('data', 'telegram_spool')
+DEFAULT_QUEUE_SIZE = 100
+MAX_BACKOFF = 300  # Seconds between retries at most
+
+
+class TelegramDeliveryQueue:
+    """Bounded, disk-spooled queue drained by one delivery thread."""
+
+    def __init__(self, bot_token, spool_dir=DEFAULT_SPOOL_DIR, maxsize=DEFAULT_QUEUE_SIZE):
+        """
+        Initialize queue (call start() to begin delivering).
+
+        Args:
+            bot_token: Telegram bot token from BotFather (never written to the spool)
+            spool_dir: Directory holding one JSON file per undelivered message
+            maxsize: Messages held in memory; extra ones wait in the spool
+        """
+        self.bot_token = bot_token
+        self.spool_dir = spool_dir
+        self._queue = queue.Queue(maxsize)
+        self._queued = set()        # Spool files currently in the in-memory queue
+        self._overflow = False      # Spool holds files that didn't fit in the queue
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._seq = 0
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def start(self):
+        """Queue messages left over from the last run and start the delivery thread."""
+        self._load_spool()
+        self._thread = threading.Thread(target=self._run, name='telegram-delivery', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        Stop the delivery thread. Undelivered messages stay in the spool for the next start.
+
+        Args:
+            timeout: Seconds to wait for an in-flight send to finish
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def enqueue(self, chat_id, message, parse_mode="HTML"):
+        """
+        Queue a message for delivery (never blocks on the network).
+
+        Args:
+            chat_id: Your Telegram chat ID
+            message: Message text
+            parse_mode: "HTML" or "Markdown"
+
+        Returns:
+            bool: True once the message is spooled, False if it couldn't be written
+        """
+        if not self.bot_token or not chat_id:
+            print("[ERROR] Telegram credentials missing - configure in config.yaml")
+            return False
+
+        with self._lock:
+            self._seq += 1
+            name = f"{time.time_ns():020d}_{self._seq:06d}.json"
+        path = os.path.join(self.spool_dir, name)
+
+        payload = {
+            'chat_id': chat_id,
+            'text': message,
+            'parse_mode': parse_mode,
+            'disable_web_page_preview': True
+        }
+        try:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except IOError as e:
+            print(f"[ERROR] Telegram spool write failed: {e}")
+            return False
+
+        self._offer(path)
+        return True
+
+    def pending(self):
+        """Number of undelivered messages in the spool."""
+        return len(self._spool_files())
+
+    def _spool_files(self):
+        return sorted(name for name in os.listdir(self.spool_dir) if name.endswith('.json'))
+
+    def _offer(self, path):
+        """Put a spooled message in the memory queue, or leave it in the spool when full."""
+        with self._lock:
+            if path in self._queued:
+                return
+            try:
+                self._queue.put_nowait(path)
+                self._queued.add(path)
+            except queue.Full:
+                self._overflow = True
+
+    def _load_spool(self):
+        """Queue spooled messages, oldest first."""
+        with self._lock:
+            self._overflow = False
+        for name in self._spool_files():
+            self._offer(os.path.join(self.spool_dir, name))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                path = self._queue.get(timeout=1)
+            except queue.Empty:
+                if self._overflow:
+                    self._load_spool()
+                continue
+
+            self._deliver(path)
+            with self._lock:
+                self._queued.discard(path)
+
+    def _deliver(self, path):
+        """Send one spooled message, retrying until it is delivered, rejected or the queue stops."""
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return
+
+        url = f"{TELEGRAM_API_URL}{self.bot_token}/sendMessage"
+        backoff = 1
+
+        while not self._stop.is_set():
+            delay = backoff
+            try:
+                response = http_post(url, json=payload)
+
+                if response.status_code == 200:
+                    os.remove(path)
+                    return
+
+                if response.status_code == 429:
+                    # Telegram says how long to wait in parameters.retry_after
+                    try:
+                        delay = response.json().get('parameters', {}).get('retry_after', backoff)
+                    except ValueError:
+                        pass
+                    print(f"[TELEGRAM] Rate limited - retrying in {delay}s")
+                elif response.status_code >= 500:
+                    print(f"[TELEGRAM] Server error {response.status_code} - retrying in {delay}s")
+                else:
+                    # Bad request / bad token: retrying won't help, keep the file for inspection
+                    print(f"[ERROR] Telegram send failed: {response.status_code} - {response.text}")
+                    os.replace(path, path + '.failed')
+                    return
+
+            except Exception as e:
+                print(f"[TELEGRAM] Connection error: {e} - retrying in {delay}s")
+
+            self._stop.wait(delay)
+            backoff = min(backoff * 2, MAX_BACKOFF)
@@ -0,0 +1,195 @@
+"""
+Append-only binary tick store for live price history.
+Each tick is a fixed 16-byte record (float64 timestamp + float64 price), so appending
+is a single small write and readers can memory-map the file instead of parsing JSON.
+Appends are buffered and written on checkpoint (every `flush_every` ticks or flush()).
+"""
+
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from .rolling_window import RollingWindow
+
+RECORD = struct.Struct('<dd')  # (epoch seconds, price)
+DEFAULT_WINDOW = 100           # Ticks kept in memory for the live moving average
+DEFAULT_RETAIN = 100000        # Ticks kept on disk before the file is compacted
+DEFAULT_FLUSH_EVERY = 10       # Ticks buffered in memory between checkpoints
+
+
+class TickStore:
+    """Fixed-record tick file with an in-memory rolling window of the latest ticks."""
+
+    def __init__(self, path, window=DEFAULT_WINDOW, retain=DEFAULT_RETAIN, flush_every=DEFAULT_FLUSH_EVERY):
+        """
+        Open (or create) a tick store.
+
+        Args:
+            path: Binary tick file (e.g., 'data/prices_history.bin')
+            window: Number of latest ticks kept in the ring buffer
+            retain: Ticks kept on disk; older ones are dropped once the file holds twice this many
+            flush_every: Buffered ticks that trigger a checkpoint write (1 = write every tick)
+        """
+        self.path = path
+        self.retain = max(retain, window)
+        self.flush_every = max(1, flush_every)
+        self.window = RollingWindow(window)
+        self._pending = []
+        self._file = None
+        self._count = 0
+        self._load()
+
+    def _load(self):
+        """Repair a torn trailing record and fill the ring buffer from the file tail."""
+        if not os.path.exists(self.path):
+            return
+
+        size = os.path.getsize(self.path)
+        if size % RECORD.size:
+            # Crash in the middle of a write - drop the partial record
+            with open(self.path, 'r+b') as f:
+                f.truncate(size - size % RECORD.size)
+
+        self._count = os.path.getsize(self.path) // RECORD.size
+        self.window.extend(read_ticks(self.path, self.window.maxlen))
+
+    def __len__(self):
+        """Number of ticks stored (on disk plus not yet flushed)."""
+        return self._count + len(self._pending)
+
+    def append(self, timestamp, price):
+        """
+        Append one tick (O(1): buffered, no rewrite of earlier data).
+
+        Args:
+            timestamp: Epoch seconds
+            price: Price
+        """
+        self._pending.append(RECORD.pack(timestamp, price))
+        self.window.append(timestamp, price)
+
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Checkpoint: write buffered ticks to disk in one append."""
+        if not self._pending:
+            return
+
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+
+        self._file.write(b''.join(self._pending))
+        self._file.flush()
+        self._count += len(self._pending)
+        self._pending = []
+
+        if self._count >= 2 * self.retain:
+            self.compact()
+
+    def last(self):
+        """Latest (timestamp, price) tick or None."""
+        return self.window.last_tick()
+
+    def compact(self):
+        """Rewrite the file keeping only the last `retain` ticks."""
+        self.flush()
+        ticks = read_ticks(self.path, self.retain) if os.path.exists(self.path) else []
+        self.replace(ticks)
+
+    def replace(self, ticks):
+        """
+        Replace the whole store with the given ticks.
+
+        Args:
+            ticks: List of (timestamp, price) tuples, oldest first
+        """
+        self._pending = []
+        self.close()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(RECORD.pack(ts, price) for ts, price in ticks))
+        os.replace(tmp_path, self.path)
+
+        self._count = len(ticks)
+        self.window.clear()
+        self.window.extend(ticks[-self.window.maxlen:])
+
+    def clear(self):
+        """Delete all ticks."""
+        self._pending = []
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._count = 0
+        self.window.clear()
+
+    def close(self):
+        """Flush buffered ticks and close the append handle (reopened on the next flush)."""
+        if self._pending:
+            self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_ticks(path, last_n=None):
+    """
+    Read ticks through a memory map without loading the whole file.
+
+    Args:
+        path: Binary tick file
+        last_n: Only return the last N ticks (None = all)
+
+    Returns:
+        list of (timestamp, price) tuples, oldest first
+    """
+    if not os.path.exists(path):
+        return []
+
+    with open(path, 'rb') as f:
+        count = os.fstat(f.fileno()).st_size // RECORD.size
+        if count == 0:
+            return []
+
+        start = 0 if last_n is None else max(0, count - last_n)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            values = memoryview(mm)[start * RECORD.size:count * RECORD.size].cast('d')
+            try:
+                return list(zip(values[0::2], values[1::2]))
+            finally:
+                values.release()
+
+
+def tick_count(path):
+    """Number of ticks in a tick file (from its size, no read)."""
+    return os.path.getsize(path) // RECORD.size if os.path.exists(path) else 0
+
+
+def import_json_history(json_path, store):
+    """
+    Migrate a legacy prices_history*.json file into a tick store.
+
+    Args:
+        json_path: Legacy JSON history ([{price, timestamp}, ...])
+        store: TickStore to fill
+
+    Returns:
+        int: Number of ticks imported
+    """
+    try:
+        with open(json_path) as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return 0
+
+    ticks = []
+    for entry in data if isinstance(data, list) else []:
+        try:
+            ticks.append((datetime.fromisoformat(entry['timestamp']).timestamp(), float(entry['price'])))
+        except (KeyError, TypeError, ValueError):
+            continue
+
+    store.replace(ticks)
+    return len(ticks)
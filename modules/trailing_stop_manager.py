@@ -4,34 +4,111 @@ Tracks peak profits and determines optimal exit points.
 """
 
 import json
+import math
 import os
 from datetime import datetime
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - simulations fall back to plain Python loops
+    np = None
+
+from .range_extrema import SlidingExtrema
+from .stop_book import StopBook, position_number, stop_price
+
+# Trailing stop percentage based on volatility
+TRAILING_PCT_MAP = {
+    'low': 0.03,       # 3% trail in low volatility
+    'moderate': 0.06,  # 6% trail in moderate volatility
+    'high': 0.10,      # 10% trail in high volatility
+    'extreme': 0.15    # 15% trail in extreme volatility (give it more room)
+}
+
+TRAIL_MODES = ('pct', 'atr')
+
+JOURNAL_COMPACT_EVERY = 1000  # Journal records before the snapshot is rewritten
+DUST = 1e-8  # Smallest position amount kept (state files round balances to 8 decimals)
+SIMULATION_BLOCK = 1024  # First block scanned per simulated position (doubles until the stop fires)
+
+
+def get_trailing_pct_map(overrides=None):
+    """
+    Trailing stop percentages with config overrides applied.
+    
+    Args:
+        overrides: e.g. {'moderate': 0.08} (missing levels use TRAILING_PCT_MAP)
+    
+    Returns:
+        dict: volatility level -> trailing percentage (decimal)
+    """
+    trailing_pct_map = dict(TRAILING_PCT_MAP)
+    trailing_pct_map.update(overrides or {})
+    return trailing_pct_map
+
 
 class TrailingStopManager:
-    """Manages trailing stops for positions to lock in profits dynamically."""
+    """
+    Manages trailing stops for positions to lock in profits dynamically.
+    
+    Active positions live in a StopBook (see modules/stop_book.py), so a tick costs
+    O(log n) per triggered stop instead of a walk over every position ever recorded.
+    Changes are appended to a journal; the snapshot file is rewritten only when the
+    journal is compacted. Closed and triggered positions go to an archive file.
+    
+    trail_mode='pct' trails the peak by the volatility-level percentage; 'atr' trails it
+    by atr_multiplier * ATR (from a StreamingATR over closed bars) once an ATR is
+    available, and by the percentage until then.
+    """
     
-    def __init__(self, state_file):
+    def __init__(self, state_file, trailing_pct_map=None, trail_mode='pct', atr_multiplier=2.0):
         """
         Initialize trailing stop manager.
         
         Args:
             state_file: Path to state file (e.g., 'state.txt' or 'state_btc.txt')
+            trailing_pct_map: Overrides for TRAILING_PCT_MAP (the `trailing_stops:` section of config.yaml)
+            trail_mode: 'pct' or 'atr'
+            atr_multiplier: Trail distance in ATRs for trail_mode='atr'
         """
+        if trail_mode not in TRAIL_MODES:
+            raise ValueError(f"Unknown trail mode: {trail_mode}")
         self.state_file = state_file
+        self.trailing_pct_map = get_trailing_pct_map(trailing_pct_map)
+        self.trail_mode = trail_mode
+        self.atr_multiplier = atr_multiplier
         self.trailing_stops_file = state_file.replace('.txt', '_trailing_stops.json')
+        self.journal_file = state_file.replace('.txt', '_trailing_stops.journal.jsonl')
+        self.archive_file = state_file.replace('.txt', '_trailing_stops_archive.jsonl')
+        self._journal = None
         self.load_trailing_stops()
     
     def load_trailing_stops(self):
-        """Load trailing stop data from file."""
+        """Load the snapshot, archive closed positions it still holds, and replay the journal."""
+        snapshot = self._init_stops()
         if os.path.exists(self.trailing_stops_file):
             try:
                 with open(self.trailing_stops_file, 'r') as f:
-                    self.stops = json.load(f)
+                    snapshot = json.load(f)
             except (json.JSONDecodeError, IOError):
-                self.stops = self._init_stops()
-        else:
-            self.stops = self._init_stops()
+                pass
+        
+        positions = snapshot.get('positions', {})
+        self.next_id = snapshot.get('next_id') or max(
+            [position_number(pid) for pid in positions] + [0]) + 1
+        self.trailing_pct = snapshot.get('trailing_pct')
+        self.trail_distance = snapshot.get('trail_distance')
+        self.last_updated = snapshot.get('last_updated')
+        
+        active = {pid: pos for pid, pos in positions.items() if pos.get('status') == 'active'}
+        # Older snapshots kept every closed position - move them to the archive once
+        inactive = [dict(pos, position_id=pid) for pid, pos in positions.items() if pid not in active]
+        self.book = StopBook(active)
+        self._journal_records = 0
+        self._replay_journal()
+        
+        if inactive:
+            self._archive(inactive)
+            self.compact()
     
     def _init_stops(self):
         """Initialize empty trailing stops."""
@@ -40,11 +117,84 @@ class TrailingStopManager:
             'last_updated': None
         }
     
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn last line from a crash
+                self._journal_records += 1
+                op = record.get('op')
+                if op == 'buy':
+                    self.book.add(record['id'], record['position'])
+                    self.next_id = max(self.next_id, position_number(record['id']) + 1)
+                elif op == 'peak':
+                    self.book.raise_peaks(record['price'], record['time'])
+                elif op == 'trail':
+                    self.trailing_pct = record['pct']
+                    self.trail_distance = record.get('distance')
+                elif op in ('hit', 'close'):
+                    self.book.remove(record['id'])
+                elif op == 'reduce' and record['id'] in self.book:
+                    self.book.positions[record['id']]['amount'] = record['amount']
+    
+    def _log(self, record):
+        """Append one change to the journal."""
+        if self._journal is None:
+            self._journal = open(self.journal_file, 'a')
+        self._journal.write(json.dumps(record) + '\n')
+        self._journal.flush()
+        self._journal_records += 1
+        self.last_updated = datetime.now().isoformat()
+    
+    def _archive(self, positions):
+        """Append finished positions to the archive (the last line per position_id wins)."""
+        with open(self.archive_file, 'a') as f:
+            for position in positions:
+                f.write(json.dumps(position) + '\n')
+    
     def save_trailing_stops(self):
-        """Save trailing stop data to file."""
-        self.stops['last_updated'] = datetime.now().isoformat()
-        with open(self.trailing_stops_file, 'w') as f:
-            json.dump(self.stops, f, indent=2)
+        """Write a snapshot of the active positions and start a new journal."""
+        self.compact()
+    
+    def compact(self):
+        """Write a snapshot of the active positions and truncate the journal."""
+        self.book.materialize()
+        positions = {}
+        for pid, position in self.book.positions.items():
+            positions[pid] = dict(position, trailing_stop_price=self._stop_price(position))
+        
+        tmp_path = self.trailing_stops_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'positions': positions,
+                'next_id': self.next_id,
+                'trailing_pct': self.trailing_pct,
+                'trail_distance': self.trail_distance,
+                'last_updated': datetime.now().isoformat()
+            }, f, indent=2)
+        os.replace(tmp_path, self.trailing_stops_file)
+        
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self._journal_records = 0
+    
+    def _stop_price(self, position):
+        """Current trailing stop of a position (initial 5% stop until the first update)."""
+        if self.trailing_pct is None:
+            return position['trailing_stop_price']
+        return max(stop_price(position['peak_price'], self.trailing_pct, self.trail_distance),
+                   position['cost_basis'])
+    
+    def has_active_positions(self):
+        """True if any position is being trailed (O(1))."""
+        return len(self.book) > 0
     
     def record_buy(self, cost_basis, amount):
         """
@@ -54,9 +204,10 @@ class TrailingStopManager:
             cost_basis: Cost basis of the position
             amount: Amount of asset purchased
         """
-        position_id = f"pos_{len(self.stops['positions']) + 1}"
+        position_id = f"pos_{self.next_id}"
+        self.next_id += 1
         
-        self.stops['positions'][position_id] = {
+        position = {
             'cost_basis': cost_basis,
             'amount': amount,
             'entry_time': datetime.now().isoformat(),
@@ -67,65 +218,87 @@ class TrailingStopManager:
             'profit_locked': None
         }
         
-        self.save_trailing_stops()
+        self._log({'op': 'buy', 'id': position_id, 'position': position})
+        self.book.add(position_id, position)
         return position_id
     
-    def update_peak_and_stop(self, current_price, volatility_level='moderate'):
+    def record_sell(self, price, amount):
+        """
+        Take a sold amount off the active positions, oldest first.
+        
+        Positions sold in full are closed (and archived); the last one is shrunk
+        when only part of it was sold.
+        
+        Args:
+            price: Sell price
+            amount: Amount of asset sold
+        
+        Returns:
+            list of closed position ids
+        """
+        closed = []
+        for pos_id in sorted(self.book.positions, key=position_number):
+            if amount <= 0:
+                break
+            position = self.book.positions[pos_id]
+            if position['amount'] - amount > DUST:
+                position['amount'] -= amount
+                self._log({'op': 'reduce', 'id': pos_id, 'amount': position['amount']})
+                break
+            amount -= position['amount']
+            profit_pct = ((price - position['cost_basis']) / position['cost_basis']) * 100
+            self.close_position(pos_id, price, profit_pct)
+            closed.append(pos_id)
+        return closed
+    
+    def update_peak_and_stop(self, current_price, volatility_level='moderate', atr=None):
         """
         Update peak price and calculate trailing stop for all active positions.
         
         Args:
             current_price: Current market price
             volatility_level: 'low', 'moderate', 'high', 'extreme'
+            atr: Current ATR (used with trail_mode='atr'; None while it is warming up)
         
         Returns:
-            dict with position updates and sell signals
+            list of sell signals for triggered stops
         """
         # Trailing stop percentage based on volatility
-        trailing_pct_map = {
-            'low': 0.03,      # 3% trail in low volatility
-            'moderate': 0.06,  # 6% trail in moderate volatility
-            'high': 0.10,      # 10% trail in high volatility
-            'extreme': 0.15    # 15% trail in extreme volatility (give it more room)
-        }
+        trailing_pct = self.trailing_pct_map.get(volatility_level, self.trailing_pct_map['moderate'])
+        trail_distance = atr * self.atr_multiplier if self.trail_mode == 'atr' and atr is not None else None
         
-        trailing_pct = trailing_pct_map.get(volatility_level, 0.06)
+        if trailing_pct != self.trailing_pct or trail_distance != self.trail_distance:
+            self.trailing_pct = trailing_pct
+            self.trail_distance = trail_distance
+            self._log({'op': 'trail', 'pct': trailing_pct, 'distance': trail_distance})
         
-        signals = []
+        # Raise every peak below the current price (O(1), pushed down lazily)
+        now = datetime.now().isoformat()
+        if self.book.raise_peaks(current_price, now):
+            self._log({'op': 'peak', 'price': current_price, 'time': now})
         
-        for pos_id, position in self.stops['positions'].items():
-            if position['status'] != 'active':
-                continue
-            
-            # Update peak price if current is higher
-            if current_price > position['peak_price']:
-                position['peak_price'] = current_price
-                position['peak_time'] = datetime.now().isoformat()
-            
-            # Calculate new trailing stop (from peak)
-            new_stop = position['peak_price'] * (1 - trailing_pct)
-            position['trailing_stop_price'] = max(
-                new_stop,
-                position['cost_basis']  # Never trail below cost basis (breakeven)
-            )
-            
-            # Check if we hit the trailing stop
-            profit_pct = ((current_price - position['cost_basis']) / position['cost_basis']) * 100
+        signals = []
+        hit = []
+        for pos_id, profit_pct in self.book.triggered(current_price, trailing_pct, trail_distance):
+            position = self.book.remove(pos_id)
+            position['trailing_stop_price'] = self._stop_price(position)
+            position['status'] = 'trailing_stop_hit'
+            position['profit_locked'] = profit_pct
+            self._log({'op': 'hit', 'id': pos_id, 'price': current_price, 'profit_pct': profit_pct})
+            hit.append(dict(position, position_id=pos_id))
             
-            if current_price <= position['trailing_stop_price'] and profit_pct > 0.5:
-                # Trailing stop triggered
-                position['status'] = 'trailing_stop_hit'
-                position['profit_locked'] = profit_pct
-                
-                signals.append({
-                    'action': 'sell_trailing_stop',
-                    'position_id': pos_id,
-                    'reason': f"Trailing stop hit. Peak was {position['peak_price']}, now {current_price}",
-                    'profit_pct': profit_pct,
-                    'profit_locked_at': current_price
-                })
-        
-        self.save_trailing_stops()
+            signals.append({
+                'action': 'sell_trailing_stop',
+                'position_id': pos_id,
+                'reason': f"Trailing stop hit. Peak was {position['peak_price']}, now {current_price}",
+                'profit_pct': profit_pct,
+                'profit_locked_at': current_price
+            })
+        
+        if hit:
+            self._archive(hit)
+        if self._journal_records >= JOURNAL_COMPACT_EVERY:
+            self.compact()
         return signals
     
     def get_active_position_status(self):
@@ -135,17 +308,18 @@ class TrailingStopManager:
         Returns:
             list of active positions with their trailing stop info
         """
+        self.book.materialize()
         active = []
         
-        for pos_id, position in self.stops['positions'].items():
-            if position['status'] == 'active':
-                active.append({
-                    'position_id': pos_id,
-                    'cost_basis': position['cost_basis'],
-                    'peak_price': position['peak_price'],
-                    'trailing_stop_price': position['trailing_stop_price'],
-                    'entry_time': position['entry_time']
-                })
+        for pos_id in sorted(self.book.positions, key=position_number):
+            position = self.book.positions[pos_id]
+            active.append({
+                'position_id': pos_id,
+                'cost_basis': position['cost_basis'],
+                'peak_price': position['peak_price'],
+                'trailing_stop_price': self._stop_price(position),
+                'entry_time': position['entry_time']
+            })
         
         return active
     
@@ -158,11 +332,17 @@ class TrailingStopManager:
             exit_price: Price at which position was exited
             profit_pct: Profit percentage achieved
         """
-        if position_id in self.stops['positions']:
-            self.stops['positions'][position_id]['status'] = 'closed'
-            self.stops['positions'][position_id]['exit_price'] = exit_price
-            self.stops['positions'][position_id]['profit_locked'] = profit_pct
-            self.save_trailing_stops()
+        position = self.book.remove(position_id)
+        if position is None:
+            # Already archived (e.g. its trailing stop fired) - record the exit there
+            position = {}
+        else:
+            position['trailing_stop_price'] = self._stop_price(position)
+            self._log({'op': 'close', 'id': position_id})
+        
+        position.update(status='closed', exit_price=exit_price, profit_locked=profit_pct,
+                        position_id=position_id)
+        self._archive([position])
     
     def get_position_profit_potential(self, current_price):
         """
@@ -174,18 +354,17 @@ class TrailingStopManager:
         Returns:
             dict with analysis
         """
-        if not self.stops['positions']:
+        if not self.book.positions:
             return {'positions': [], 'avg_profit_if_sell_now': 0, 'avg_profit_at_peak': 0}
         
+        self.book.materialize()
         positions_analysis = []
         total_profit_now = 0
         total_profit_potential = 0
         count = 0
         
-        for pos_id, position in self.stops['positions'].items():
-            if position['status'] != 'active':
-                continue
-            
+        for pos_id in sorted(self.book.positions, key=position_number):
+            position = self.book.positions[pos_id]
             profit_now = ((current_price - position['cost_basis']) / position['cost_basis']) * 100
             profit_potential = ((position['peak_price'] - position['cost_basis']) / position['cost_basis']) * 100
             
@@ -214,6 +393,10 @@ def calculate_atr_trailing_stop(prices, atr_multiplier=2.0, atr_period=14):
     """
     Calculate trailing stop using ATR (Average True Range) - pro trader method.
     
+    This approximates true range from adjacent closes. For a live trail, feed closed
+    bars to pattern_analyzer.StreamingATR (Wilder ATR on real highs/lows, O(1) per bar)
+    and use TrailingStopManager(trail_mode='atr').
+    
     Args:
         prices: List of [timestamp, price] pairs (need OHLC ideally, but using close)
         atr_multiplier: Multiplier for ATR (1.5-2.0 typical)
@@ -225,7 +408,8 @@ def calculate_atr_trailing_stop(prices, atr_multiplier=2.0, atr_period=14):
     if not prices or len(prices) < atr_period:
         return None
     
-    price_values = [p[1] for p in prices]
+    # Only the last atr_period ranges are used
+    price_values = [p[1] for p in prices[-(atr_period + 1):]]
     
     # Simple ATR calculation (using range approximation)
     true_ranges = []
@@ -246,6 +430,310 @@ def calculate_atr_trailing_stop(prices, atr_multiplier=2.0, atr_period=14):
     return trailing_stop
 
 
+def calculate_bar_atr_trailing_stop(bars, atr_multiplier=2.0, atr_period=14):
+    """
+    ATR trailing stop from OHLC bars (true range uses the real highs and lows).
+    
+    Args:
+        bars: List of (open_time, open, high, low, close, volume) bars (see modules.bar_store)
+        atr_multiplier: Multiplier for ATR (1.5-2.0 typical)
+        atr_period: Period for ATR calculation (14 common)
+    
+    Returns:
+        float: Trailing stop price
+    """
+    if not bars or len(bars) < atr_period:
+        return None
+    
+    bars = bars[-(atr_period + 1):]
+    
+    # True range = max(high - low, |high - previous close|, |low - previous close|)
+    true_ranges = []
+    for i in range(1, len(bars)):
+        high, low, prev_close = bars[i][2], bars[i][3], bars[i - 1][4]
+        true_ranges.append(max(high - low, abs(high - prev_close), abs(low - prev_close)))
+    
+    atr = sum(true_ranges) / len(true_ranges)
+    
+    highest_high = max(bar[2] for bar in bars[-atr_period:])
+    return highest_high - (atr * atr_multiplier)
+
+
+def atr_trailing_stop_series(prices, atr_multiplier=2.0, atr_period=14, highs=None, lows=None):
+    """
+    ATR trailing stop at every tick of a series.
+    
+    Value i equals calculate_atr_trailing_stop() (or calculate_bar_atr_trailing_stop() when
+    highs and lows are given) over the series up to and including i. These are raw stop
+    levels with no position behind them; simulate_atr_trailing_stops() adds the cost-basis
+    floor and profit check per position.
+    
+    Args:
+        prices: Price (or bar close) values, oldest first
+        atr_multiplier: Multiplier for ATR (1.5-2.0 typical)
+        atr_period: Period for ATR calculation (14 common)
+        highs, lows: Optional bar highs and lows aligned with prices
+    
+    Returns:
+        array of stop prices (list without NumPy); NaN until atr_period values are available
+    """
+    n = len(prices)
+    bars = highs is not None and lows is not None
+    
+    if np is None:
+        stops = [math.nan] * n
+        window_highs = SlidingExtrema(atr_period)
+        ranges = []
+        range_sum = 0.0
+        for i in range(n):
+            high = highs[i] if bars else prices[i]
+            window_highs.push(high)
+            if i:
+                prev_close = prices[i - 1]
+                if bars:
+                    tr = max(high - lows[i], abs(high - prev_close), abs(lows[i] - prev_close))
+                else:
+                    tr = abs(prices[i] - prev_close)
+                ranges.append(tr)
+                range_sum += tr
+                if len(ranges) > atr_period:
+                    range_sum -= ranges[-atr_period - 1]
+            if i + 1 >= atr_period and i:
+                atr = range_sum / min(i, atr_period)
+                stops[i] = window_highs.max() - atr * atr_multiplier
+        return stops
+    
+    closes = np.asarray(prices, dtype=float)
+    stops = np.full(n, np.nan)
+    if n < max(atr_period, 2):
+        return stops
+    
+    if bars:
+        high_values = np.asarray(highs, dtype=float)
+        low_values = np.asarray(lows, dtype=float)
+        prev_close = closes[:-1]
+        ranges = np.maximum(high_values[1:] - low_values[1:],
+                            np.maximum(np.abs(high_values[1:] - prev_close), np.abs(low_values[1:] - prev_close)))
+    else:
+        high_values = closes
+        ranges = np.abs(np.diff(closes))
+    
+    # range_sums[i] = sum of the true ranges ending at ticks 1..i
+    range_sums = np.concatenate(([0.0], np.cumsum(ranges)))
+    ticks = np.arange(n)
+    counts = np.minimum(ticks, atr_period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        atr = (range_sums - range_sums[ticks - counts]) / counts
+    
+    # Highest high of each atr_period window, from overlapping power-of-two runs
+    runs = high_values
+    span = 1
+    while span * 2 <= atr_period:
+        runs = np.maximum(runs[:-span], runs[span:])
+        span *= 2
+    window_highs = np.maximum(runs[:n - atr_period + 1], runs[atr_period - span:])
+    
+    first = max(atr_period - 1, 1)
+    stops[first:] = window_highs[first - atr_period + 1:] - atr[first:] * atr_multiplier
+    return stops
+
+
+def _first_fire(fires):
+    """Offset of the first True in a block, or None."""
+    if np is not None:
+        hits = np.flatnonzero(fires)
+        return int(hits[0]) if hits.size else None
+    return fires.index(True) if True in fires else None
+
+
+def _run_trails(prices, entries, cost_bases, step, return_paths):
+    """
+    Scan each position forward in growing blocks until its stop fires.
+    
+    step(start, end, peak, stop, cost_basis) returns the running peaks, stops and fire
+    flags for prices[start:end], continuing from the previous block's peak and stop.
+    """
+    n = len(prices)
+    result = {'exit_index': [], 'exit_price': [], 'peak_price': [], 'profit_pct': []}
+    if return_paths:
+        result['peaks'] = []
+        result['stops'] = []
+    
+    for k, entry in enumerate(entries):
+        cost_basis = float(cost_bases[k]) if cost_bases is not None else float(prices[entry])
+        peak, stop = cost_basis, -math.inf
+        start, block = entry + 1, SIMULATION_BLOCK
+        exit_index = None
+        peak_parts, stop_parts = [], []
+        
+        # Most lots resolve early, a few run to the end of the series
+        while start < n:
+            end = min(n, start + block)
+            peaks, stops, fires = step(start, end, peak, stop, cost_basis)
+            hit = _first_fire(fires)
+            if hit is not None:
+                exit_index = start + hit
+                peaks, stops = peaks[:hit + 1], stops[:hit + 1]
+            peak_parts.append(peaks)
+            stop_parts.append(stops)
+            peak, stop = float(peaks[-1]), float(stops[-1])
+            if exit_index is not None:
+                break
+            start = end
+            block *= 2
+        
+        exit_price = float(prices[exit_index]) if exit_index is not None else None
+        result['exit_index'].append(exit_index)
+        result['exit_price'].append(exit_price)
+        result['peak_price'].append(peak)
+        result['profit_pct'].append(((exit_price - cost_basis) / cost_basis) * 100
+                                    if exit_index is not None else None)
+        if return_paths:
+            if np is not None:
+                result['peaks'].append(np.concatenate(peak_parts) if peak_parts else np.empty(0))
+                result['stops'].append(np.concatenate(stop_parts) if stop_parts else np.empty(0))
+            else:
+                result['peaks'].append([value for part in peak_parts for value in part])
+                result['stops'].append([value for part in stop_parts for value in part])
+    return result
+
+
+def _trail_pcts(trailing_pct, n, trailing_pct_map):
+    """Trailing percentage as a scalar, or one per tick from percentages or volatility levels."""
+    pct_map = trailing_pct_map or TRAILING_PCT_MAP
+    default = pct_map['moderate']
+    if isinstance(trailing_pct, str):
+        return pct_map.get(trailing_pct, default)
+    if isinstance(trailing_pct, (int, float)):
+        return float(trailing_pct)
+    
+    if len(trailing_pct) != n:
+        raise ValueError(f"Expected {n} trailing percentages or volatility levels, got {len(trailing_pct)}")
+    if np is None:
+        return [pct_map.get(level, default) if isinstance(level, str) else float(level)
+                for level in trailing_pct]
+    
+    levels = np.asarray(trailing_pct)
+    if levels.dtype.kind not in 'UO':
+        return levels.astype(float)
+    pcts = np.full(n, default)
+    for level, pct in pct_map.items():
+        pcts[levels == level] = pct
+    return pcts
+
+
+def simulate_trailing_stops(prices, entries, trailing_pct='moderate', cost_bases=None,
+                            trailing_pct_map=None, return_paths=False):
+    """
+    Percentage trailing stops for many positions over a whole price series.
+    
+    Applies the update_peak_and_stop() rules to each position from the tick after its
+    entry: the peak is the running max since entry (starting at cost basis), the stop
+    is max(peak * (1 - trailing_pct), cost_basis), and it fires when the price is at or
+    below the stop with more than 0.5% profit. With NumPy each position is a few
+    cumulative-max passes instead of a Python loop over ticks.
+    
+    Args:
+        prices: Price values, oldest first
+        entries: Tick index of each position's buy
+        trailing_pct: Trailing percentage (decimal) or volatility level, either one for the
+                      whole series or one per tick
+        cost_bases: Optional cost basis per position (default: the price at entry)
+        trailing_pct_map: Volatility level -> percentage (default: TRAILING_PCT_MAP)
+        return_paths: Also return each position's peak and stop path
+    
+    Returns:
+        dict of lists, one entry per position: 'exit_index' (None if the stop never fires),
+        'exit_price', 'peak_price' (at exit, or at the end of the series), 'profit_pct';
+        with return_paths, 'peaks' and 'stops' arrays covering entry + 1 through the exit
+    """
+    if np is not None:
+        prices = np.asarray(prices, dtype=float)
+    pcts = _trail_pcts(trailing_pct, len(prices), trailing_pct_map)
+    per_tick = not isinstance(pcts, float)
+    
+    def step(start, end, peak, stop, cost_basis):
+        if np is not None:
+            chunk = prices[start:end]
+            peaks = np.maximum.accumulate(np.maximum(chunk, peak))
+            stops = np.maximum(peaks * (1 - (pcts[start:end] if per_tick else pcts)), cost_basis)
+            fires = (chunk <= stops) & (((chunk - cost_basis) / cost_basis) * 100 > 0.5)
+            return peaks, stops, fires
+        
+        peaks, stops, fires = [], [], []
+        for i in range(start, end):
+            price = prices[i]
+            peak = max(peak, price)
+            stop = max(peak * (1 - (pcts[i] if per_tick else pcts)), cost_basis)
+            peaks.append(peak)
+            stops.append(stop)
+            fires.append(price <= stop and ((price - cost_basis) / cost_basis) * 100 > 0.5)
+        return peaks, stops, fires
+    
+    return _run_trails(prices, entries, cost_bases, step, return_paths)
+
+
+def simulate_atr_trailing_stops(prices, entries, atr_multiplier=2.0, atr_period=14,
+                                highs=None, lows=None, cost_bases=None, return_paths=False,
+                                floor_at_cost_basis=True):
+    """
+    ATR trailing stops for many positions over a whole price series.
+    
+    Each position's stop starts at the ATR trailing stop of the tick after entry (see
+    atr_trailing_stop_series) and only ever moves up. As in update_peak_and_stop() with
+    trail_mode='atr', the stop never trails below cost basis and fires when the price
+    (bar close) is at or below it with more than 0.5% profit. With
+    floor_at_cost_basis=False there is no floor and no profit check, so the stop also
+    acts as a stop loss.
+    
+    Args:
+        prices: Price (or bar close) values, oldest first
+        entries: Tick index of each position's buy
+        atr_multiplier: Multiplier for ATR (1.5-2.0 typical)
+        atr_period: Period for ATR calculation (14 common)
+        highs, lows: Optional bar highs and lows aligned with prices (true range from OHLC)
+        cost_bases: Optional cost basis per position (default: the price at entry)
+        return_paths: Also return each position's peak and stop path
+        floor_at_cost_basis: Apply the live manager's cost-basis floor and profit check
+    
+    Returns:
+        dict of lists, as simulate_trailing_stops()
+    """
+    if np is not None:
+        prices = np.asarray(prices, dtype=float)
+    atr_stops = atr_trailing_stop_series(prices, atr_multiplier, atr_period, highs, lows)
+    
+    def step(start, end, peak, stop, cost_basis):
+        if np is not None:
+            chunk = prices[start:end]
+            peaks = np.maximum.accumulate(np.maximum(chunk, peak))
+            # fmax skips the NaN warm-up values
+            stops = np.fmax.accumulate(np.fmax(atr_stops[start:end], stop))
+            if not floor_at_cost_basis:
+                return peaks, stops, chunk <= stops
+            stops = np.maximum(stops, cost_basis)
+            fires = (chunk <= stops) & (((chunk - cost_basis) / cost_basis) * 100 > 0.5)
+            return peaks, stops, fires
+        
+        peaks, stops, fires = [], [], []
+        for i in range(start, end):
+            price = prices[i]
+            peak = max(peak, price)
+            if not math.isnan(atr_stops[i]) and not atr_stops[i] <= stop:
+                stop = atr_stops[i]
+            if floor_at_cost_basis:
+                stop = max(stop, cost_basis)
+                fire = price <= stop and ((price - cost_basis) / cost_basis) * 100 > 0.5
+            else:
+                fire = price <= stop
+            peaks.append(peak)
+            stops.append(stop)
+            fires.append(fire)
+        return peaks, stops, fires
+    
+    return _run_trails(prices, entries, cost_bases, step, return_paths)
+
+
 if __name__ == "__main__":
     # Test the trailing stop manager
     print("Testing trailing stop manager...")
@@ -0,0 +1,199 @@
+"""
+Parameter sweep - backtests many config.yaml variants in parallel.
+
+Prices are copied once into shared memory and every worker process maps them
+directly, so each task only ships a handful of parameters, never the series.
+Grid search tries every combination; random search samples a fixed number of them.
+
+Usage:
+    python param_sweep.py data/historical_BTC.json sweep.yaml [workers]
+
+sweep.yaml:
+    grid:
+      hold_band_pct: [3, 5, 7]
+      buffer.sell: [1.0, 1.015]
+      sell_steps.0.trigger_pct: [5, 10, 15]
+      buy_steps.0.trigger_pct: [-5, -10]
+      trailing_stops.moderate: [0.04, 0.06, 0.08]
+    samples: 500          # Optional: random search instead of the full grid
+    ma_window: 100        # Optional: overrides moving_average_window
+    balance: 0.5          # Optional: starting holdings
+    cash: 20000
+"""
+
+import copy
+import itertools
+import json
+import os
+import random
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import yaml
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - workers fall back to a memoryview
+    np = None
+
+from backtester import load_price_series, run_backtest
+
+RESULT_KEYS = ('pnl', 'pnl_pct', 'max_drawdown_pct', 'buys', 'sells', 'trailing_stop_hits',
+               'alerts_sent', 'alerts_suppressed', 'final_value')
+
+# Set in each worker by _init_worker()
+_worker = {}
+
+
+def apply_params(config, params):
+    """
+    Copy a config and set dotted keys in it.
+
+    Args:
+        config: Base config dict
+        params: e.g. {'hold_band_pct': 3, 'sell_steps.0.trigger_pct': 10, 'trailing_stops.high': 0.12}
+
+    Returns:
+        dict: New config (the base config is not modified)
+    """
+    config = copy.deepcopy(config)
+    for key, value in params.items():
+        *path, last = key.split('.')
+        node = config
+        for part in path:
+            if isinstance(node, list):
+                node = node[int(part)]
+            else:
+                node = node.setdefault(part, {})
+        if isinstance(node, list):
+            node[int(last)] = value
+        else:
+            node[last] = value
+    return config
+
+
+def grid_params(grid, samples=None, seed=0):
+    """
+    Parameter sets to try.
+
+    Args:
+        grid: Dotted key -> list of values
+        samples: Number of random combinations (None = full grid)
+        seed: Random seed for repeatable sampling
+
+    Returns:
+        list of {key: value} dicts
+    """
+    keys = list(grid)
+    total = 1
+    for key in keys:
+        total *= len(grid[key])
+
+    if samples is None or samples >= total:
+        return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+    # Sample distinct combinations by their position in the grid
+    rng = random.Random(seed)
+    params = []
+    for index in rng.sample(range(total), samples):
+        values = {}
+        for key in reversed(keys):
+            index, position = divmod(index, len(grid[key]))
+            values[key] = grid[key][position]
+        params.append({key: values[key] for key in keys})
+    return params
+
+
+def _init_worker(shm_name, length, base_config, options):
+    """Attach to the shared price buffer once per worker process."""
+    shm = shared_memory.SharedMemory(name=shm_name)  # The parent unlinks it when the sweep ends
+
+    if np is not None:
+        prices = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+    else:
+        prices = shm.buf.cast('d')[:length]
+
+    _worker.update(shm=shm, prices=prices, config=base_config, options=options)
+
+
+def _run_batch(batch):
+    """Backtest a batch of parameter sets against the shared prices."""
+    results = []
+    for params in batch:
+        result = run_backtest(_worker['prices'], apply_params(_worker['config'], params), **_worker['options'])
+        summary = {key: result[key] for key in RESULT_KEYS}
+        summary['params'] = params
+        results.append(summary)
+    return results
+
+
+def run_sweep(prices, base_config, param_sets, workers=None, batch_size=None, **options):
+    """
+    Backtest every parameter set in parallel.
+
+    Args:
+        prices: Price series, oldest first
+        base_config: Parsed config.yaml dict the parameters are applied to
+        param_sets: From grid_params()
+        workers: Worker processes (default: all cores)
+        batch_size: Parameter sets per task (default: about 4 tasks per worker)
+        **options: Passed to run_backtest() (balance, cash, cost_basis, ma_window, ...)
+
+    Returns:
+        list of result summaries, best P/L first
+    """
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or max(1, len(param_sets) // (workers * 4))
+    batches = [param_sets[i:i + batch_size] for i in range(0, len(param_sets), batch_size)]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(prices)) * 8)
+    try:
+        shm.buf.cast('d')[:len(prices)] = array('d', prices)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shm.name, len(prices), base_config, options)
+        ) as executor:
+            results = [summary for batch in executor.map(_run_batch, batches) for summary in batch]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results.sort(key=lambda r: r['pnl'], reverse=True)
+    return results
+
+
+def main(argv):
+    if len(argv) < 3:
+        print("Usage: python param_sweep.py <prices .json/.bin> <sweep.yaml> [workers]")
+        return
+
+    config = yaml.safe_load(open("config.yaml")) if os.path.exists("config.yaml") else {}
+    sweep = yaml.safe_load(open(argv[2]))
+    workers = int(argv[3]) if len(argv) > 3 else None
+
+    _, prices = load_price_series(argv[1])
+    param_sets = grid_params(sweep['grid'], sweep.get('samples'), sweep.get('seed', 0))
+    options = {key: sweep[key] for key in ('balance', 'cash', 'cost_basis', 'ma_window') if key in sweep}
+
+    print(f"Sweeping {len(param_sets):,} configurations over {len(prices):,} prices "
+          f"on {workers or os.cpu_count()} workers...")
+    results = run_sweep(prices, config, param_sets, workers, **options)
+
+    print("\n" + "=" * 60)
+    print("TOP 10 CONFIGURATIONS (by P/L)")
+    print("=" * 60)
+    for rank, result in enumerate(results[:10], 1):
+        print(f"{rank:>2}. P/L {result['pnl']:+,.2f} HKD ({result['pnl_pct']:+.2f}%) | "
+              f"DD {result['max_drawdown_pct']:.2f}% | {result['buys']}B/{result['sells']}S | {result['params']}")
+
+    output_file = os.path.join("data", "sweep_results.json")
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nAll results saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,4 +1,4 @@
-import requests
+from modules.http_session import http_get
 
 # Mapping of common crypto symbols to CoinGecko IDs
 CRYPTO_MAPPING = {
@@ -13,16 +13,79 @@ CRYPTO_MAPPING = {
     "USDC": "usd-coin"
 }
 
+SIMPLE_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+MAX_IDS_LENGTH = 1500  # Keep the comma-separated ids well under common URL length limits
+
+def get_coingecko_id(asset):
+    """Convert symbol to CoinGecko ID (unknown symbols are passed through lowercased)."""
+    return CRYPTO_MAPPING.get(asset.upper(), asset.lower())
+
 def get_price(asset):
     # Convert symbol to CoinGecko ID
-    coingecko_id = CRYPTO_MAPPING.get(asset.upper(), asset.lower())
+    coingecko_id = get_coingecko_id(asset)
     
-    url = "https://api.coingecko.com/api/v3/simple/price"
     params = {
         "ids": coingecko_id,
         "vs_currencies": "hkd"
     }
-    r = requests.get(url, params=params, timeout=10)
+    r = http_get(SIMPLE_PRICE_URL, params=params)
     r.raise_for_status()
     return r.json()[coingecko_id]["hkd"]
 
+def _chunk_ids(coingecko_ids, max_length=MAX_IDS_LENGTH):
+    """Split ids into groups whose comma-joined length stays under max_length."""
+    chunks = []
+    current = []
+    current_length = 0
+    for coingecko_id in coingecko_ids:
+        added_length = len(coingecko_id) + (1 if current else 0)
+        if current and current_length + added_length > max_length:
+            chunks.append(current)
+            current = []
+            added_length = len(coingecko_id)
+            current_length = 0
+        current.append(coingecko_id)
+        current_length += added_length
+    if current:
+        chunks.append(current)
+    return chunks
+
+def get_prices(assets):
+    """
+    Fetch HKD prices for several assets with one /simple/price request per chunk of ids.
+    
+    Args:
+        assets: List of symbols (e.g., ['ETH', 'BTC'])
+    
+    Returns:
+        (prices, errors): prices maps each symbol to its price, errors maps each
+        symbol that could not be priced to an error message
+    """
+    ids_by_asset = {asset: get_coingecko_id(asset) for asset in assets}
+    unique_ids = list(dict.fromkeys(ids_by_asset.values()))
+    
+    quotes = {}
+    chunk_errors = {}
+    for chunk in _chunk_ids(unique_ids):
+        params = {
+            "ids": ",".join(chunk),
+            "vs_currencies": "hkd"
+        }
+        try:
+            r = http_get(SIMPLE_PRICE_URL, params=params)
+            r.raise_for_status()
+            quotes.update(r.json())
+        except Exception as e:
+            for coingecko_id in chunk:
+                chunk_errors[coingecko_id] = str(e)
+    
+    prices = {}
+    errors = {}
+    for asset, coingecko_id in ids_by_asset.items():
+        if coingecko_id in chunk_errors:
+            errors[asset] = chunk_errors[coingecko_id]
+        elif "hkd" in quotes.get(coingecko_id, {}):
+            prices[asset] = quotes[coingecko_id]["hkd"]
+        else:
+            errors[asset] = f"No HKD price returned for '{coingecko_id}'"
+    return prices, errors
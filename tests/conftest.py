@@ -0,0 +1,6 @@
+"""Shared test setup: make the repository root importable (main.py, backtester.py, modules/)."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
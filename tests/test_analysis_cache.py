@@ -0,0 +1,82 @@
+"""AnalysisCache results must equal a full analyze_price_action() run on the same series."""
+
+import random
+
+from modules.analysis_cache import AnalysisCache
+from modules.historical_analyzer import analyze_price_action
+
+STEP_MS = 3_600_000
+
+
+def comparable(analysis):
+    """Analysis without its 'analyzed_at' wall-clock stamp."""
+    return {key: value for key, value in analysis.items() if key != 'analyzed_at'}
+
+
+def series(rng, start_ts, n, price=100.0):
+    points = []
+    for i in range(n):
+        price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+        points.append([start_ts + i * STEP_MS, price])
+    return points
+
+
+def test_refreshes_match_full_analysis():
+    """Appends, a sliding head, revised tail points and unchanged refreshes, for two assets."""
+    rng = random.Random(4)
+    cache = AnalysisCache()
+    history = {asset: series(rng, 0, 300) for asset in ('BTC', 'ETH')}
+
+    for refresh in range(200):
+        asset = rng.choice(list(history))
+        prices = history[asset]
+        action = rng.random()
+        if action < 0.4:
+            prices.extend(series(rng, prices[-1][0] + STEP_MS, rng.randint(1, 5), prices[-1][1]))
+        elif action < 0.6:
+            del prices[:rng.randint(1, 10)]
+            prices.extend(series(rng, prices[-1][0] + STEP_MS, rng.randint(1, 10), prices[-1][1]))
+        elif action < 0.8:
+            # The provider revised the last few points
+            for point in prices[-rng.randint(1, 5):]:
+                point[1] *= 1 + rng.gauss(0, 0.01)
+
+        snapshot = [list(point) for point in prices]
+        assert comparable(cache.analyze(asset, snapshot)) == comparable(analyze_price_action(snapshot, backend='python'))
+
+
+def test_unchanged_series_is_a_cache_hit():
+    prices = series(random.Random(5), 0, 100)
+    cache = AnalysisCache()
+    first = cache.analyze('BTC', prices)
+    assert comparable(cache.analyze('BTC', [list(point) for point in prices])) == comparable(first)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+class FakeIndex:
+    def levels(self):
+        return {'7d': {'support': 1.0, 'resistance': 2.0}}
+
+
+def test_levels_do_not_leak_into_the_cache():
+    prices = series(random.Random(8), 0, 100)
+    cache = AnalysisCache()
+    with_levels = cache.analyze('BTC', prices, index=FakeIndex())
+    assert with_levels['support_resistance']['levels'] == FakeIndex().levels()
+    assert 'levels' not in cache.analyze('BTC', prices)['support_resistance']
+
+
+def test_volumes_are_part_of_the_key():
+    rng = random.Random(6)
+    prices = series(rng, 0, 100)
+    volumes = [[ts, rng.uniform(1, 10)] for ts, _ in prices]
+    cache = AnalysisCache()
+    assert comparable(cache.analyze('BTC', prices, volumes)) == comparable(
+        analyze_price_action(prices, volumes, backend='python'))
+    volumes[-1][1] *= 3
+    assert comparable(cache.analyze('BTC', prices, volumes)) == comparable(
+        analyze_price_action(prices, volumes, backend='python'))
+
+
+def test_short_series_returns_none():
+    assert AnalysisCache().analyze('BTC', series(random.Random(7), 0, 4)) is None
@@ -0,0 +1,109 @@
+"""The backtester's vectorized pre-filter must not change what a per-tick replay finds."""
+
+import random
+
+import pytest
+
+import backtester
+import modules.trailing_stop_manager as trailing_stop_manager
+from decision_engine import compile_thresholds, evaluate
+
+CONFIGS = [
+    {
+        'hold_band_pct': 5,
+        'buffer': {'sell': 1.015, 'buy': 0.985},
+        'sell_steps': [{'trigger_pct': 10, 'sell_pct': 0.2}, {'trigger_pct': 20, 'sell_pct': 0.3}],
+        'buy_steps': [{'trigger_pct': -10, 'buy_pct': 0.2}, {'trigger_pct': -20, 'buy_pct': 0.3}],
+    },
+    {
+        # Steps inside the hold band and a buffer that loosens the first sell step
+        'hold_band_pct': 8,
+        'buffer': {'sell': 0.99, 'buy': 1.01},
+        'sell_steps': [{'trigger_pct': 3, 'sell_pct': 0.5}],
+        'buy_steps': [{'trigger_pct': -4, 'buy_pct': 0.5}, {'trigger_pct': -12, 'buy_pct': 0.25}],
+    },
+    {'hold_band_pct': 2, 'sell_steps': [], 'buy_steps': [{'trigger_pct': -3, 'buy_pct': 0.1}]},
+]
+
+
+def random_walk(seed, n=4000):
+    rng = random.Random(seed)
+    price = 50000.0
+    prices = []
+    for _ in range(n):
+        price *= 1 + rng.gauss(0, 0.01)
+        prices.append(price)
+    return prices
+
+
+def every_tick(prices, ma, thresholds, start):
+    return list(range(start, len(prices)))
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(backtester, 'np', None)
+        monkeypatch.setattr(trailing_stop_manager, 'np', None)
+    elif backtester.np is None:
+        pytest.skip('NumPy not installed')
+
+
+@pytest.mark.parametrize('config', CONFIGS)
+def test_skipped_ticks_never_signal(config, backend):
+    """Every tick the pre-filter drops is a HOLD (or nothing) for any balance, cash or cost basis."""
+    prices = random_walk(1)
+    window = 50
+    ma = backtester._moving_average(prices, window)
+    candidates = set(backtester._candidate_ticks(
+        prices if backtester.np is None else backtester.np.asarray(prices), ma,
+        compile_thresholds(config), window - 1))
+
+    for i in range(window - 1, len(prices)):
+        if i in candidates:
+            continue
+        ref_price = sum(prices[i - window + 1:i + 1]) / window
+        for balance, cash, cost_basis in [(1.0, 100000.0, None), (1.0, 100000.0, prices[i] * 0.5),
+                                          (1.0, 100000.0, prices[i] * 2)]:
+            decisions = evaluate(prices[i], ref_price, balance, cash, config, cost_basis)
+            assert all(d['type'] == 'HOLD' for d in decisions), (i, decisions)
+
+
+@pytest.mark.parametrize('config', CONFIGS)
+@pytest.mark.parametrize('seed', [2, 3])
+def test_prefiltered_backtest_matches_per_tick_replay(config, seed, backend, monkeypatch):
+    prices = random_walk(seed)
+    kwargs = dict(balance=0.5, cash=200000.0, cost_basis=prices[0], ma_window=50,
+                  sell_on_trailing_stop=True)
+    filtered = backtester.run_backtest(prices, config, **kwargs)
+
+    monkeypatch.setattr(backtester, '_candidate_ticks', every_tick)
+    per_tick = backtester.run_backtest(prices, config, **kwargs)
+
+    assert filtered['evaluated'] < per_tick['evaluated']
+    filtered.pop('evaluated')
+    per_tick.pop('evaluated')
+    assert filtered == per_tick
+
+
+def test_trailing_stops_only_sell_lots_still_held(backend):
+    """Sells shrink lots oldest first; a stop sells what is left of its own lot, never other coins."""
+    prices = random_walk(8)
+    result = backtester.run_backtest(prices, CONFIGS[1], cash=200000.0, ma_window=50,
+                                     sell_on_trailing_stop=True)
+    assert result['sells'] and result['trailing_stop_hits']
+
+    lots = {}
+    for lot_id, trade in enumerate(result['trades']):
+        if trade['type'] == 'BUY':
+            lots[lot_id] = trade['amount']
+        elif trade['type'] == 'SELL':
+            backtester._sell_lots(lots, trade['amount'])
+        else:
+            assert trade['amount'] == pytest.approx(lots.pop(trade['lot']), rel=1e-4, abs=1e-7)
+    assert result['trailing_stop_hits'] == sum(1 for t in result['trades'] if t['type'] == 'TRAILING_STOP')
+
+
+def test_starting_balance_needs_cost_basis():
+    with pytest.raises(ValueError):
+        backtester.run_backtest(random_walk(9, 200), CONFIGS[0], balance=1.0, cash=1000.0)
@@ -0,0 +1,123 @@
+"""StopBook and TrailingStopManager must behave like the original walk over every position."""
+
+import random
+
+import pytest
+
+from modules.stop_book import StopBook, stop_price
+from modules.trailing_stop_manager import TRAILING_PCT_MAP, TrailingStopManager
+
+
+class BaselineStops:
+    """The pre-StopBook update_peak_and_stop(): a walk over every position on every tick."""
+
+    def __init__(self):
+        self.positions = {}
+
+    def record_buy(self, cost_basis):
+        position_id = f"pos_{len(self.positions) + 1}"
+        self.positions[position_id] = {'cost_basis': cost_basis, 'peak_price': cost_basis,
+                                       'trailing_stop_price': cost_basis * 0.95, 'status': 'active'}
+        return position_id
+
+    def update_peak_and_stop(self, current_price, volatility_level):
+        trailing_pct = TRAILING_PCT_MAP.get(volatility_level, 0.06)
+        signals = []
+        for pos_id, position in self.positions.items():
+            if position['status'] != 'active':
+                continue
+            position['peak_price'] = max(position['peak_price'], current_price)
+            position['trailing_stop_price'] = max(position['peak_price'] * (1 - trailing_pct),
+                                                  position['cost_basis'])
+            profit_pct = ((current_price - position['cost_basis']) / position['cost_basis']) * 100
+            if current_price <= position['trailing_stop_price'] and profit_pct > 0.5:
+                position['status'] = 'trailing_stop_hit'
+                signals.append((pos_id, profit_pct))
+        return signals
+
+    def close_position(self, position_id):
+        self.positions[position_id]['status'] = 'closed'
+
+    def active(self):
+        return [(pos_id, p['cost_basis'], p['peak_price'], p['trailing_stop_price'])
+                for pos_id, p in self.positions.items() if p['status'] == 'active']
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_manager_matches_baseline(seed, tmp_path):
+    """Random walk with buys, closes, volatility changes and restarts from the journal."""
+    rng = random.Random(seed)
+    state_file = str(tmp_path / 'state.txt')
+    manager = TrailingStopManager(state_file)
+    baseline = BaselineStops()
+    price = 100.0
+
+    for tick in range(3000):
+        price = max(1.0, price * (1 + rng.gauss(0, 0.01)))
+        action = rng.random()
+        if action < 0.05:
+            assert manager.record_buy(price, 1.0) == baseline.record_buy(price)
+        elif action < 0.06 and baseline.active():
+            pos_id = rng.choice(baseline.active())[0]
+            manager.close_position(pos_id, price, 0.0)
+            baseline.close_position(pos_id)
+        elif action < 0.065:
+            manager = TrailingStopManager(state_file)
+
+        level = rng.choice(list(TRAILING_PCT_MAP))
+        signals = manager.update_peak_and_stop(price, level)
+        assert [(s['position_id'], s['profit_pct']) for s in signals] == \
+            baseline.update_peak_and_stop(price, level)
+
+        if tick % 100 == 0:
+            status = [(p['position_id'], p['cost_basis'], p['peak_price'], p['trailing_stop_price'])
+                      for p in manager.get_active_position_status()]
+            assert status == baseline.active()
+
+
+def brute_force_triggered(positions, price, trailing_pct, trail_distance):
+    fired = []
+    for pos_id in sorted(positions, key=lambda pid: int(pid.split('_')[1])):
+        position = positions[pos_id]
+        stop = max(stop_price(position['peak_price'], trailing_pct, trail_distance), position['cost_basis'])
+        profit_pct = ((price - position['cost_basis']) / position['cost_basis']) * 100
+        if price <= stop and profit_pct > 0.5:
+            fired.append((pos_id, profit_pct))
+    return fired
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_stop_book_matches_brute_force(seed):
+    """Adds, removes and lazy peak raises, in % and distance mode."""
+    rng = random.Random(seed)
+    book = StopBook()
+    reference = {}
+    price = 100.0
+
+    for tick in range(2000):
+        if rng.random() < 0.15:
+            pos_id = f"pos_{tick}"
+            cost_basis = price * rng.uniform(0.8, 1.2)
+            book.add(pos_id, {'cost_basis': cost_basis, 'peak_price': cost_basis})
+            reference[pos_id] = {'cost_basis': cost_basis, 'peak_price': cost_basis}
+        if rng.random() < 0.05 and reference:
+            pos_id = rng.choice(list(reference))
+            assert book.remove(pos_id)['peak_price'] == reference.pop(pos_id)['peak_price']
+
+        price = max(1.0, price * rng.uniform(0.95, 1.05))
+        book.raise_peaks(price, tick)
+        for position in reference.values():
+            position['peak_price'] = max(position['peak_price'], price)
+
+        trailing_pct = rng.choice([0.03, 0.06, 0.10])
+        trail_distance = rng.choice([None, price * 0.04])
+        fired = book.triggered(price, trailing_pct, trail_distance)
+        assert fired == brute_force_triggered(reference, price, trailing_pct, trail_distance)
+        for pos_id, _ in fired:
+            book.remove(pos_id)
+            del reference[pos_id]
+
+    assert len(book) == len(reference)
+    book.materialize()
+    assert {pid: p['peak_price'] for pid, p in book.positions.items()} == \
+        {pid: p['peak_price'] for pid, p in reference.items()}
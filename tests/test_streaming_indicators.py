@@ -0,0 +1,46 @@
+"""Streaming indicators must give the same values as the batch functions on the same prices."""
+
+import random
+
+import pytest
+
+from modules.pattern_analyzer import StreamingRSI, calculate_rsi
+
+
+def random_walk(seed, n, flat_share=0.3):
+    """Prices with runs of repeated values, so all-gain, all-loss and flat windows occur."""
+    rng = random.Random(seed)
+    price = 100.0
+    prices = []
+    for _ in range(n):
+        if rng.random() >= flat_share:
+            price = max(1.0, price + rng.gauss(0, 1))
+        prices.append(price)
+    return prices
+
+
+@pytest.mark.parametrize('period', [2, 5, 14, 30])
+def test_streaming_rsi_matches_calculate_rsi(period):
+    rsi = StreamingRSI(period)
+    prices = random_walk(period, 3000)
+    for i, price in enumerate(prices):
+        value = rsi.update(price)
+        assert value == calculate_rsi(prices[max(0, i - period):i + 1], period)
+
+
+def test_streaming_rsi_edge_windows():
+    """Rising-only, falling-only and flat stretches hit the 100/0/50 cases exactly."""
+    prices = [100 + i for i in range(20)] + [120 - i for i in range(20)] + [100.0] * 20
+    rsi = StreamingRSI(14)
+    for i, price in enumerate(prices):
+        assert rsi.update(price) == calculate_rsi(prices[max(0, i - 14):i + 1], 14)
+
+
+def test_streaming_rsi_survives_save_and_restore():
+    prices = random_walk(7, 1000)
+    rsi = StreamingRSI(14)
+    for price in prices[:500]:
+        rsi.update(price)
+    rsi = StreamingRSI.from_dict(rsi.to_dict())
+    for i in range(500, len(prices)):
+        assert rsi.update(prices[i]) == calculate_rsi(prices[i - 14:i + 1], 14)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Benchmark the indicator, analysis and decision hot paths.
+
+Runs each function on synthetic random-walk series (1e2-1e7 points) and on the
+recorded series in data/, then writes a JSON baseline that later runs can be
+compared against.
+
+Usage:
+    python utils/benchmark.py                                   # Default sizes, print results
+    python utils/benchmark.py --save data/benchmark_baseline.json
+    python utils/benchmark.py --compare data/benchmark_baseline.json
+    python utils/benchmark.py --sizes 100,1e5,1e7 --only rsi,evaluate
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import utils_core
+from backtester import load_price_series
+from decision_engine import evaluate
+from modules.historical_analyzer import (
+    analyze_price_action, analyze_support_resistance, detect_trend, calculate_volatility,
+    get_price_percentile, analyze_volume
+)
+from modules.alert_governor import AlertGovernor
+from modules.analysis_cache import AnalysisCache
+from modules.notifier_telegram import format_alert
+from modules.pattern_analyzer import calculate_rsi, analyze_price_convergence_divergence
+from modules.range_extrema import PriceRangeIndex
+from modules.trailing_stop_manager import (
+    TrailingStopManager, calculate_atr_trailing_stop, simulate_trailing_stops, simulate_atr_trailing_stops
+)
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+MIN_TIME = 0.2   # Seconds per repeat (short functions loop until they take this long)
+REPEATS = 5
+
+BENCH_CONFIG = {
+    'hold_band_pct': 5,
+    'buffer': {'sell': 1.015, 'buy': 0.985},
+    'sell_steps': [{'trigger_pct': 5, 'sell_pct': 0.2}, {'trigger_pct': 10, 'sell_pct': 0.3}],
+    'buy_steps': [{'trigger_pct': -5, 'buy_pct': 0.1}, {'trigger_pct': -10, 'buy_pct': 0.2}]
+}
+
+
+def synthetic_series(n, seed=42):
+    """Random walk of n ([timestamp_ms, price], [timestamp_ms, volume]) points, 1 minute apart."""
+    rng = random.Random(seed)
+    start = 1700000000000
+    price = 30000.0
+    prices = []
+    volumes = []
+    for i in range(n):
+        price *= 1 + rng.gauss(0, 0.002)
+        prices.append([start + i * 60000, price])
+        volumes.append([start + i * 60000, rng.uniform(1e6, 5e6)])
+    return prices, volumes
+
+
+def recorded_series():
+    """Recorded series from data/ (historical caches and tick files): name -> [[timestamp_ms, price], ...]"""
+    series = {}
+    paths = glob.glob(os.path.join(ROOT, "data", "historical_*.json")) + glob.glob(os.path.join(ROOT, "data", "*.bin"))
+    for path in sorted(paths):
+        try:
+            timestamps, prices = load_price_series(path)
+        except (ValueError, KeyError, IOError):
+            continue
+        if len(prices) >= 30:
+            series[os.path.basename(path)] = [[ts * 1000, p] for ts, p in zip(timestamps, prices)]
+    return series
+
+
+# Each benchmark: name -> (setup(prices, volumes) -> zero-arg callable, largest size it runs at,
+#                          True if the callable does one call per point)
+def _bench_evaluate(prices, volumes):
+    values = [p for _, p in prices]
+    window = min(100, len(values))
+    ma = sum(values[:window]) / window
+
+    def run():
+        for price in values:
+            evaluate(price, ma, 0.5, 20000, BENCH_CONFIG, 30000)
+    return run
+
+
+def _bench_add_price_to_history(prices, volumes):
+    values = [p for _, p in prices]
+
+    def run():
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            history_file = os.path.join(tmp_dir, "prices_history.bin")
+            for price in values:
+                utils_core.add_price_to_history(price, history_file)
+            utils_core.get_tick_store(history_file).close()
+        finally:
+            utils_core._tick_stores.pop(os.path.join(tmp_dir, "prices_history.bin"), None)
+            shutil.rmtree(tmp_dir)
+    return run
+
+
+def _bench_range_levels(prices, volumes):
+    index = PriceRangeIndex(prices)
+
+    def run():
+        index.levels()
+    return run
+
+
+def _bench_analysis_cache_update(prices, volumes):
+    cache = AnalysisCache()
+    series = [list(p) for p in prices]
+    cache.analyze('BENCH', series)
+    last = series[-1][1]
+
+    def run():
+        # New live price each call: a cache miss that only updates the changed tail
+        series[-1][1] = last if series[-1][1] != last else last * 1.001
+        cache.analyze('BENCH', series)
+    return run
+
+
+def _bench_trailing_stops(prices, volumes, lots=500):
+    values = [p for _, p in prices]
+
+    def run():
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            manager = TrailingStopManager(os.path.join(tmp_dir, "state.txt"))
+            for i in range(lots):
+                manager.record_buy(values[0] * (0.8 + 0.4 * i / lots), 0.01)
+            for price in values:
+                manager.update_peak_and_stop(price, 'moderate')
+        finally:
+            shutil.rmtree(tmp_dir)
+    return run
+
+
+def _bench_simulate_trailing_stops(prices, volumes, lots=500):
+    values = [p for _, p in prices]
+    entries = [i * len(values) // lots for i in range(lots)]
+
+    def run():
+        simulate_trailing_stops(values, entries, 'moderate')
+        simulate_atr_trailing_stops(values, entries)
+    return run
+
+
+def _bench_alert_governor(prices, volumes, assets=500):
+    data = [{'price': price, 'amount_hkd': 1900, 'asset': f"A{i % assets}", 'conviction': 72}
+            for i, (_, price) in enumerate(prices)]
+
+    def run():
+        # Every point is an alert; one flush per pass over all assets (a market-wide move)
+        governor = AlertGovernor(lambda chat_id, message: None, cooldown=0)
+        for i, alert in enumerate(data):
+            governor.submit(1, alert['asset'], 'BUY', alert)
+            if i % assets == assets - 1:
+                governor.flush()
+    return run
+
+
+def _bench_format_alert(prices, volumes):
+    data = {'price': prices[-1][1], 'amount_hkd': 1900, 'asset': 'ETH', 'cost_basis': 30743.36,
+            'loss_pct': -12.5, 'rsi': 28.4, 'support': 26000, 'reason': 'Average down', 'conviction': 72}
+
+    def run():
+        for _ in prices:
+            format_alert('BUY', data)
+    return run
+
+
+BENCHMARKS = {
+    'calculate_rsi': (lambda p, v: lambda: calculate_rsi([x[1] for x in p]), 10 ** 7, False),
+    'analyze_price_convergence_divergence': (lambda p, v: lambda: analyze_price_convergence_divergence(p), 10 ** 7, False),
+    'analyze_price_action': (lambda p, v: lambda: analyze_price_action(p, v), 10 ** 7, False),
+    'analyze_price_action_python': (lambda p, v: lambda: analyze_price_action(p, v, backend='python'), 10 ** 7, False),
+    'analyze_support_resistance': (lambda p, v: lambda: analyze_support_resistance(p), 10 ** 7, False),
+    'detect_trend': (lambda p, v: lambda: detect_trend(p), 10 ** 7, False),
+    'calculate_volatility': (lambda p, v: lambda: calculate_volatility(p), 10 ** 7, False),
+    'get_price_percentile': (lambda p, v: lambda: get_price_percentile(p[-1][1], p), 10 ** 7, False),
+    'analyze_volume': (lambda p, v: lambda: analyze_volume(v), 10 ** 7, False),
+    'calculate_atr_trailing_stop': (lambda p, v: lambda: calculate_atr_trailing_stop(p), 10 ** 7, False),
+    'analysis_cache_update': (_bench_analysis_cache_update, 10 ** 7, False),
+    'range_index_build': (lambda p, v: lambda: PriceRangeIndex(p), 10 ** 6, False),
+    'range_index_levels': (_bench_range_levels, 10 ** 7, False),
+    'evaluate': (_bench_evaluate, 10 ** 6, True),
+    'trailing_stops_500_lots': (_bench_trailing_stops, 10 ** 5, True),
+    'simulate_trailing_stops_500_lots': (_bench_simulate_trailing_stops, 10 ** 7, False),
+    'add_price_to_history': (_bench_add_price_to_history, 10 ** 6, True),
+    'format_alert': (_bench_format_alert, 10 ** 5, True),
+    'alert_governor_500_assets': (_bench_alert_governor, 10 ** 5, True),
+}
+
+
+def time_callable(fn, min_time=MIN_TIME, repeats=REPEATS):
+    """
+    Time a callable: loop it until one repeat takes min_time, take several repeats.
+
+    Returns:
+        dict with best/median seconds per call and the loop count
+    """
+    # Calibrate: how many calls fit in min_time
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 10 ** 6:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    times = [elapsed / loops]
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append((time.perf_counter() - started) / loops)
+
+    return {'best_s': min(times), 'median_s': statistics.median(times), 'loops': loops}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(sizes, names, use_recorded=True):
+    """
+    Returns:
+        dict: {benchmark: {series label: {n, best_s, median_s, ns_per_point, loops}}}
+    """
+    inputs = []
+    for n in sizes:
+        inputs.append((str(n), *synthetic_series(n)))
+    if use_recorded:
+        for name, prices in recorded_series().items():
+            inputs.append((f"recorded:{name}", prices, [[ts, 1e6] for ts, _ in prices]))
+
+    results = {}
+    for name in names:
+        setup, max_size, _ = BENCHMARKS[name]
+        for label, prices, volumes in inputs:
+            n = len(prices)
+            if n > max_size:
+                continue
+            timing = time_callable(setup(prices, volumes))
+            timing['n'] = n
+            timing['ns_per_point'] = round(timing['best_s'] / n * 1e9, 1)
+            results.setdefault(name, {})[label] = timing
+            print(f"  {name:<38} {label:>28}  {timing['best_s'] * 1000:>12.3f} ms  {timing['ns_per_point']:>10.1f} ns/pt")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Print current vs. baseline and return the regressions (slower by more than threshold).
+    """
+    regressions = []
+    print(f"\n{'benchmark':<38} {'series':>28} {'baseline ms':>12} {'now ms':>12} {'change':>8}")
+    for name, series in results.items():
+        for label, timing in series.items():
+            old = baseline.get('results', {}).get(name, {}).get(label)
+            if not old:
+                continue
+            change = timing['best_s'] / old['best_s'] - 1
+            flag = '  REGRESSION' if change > threshold else ''
+            print(f"{name:<38} {label:>28} {old['best_s'] * 1000:>12.3f} {timing['best_s'] * 1000:>12.3f} {change:>+7.1%}{flag}")
+            if change > threshold:
+                regressions.append((name, label, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indicator, analysis and decision hot paths")
+    parser.add_argument('--sizes', default=','.join(str(n) for n in DEFAULT_SIZES),
+                        help="Comma-separated synthetic series sizes (e.g. 100,1e4,1e7)")
+    parser.add_argument('--only', help="Comma-separated benchmark names (substring match)")
+    parser.add_argument('--no-recorded', action='store_true', help="Skip recorded series from data/")
+    parser.add_argument('--save', help="Write results to this JSON baseline")
+    parser.add_argument('--compare', help="Compare against this JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Slowdown counted as a regression (default 0.10 = 10%%)")
+    args = parser.parse_args()
+
+    sizes = [int(float(s)) for s in args.sizes.split(',') if s]
+    names = list(BENCHMARKS)
+    if args.only:
+        wanted = args.only.split(',')
+        names = [n for n in names if any(w in n for w in wanted)]
+
+    print(f"Benchmarking {len(names)} functions at sizes {sizes}")
+    results = run_benchmarks(sizes, names, not args.no_recorded)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': 'numpy' in sys.modules
+        },
+        'results': results
+    }
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nComparing with {args.compare} (commit {baseline.get('meta', {}).get('commit')})")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
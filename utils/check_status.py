@@ -2,53 +2,59 @@
 """
 Check app status - shows current iteration count and progress
 """
-import json
 import os
+import sys
+from datetime import datetime
 
-price_history_file = os.path.join("..", "data", "prices_history.json")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from modules.tick_store import read_ticks
+
+price_history_file = os.path.join("..", "data", "prices_history.bin")
 
 if os.path.exists(price_history_file):
-    with open(price_history_file, 'r') as f:
-        data = json.load(f)
-        prices = data if isinstance(data, list) else data.get('prices', [])
-        count = len(prices)
-        percentage = round((count / 100) * 100, 1)
-        
-        print(f"\n{'='*60}")
-        print(f"📊 CRYPTO NOTIFIER - APP STATUS CHECK")
-        print(f"{'='*60}")
-        print(f"\n✅ APP IS RUNNING")
-        print(f"   Iterations collected: {count}/100 ({percentage}%)")
+    # Memory-mapped read of the latest 100 ticks only
+    prices = [
+        {'price': price, 'timestamp': datetime.fromtimestamp(ts).isoformat()}
+        for ts, price in read_ticks(price_history_file, 100)
+    ]
+    count = len(prices)
+    percentage = round((count / 100) * 100, 1)
+    
+    print(f"\n{'='*60}")
+    print(f"📊 CRYPTO NOTIFIER - APP STATUS CHECK")
+    print(f"{'='*60}")
+    print(f"\n✅ APP IS RUNNING")
+    print(f"   Iterations collected: {count}/100 ({percentage}%)")
+    
+    if count < 100:
+        remaining = 100 - count
+        time_remaining = remaining * 60  # 60 seconds per iteration
+        hours = time_remaining // 3600
+        minutes = (time_remaining % 3600) // 60
         
-        if count < 100:
-            remaining = 100 - count
-            time_remaining = remaining * 60  # 60 seconds per iteration
-            hours = time_remaining // 3600
-            minutes = (time_remaining % 3600) // 60
-            
-            print(f"\n⏳ PROGRESS TO SIGNALS:")
-            print(f"   Remaining: {remaining} iterations")
-            print(f"   Time remaining: ~{hours}h {minutes}m")
-            print(f"   \n   [{'█' * int(percentage/5)}{' ' * (20 - int(percentage/5))}] {percentage}%")
+        print(f"\n⏳ PROGRESS TO SIGNALS:")
+        print(f"   Remaining: {remaining} iterations")
+        print(f"   Time remaining: ~{hours}h {minutes}m")
+        print(f"   \n   [{'█' * int(percentage/5)}{' ' * (20 - int(percentage/5))}] {percentage}%")
+    else:
+        print(f"\n🎯 SIGNALS ACTIVE!")
+        print(f"   Moving Average ready")
+        print(f"   Technical analysis active")
+        print(f"   Watching for BUY/SELL signals...")
+    
+    if count >= 1:
+        latest = prices[-1] if isinstance(prices[0], dict) else prices[-1]
+        if isinstance(latest, dict):
+            latest_price = latest.get('price', 'N/A')
+            timestamp = latest.get('timestamp', 'N/A')
         else:
-            print(f"\n🎯 SIGNALS ACTIVE!")
-            print(f"   Moving Average ready")
-            print(f"   Technical analysis active")
-            print(f"   Watching for BUY/SELL signals...")
-        
-        if count >= 1:
-            latest = prices[-1] if isinstance(prices[0], dict) else prices[-1]
-            if isinstance(latest, dict):
-                latest_price = latest.get('price', 'N/A')
-                timestamp = latest.get('timestamp', 'N/A')
-            else:
-                latest_price = latest
-                timestamp = 'N/A'
-            
-            print(f"\n📈 LATEST DATA:")
-            print(f"   Current Price: {latest_price:,.2f} HKD")
-            print(f"   Last Update: {timestamp}")
+            latest_price = latest
+            timestamp = 'N/A'
         
-        print(f"\n{'='*60}\n")
+        print(f"\n📈 LATEST DATA:")
+        print(f"   Current Price: {latest_price:,.2f} HKD")
+        print(f"   Last Update: {timestamp}")
+    
+    print(f"\n{'='*60}\n")
 else:
     print("❌ No price history found. App may not have started yet.")
@@ -3,20 +3,24 @@
 Dual Asset Dashboard - Monitor ETH and BTC running simultaneously
 Shows progress, prices, and status for both assets on one screen
 """
-import json
 import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from modules.tick_store import read_ticks
 
 def get_price_data(filename):
-    """Get price history data"""
+    """Get the latest 100 prices from a tick file (memory-mapped, no full-file parse)"""
     filepath = os.path.join("data", filename)
     if not os.path.exists(filepath):
         return None
     
     try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-            prices = data if isinstance(data, list) else data.get('prices', [])
-            return prices
+        return [
+            {'price': price, 'timestamp': datetime.fromtimestamp(ts).isoformat()}
+            for ts, price in read_ticks(filepath, 100)
+        ]
     except:
         return None
 
@@ -32,12 +36,12 @@ def main():
     print("="*80)
     
     # Check ETH
-    eth_data = get_price_data("prices_history.json")
+    eth_data = get_price_data("prices_history.bin")
     eth_count = len(eth_data) if eth_data else 0
     eth_pct = round((eth_count / 100) * 100, 1)
     
     # Check BTC
-    btc_data = get_price_data("prices_history_state_btc.json")
+    btc_data = get_price_data("prices_history_state_btc.bin")
     btc_count = len(btc_data) if btc_data else 0
     btc_pct = round((btc_count / 100) * 100, 1)
     
@@ -1,18 +1,59 @@
+import atexit
 import json
+import math
 import os
+import time
 from datetime import datetime
+from modules.tick_store import TickStore, import_json_history
+from modules.rolling_window import RollingWindow
+from modules.state_store import get_state_store
 
 PENDING_FILE = "pending.json"
-MAX_PRICE_HISTORY = 100  # Keep last 100 prices
+TRADE_LOG_FILE = os.path.join("data", "trade_log.jsonl")
+MAX_PRICE_HISTORY = 100  # Keep last 100 prices (moving average window, see set_price_window_size)
 TIME_GAP_THRESHOLD = 300  # 5 minutes in seconds
 
 # Will be set dynamically per instance
-PRICE_HISTORY_FILE = "prices_history.json"
+PRICE_HISTORY_FILE = "prices_history.bin"
+
+# Open tick stores by file path (one per asset)
+_tick_stores = {}
 
 def set_price_history_file(base_name):
-    """Set the price history file based on state file (e.g., state_btc.txt -> prices_history_btc.json)"""
+    """Set the price history file based on state file (e.g., state_btc.txt -> prices_history_btc.bin)"""
     global PRICE_HISTORY_FILE
-    PRICE_HISTORY_FILE = f"prices_history_{base_name}.json" if base_name != "state" else "prices_history.json"
+    PRICE_HISTORY_FILE = f"prices_history_{base_name}.bin" if base_name != "state" else "prices_history.bin"
+
+def get_price_history_file(state_file):
+    """Price history file that sits next to a state file (e.g., data/state_btc.txt -> data/prices_history_state_btc.bin)"""
+    base_name = os.path.basename(state_file).replace('.txt', '')
+    file_name = f"prices_history_{base_name}.bin" if base_name != "state" else "prices_history.bin"
+    return os.path.join(os.path.dirname(state_file), file_name)
+
+def get_bar_file_prefix(state_file):
+    """Prefix of the OHLC bar files next to a state file (e.g., data/state_btc.txt -> data/bars_state_btc)"""
+    base_name = os.path.basename(state_file).replace('.txt', '')
+    file_name = f"bars_{base_name}" if base_name != "state" else "bars"
+    return os.path.join(os.path.dirname(state_file), file_name)
+
+def set_price_window_size(size):
+    """Set how many prices the moving average window holds (call before the first history access)."""
+    global MAX_PRICE_HISTORY
+    MAX_PRICE_HISTORY = int(size)
+
+def get_tick_store(history_file=None):
+    """Get the (cached) tick store for a price history file, migrating a legacy .json history once."""
+    history_file = history_file or PRICE_HISTORY_FILE
+    store = _tick_stores.get(history_file)
+    if store is None:
+        store = TickStore(history_file, window=MAX_PRICE_HISTORY)
+        legacy_file = history_file[:-len('.bin')] + '.json'
+        if len(store) == 0 and os.path.exists(legacy_file):
+            imported = import_json_history(legacy_file, store)
+            os.replace(legacy_file, legacy_file + '.migrated')
+            print(f"[INFO] Migrated {imported} prices from {legacy_file} to {history_file}")
+        _tick_stores[history_file] = store
+    return store
 
 def load_pending():
     if not os.path.exists(PENDING_FILE):
@@ -24,60 +65,162 @@ def save_pending(data):
     with open(PENDING_FILE, "w") as f:
         json.dump(data, f, indent=2)
 
-def load_price_history():
-    """Load price history from file. Returns list of {price, timestamp} dicts."""
-    if not os.path.exists(PRICE_HISTORY_FILE):
-        return []
-    try:
-        with open(PRICE_HISTORY_FILE) as f:
-            data = json.load(f)
-            return data if isinstance(data, list) else []
-    except:
-        return []
-
-def check_time_gap():
+def update_cost_basis_after_buy(state_file, current_balance, cost_basis, amount_hkd, price):
+    """Record a BUY in the state file: weighted-average cost basis, more balance, less cash.
+    Returns (new_cost_basis, new_balance)."""
+    amount_crypto = amount_hkd / price
+    new_balance = current_balance + amount_crypto
+    new_cost_basis = ((current_balance * cost_basis) + amount_hkd) / new_balance if cost_basis else price
+
+    get_state_store(state_file).update(lambda state: {
+        'CURRENT_BALANCE': round(new_balance, 8),
+        'COST_BASIS': round(new_cost_basis, 2),
+        'AVAILABLE_CASH_HKD': round(max(0.0, state.get('AVAILABLE_CASH_HKD', 0.0) - amount_hkd), 2)
+    })
+    return new_cost_basis, new_balance
+
+def update_balance_after_sell(state_file, current_balance, amount_crypto, price=None):
+    """Record a SELL in the state file (cash is credited when the price is given). Returns new_balance."""
+    new_balance = max(0.0, current_balance - amount_crypto)
+
+    def changes(state):
+        updated = {'CURRENT_BALANCE': round(new_balance, 8)}
+        if price:
+            updated['AVAILABLE_CASH_HKD'] = round(state.get('AVAILABLE_CASH_HKD', 0.0) + amount_crypto * price, 2)
+        return updated
+
+    get_state_store(state_file).update(changes)
+    return new_balance
+
+def log_trade(asset, trade_type, price, amount_hkd=None, amount_crypto=None, cost_basis=None,
+              trigger_pct=None, reason=""):
+    """Append a trade to the trade log (one JSON object per line)."""
+    entry = {
+        "timestamp": get_current_timestamp(),
+        "asset": asset,
+        "type": trade_type,
+        "price": price,
+        "amount_hkd": amount_hkd if amount_hkd is not None else (amount_crypto * price if amount_crypto else None),
+        "amount_crypto": amount_crypto if amount_crypto is not None else (amount_hkd / price if amount_hkd else None),
+        "cost_basis": cost_basis,
+        "trigger_pct": trigger_pct,
+        "reason": reason
+    }
+    with open(TRADE_LOG_FILE, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+def load_price_history(history_file=None):
+    """Load price history (latest MAX_PRICE_HISTORY ticks). Returns list of {price, timestamp} dicts."""
+    store = get_tick_store(history_file)
+    return [
+        {"price": price, "timestamp": datetime.fromtimestamp(ts).isoformat()}
+        for ts, price in store.window
+    ]
+
+def check_time_gap(history_file=None):
     """Check if there's a significant time gap since last price was recorded.
     Returns True if gap detected (more than TIME_GAP_THRESHOLD seconds).
     This indicates a restart after a long break - history should be cleared."""
-    prices = load_price_history()
-    if not prices:
+    last_tick = get_tick_store(history_file).last()
+    if not last_tick:
         return False
     
-    last_price = prices[-1]
-    last_timestamp_str = last_price["timestamp"]
-    last_timestamp = datetime.fromisoformat(last_timestamp_str)
-    current_time = datetime.now()
-    time_diff = (current_time - last_timestamp).total_seconds()
+    time_diff = time.time() - last_tick[0]
     
     return time_diff > TIME_GAP_THRESHOLD
 
-def clear_price_history():
+def _interpolate(points, timestamps):
+    """Linearly interpolate (timestamp, price) points (oldest first) at the given timestamps.
+    Timestamps outside the points take the nearest end price."""
+    prices = []
+    j = 0
+    for ts in timestamps:
+        while j < len(points) - 2 and points[j + 1][0] < ts:
+            j += 1
+        (t0, p0), (t1, p1) = points[j], points[min(j + 1, len(points) - 1)]
+        if ts <= t0 or t1 == t0:
+            prices.append(p0)
+        elif ts >= t1:
+            prices.append(p1)
+        else:
+            prices.append(p0 + (p1 - p0) * (ts - t0) / (t1 - t0))
+    return prices
+
+def bridge_price_gap(price, interval, history_file=None, now=None):
+    """Warm start after a short gap: fill the missing ticks by interpolating from the last stored
+    price to the current one (the current price itself is appended by the caller).
+    Returns the number of ticks added."""
+    store = get_tick_store(history_file)
+    last_tick = store.last()
+    now = now or time.time()
+    if not last_tick:
+        return 0
+
+    missing = min(int((now - last_tick[0]) / interval) - 1, MAX_PRICE_HISTORY)
+    if missing <= 0:
+        return 0
+
+    timestamps = [now - interval * k for k in range(missing, 0, -1)]
+    for ts, p in zip(timestamps, _interpolate([last_tick, (now, price)], timestamps)):
+        store.append(ts, p)
+    return missing
+
+def backfill_price_history(points, interval, history_file=None, now=None):
+    """Warm start after a long gap: replace the history with a full window resampled from recent
+    market data (e.g. CoinGecko market_chart [timestamp_ms, price] pairs) onto the loop interval.
+    Returns the number of ticks written."""
+    points = sorted((ts / 1000, float(p)) for ts, p in points)
+    if not points:
+        return 0
+
+    now = now or time.time()
+    # One tick short of a full window - the current price completes it
+    timestamps = [now - interval * k for k in range(MAX_PRICE_HISTORY - 1, 0, -1)]
+    get_tick_store(history_file).replace(list(zip(timestamps, _interpolate(points, timestamps))))
+    return len(timestamps)
+
+def clear_price_history(history_file=None):
     """Clear all price history - used when time gap detected."""
-    if os.path.exists(PRICE_HISTORY_FILE):
-        os.remove(PRICE_HISTORY_FILE)
+    get_tick_store(history_file).clear()
 
-def save_price_history(prices):
-    """Save price history to file. Keep only the last MAX_PRICE_HISTORY entries."""
+def save_price_history(prices, history_file=None):
+    """Replace price history with a list of {price, timestamp} dicts. Keep only the last MAX_PRICE_HISTORY entries."""
     prices = prices[-MAX_PRICE_HISTORY:]  # Keep last 100
-    with open(PRICE_HISTORY_FILE, "w") as f:
-        json.dump(prices, f, indent=2)
+    get_tick_store(history_file).replace([
+        (datetime.fromisoformat(p["timestamp"]).timestamp(), p["price"]) for p in prices
+    ])
 
 def calculate_moving_average(prices):
-    """Calculate moving average from price list. Returns None if not enough data."""
+    """Calculate moving average from a RollingWindow or price list. Returns None if not enough data."""
     if not prices or len(prices) < 10:  # Need at least 10 prices
         return None
+    if isinstance(prices, RollingWindow):
+        return prices.mean()  # O(1) from the running sum
     price_values = [p["price"] for p in prices]
     return sum(price_values) / len(price_values)
 
-def add_price_to_history(price):
-    """Add new price with timestamp to history and return updated list."""
-    prices = load_price_history()
-    prices.append({
-        "price": price,
-        "timestamp": datetime.now().isoformat()
-    })
-    save_price_history(prices)
-    return prices
+def add_price_to_history(price, history_file=None):
+    """Append new price with timestamp and return the RollingWindow of the latest MAX_PRICE_HISTORY prices.
+    The tick is written to disk on the next checkpoint (see flush_price_history)."""
+    store = get_tick_store(history_file)
+    store.append(time.time(), price)
+    return store.window
+
+@atexit.register
+def flush_price_history():
+    """Checkpoint: write buffered ticks of every open price history to disk."""
+    for store in _tick_stores.values():
+        store.flush()
+
+def calculate_days_to_breakeven(price, cost_basis, avg_daily_change_pct):
+    """Estimate days until price gets back to cost basis at the given average daily change.
+    Returns 0 if already at/above cost basis, None if the price isn't rising."""
+    if price >= cost_basis:
+        return 0
+    if avg_daily_change_pct <= 0:
+        return None
+    pct_needed = ((cost_basis - price) / price) * 100
+    return math.ceil(pct_needed / avg_daily_change_pct)
 
 def get_current_timestamp():
     """Get current timestamp in readable format."""